@@ -0,0 +1,75 @@
+# back/bench_pdf_parse.py
+"""
+Mide el parseo de PDFs del build según el número de procesos.
+
+Parsea todas las páginas con el mismo pipeline de build_vectorstore.py
+(rangos de páginas en un ProcessPoolExecutor) para cada N de procesos y reporta
+páginas/s y speedup. Verifica además que el resultado (texto + metadatos, en
+orden) sea idéntico para todos los N.
+
+Uso:
+    python bench_pdf_parse.py --workers 1,2,4,8
+    python bench_pdf_parse.py --pdf "docs/Software Architecture in practice.pdf" --shard 32
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def _run(pdf: Path, workers: int, shard: int) -> tuple[int, float, str]:
+    import build_vectorstore as bv
+
+    bv.PARSE_WORKERS = workers
+    bv.PARSE_SHARD_PAGES = shard
+    h = hashlib.sha256()
+    pages = 0
+    t0 = time.perf_counter()
+    for d in bv._iter_pages("bench", pdf):
+        h.update(json.dumps([d.page_content, d.metadata], sort_keys=True).encode("utf-8"))
+        pages += 1
+    return pages, time.perf_counter() - t0, h.hexdigest()[:12]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pdf", help="PDF a parsear (default: el más grande de docs/)")
+    ap.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}")
+    ap.add_argument("--shard", type=int, default=16, help="páginas por rango")
+    args = ap.parse_args()
+
+    if args.pdf:
+        pdf = Path(args.pdf)
+    else:
+        pdfs = sorted((BASE_DIR / "docs").glob("*.pdf"), key=lambda p: p.stat().st_size, reverse=True)
+        if not pdfs:
+            print("[bench] no hay PDFs en docs/; usa --pdf")
+            raise SystemExit(1)
+        pdf = pdfs[0]
+
+    counts = sorted({int(x) for x in args.workers.split(",") if x.strip()})
+    print(f"[bench] pdf={pdf.name} cpus={os.cpu_count()} shard={args.shard}")
+    rows = []
+    for n in counts:
+        pages, secs, digest = _run(pdf, n, args.shard)
+        rows.append((n, pages, secs, digest))
+        print(f"[bench]   workers={n} {pages} páginas en {secs:.2f}s")
+
+    base = rows[0][2] if rows else 0.0
+    digests = {r[3] for r in rows}
+    print()
+    print(f"{'workers':>7} {'pages':>6} {'secs':>7} {'pages/s':>8} {'speedup':>8} {'digest':>13}")
+    for n, pages, secs, digest in rows:
+        print(f"{n:>7} {pages:>6} {secs:>7.2f} {pages / secs if secs else 0:>8.1f} "
+              f"{base / secs if secs else 0:>7.2f}x {digest:>13}")
+    print(f"[bench] salida idéntica entre N: {'sí' if len(digests) == 1 else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# back/bench_retrieval.py
+"""
+Compara retrieval solo-vector contra híbrido (BM25 + vector) sobre el índice local.
+
+Para cada consulta mide latencia (sin caché de retrieval). recall@k se mide contra
+un conjunto etiquetado a mano (bench_retrieval_labels.json: consulta -> páginas
+(archivo, página 0-based) que la responden): recall@k = páginas relevantes
+recuperadas / min(k, relevantes). Es independiente de ambos retrievers (no usa el
+índice BM25 para decidir qué es relevante).
+También reporta overlap@k (fracción del top-k solo-vector que el modo también
+devuelve) y cuántas consultas el híbrido resolvió sin llamada de embeddings.
+
+Uso:
+    python bench_retrieval.py --k 6 --repeat 3
+    python bench_retrieval.py --labels mis_etiquetas.json
+    python bench_retrieval.py --queries mis_consultas.txt   (sin etiquetas: solo latencia/overlap)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+os.environ["RAG_CACHE"] = "0"  # medir el retriever, no la caché
+
+from dotenv import load_dotenv, find_dotenv  # noqa: E402
+
+load_dotenv(find_dotenv())
+
+from src.bm25_index import get_bm25_index  # noqa: E402
+from src.rag_agent import get_retriever, hybrid_stats  # noqa: E402
+
+DEFAULT_LABELS = Path(__file__).resolve().parent / "bench_retrieval_labels.json"
+
+# consultas sin etiquetar: solo latencia, overlap y no-embed
+QUERIES = [
+    "ADD 3.0",
+    "circuit breaker",
+    "p95 latency",
+    "heartbeat",
+    "ping/echo",
+    "quality attribute scenario response measure",
+    "performance tactics control resource demand",
+    "how to keep availability when a region fails",
+    "tactics to reduce coupling between modules",
+    "architecture evaluation ATAM utility tree",
+    "stimulus source environment artifact",
+    "introduce concurrency",
+]
+
+
+def _load_labels(path: str | Path) -> dict[str, set[tuple]]:
+    """{consulta: {(archivo, página)}} del JSON etiquetado a mano."""
+    rows = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {r["query"]: {(f, int(p)) for f, p in r["relevant"]} for r in rows}
+
+
+def _page(d) -> tuple:
+    md = d.metadata or {}
+    return (md.get("title") or Path(md.get("source_path") or "").name, md.get("page"))
+
+
+def _key(d) -> tuple:
+    md = d.metadata or {}
+    return (md.get("source_path"), md.get("page"), (d.page_content or "")[:80])
+
+
+def _run(retriever, queries: list[str], repeat: int, labels: dict, k: int) -> dict:
+    lat, recalls, top = [], [], {}
+    for q in queries:
+        docs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            docs = retriever.invoke(q)
+            lat.append(time.perf_counter() - t0)
+        top[q] = [_key(d) for d in docs[:k]]
+        rel = labels.get(q)
+        if rel:
+            got = {_page(d) for d in docs[:k]} & rel
+            recalls.append(len(got) / min(k, len(rel)))
+    lat.sort()
+    return {
+        "p50_ms": statistics.median(lat) * 1000 if lat else 0.0,
+        "p95_ms": lat[int(0.95 * (len(lat) - 1))] * 1000 if lat else 0.0,
+        "recall": statistics.mean(recalls) if recalls else 0.0,
+        "judged": len(recalls),
+        "top": top,
+    }
+
+
+def _overlap(top: dict, base_top: dict) -> float:
+    vals = [len(set(top[q]) & set(base_top[q])) / len(base_top[q]) for q in top if base_top.get(q)]
+    return statistics.mean(vals) if vals else 0.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--repeat", type=int, default=3, help="repeticiones por consulta (latencia)")
+    ap.add_argument("--queries", help="archivo con una consulta por línea (sin etiquetas)")
+    ap.add_argument("--labels", default=str(DEFAULT_LABELS), help="JSON [{query, relevant: [[archivo, página]]}]")
+    args = ap.parse_args()
+
+    index = get_bm25_index()
+    if index is None:
+        print("[bench] no hay índice BM25; corre primero python build_vectorstore.py")
+        raise SystemExit(1)
+    labels = _load_labels(args.labels) if args.labels and Path(args.labels).exists() else {}
+    # etiquetas que apuntan a PDFs fuera del índice (ALLOWED_BOOKS) darían recall 0 en ambos modos
+    indexed = {m.get("title") for m in index.metas}
+    missing = {f for rel in labels.values() for f, _ in rel} - indexed
+    if missing:
+        print(f"[bench] (Aviso) etiquetas sobre archivos no indexados (se ignoran): {sorted(missing)}")
+        labels = {q: rel for q, rel in labels.items() if not {f for f, _ in rel} & missing}
+    queries = list(labels) + [q for q in QUERIES if q not in labels]
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [ln.strip() for ln in f if ln.strip()]
+    print(f"[bench] chunks={len(index)} queries={len(queries)} labelled={sum(q in labels for q in queries)} "
+          f"k={args.k} repeat={args.repeat}")
+
+    rows = []
+    for mode in ("vector", "hybrid"):
+        before = hybrid_stats()
+        res = _run(get_retriever(k=args.k, mode=mode), queries, args.repeat, labels, args.k)
+        after = hybrid_stats()
+        res["no_embed"] = (after["lexical_only"] - before["lexical_only"]) // max(1, args.repeat)
+        rows.append((mode, res))
+
+    base = rows[0][1]["p50_ms"] or 1.0
+    base_top = rows[0][1]["top"]
+    print()
+    print(f"{'mode':>7} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9} {'judged':>7} {'overlap@k':>10} "
+          f"{'no-embed':>9} {'speedup':>8}")
+    for mode, r in rows:
+        print(f"{mode:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['recall']:>9.3f} "
+              f"{r['judged']:>7} {_overlap(r['top'], base_top):>10.3f} {r['no_embed']:>9} "
+              f"{base / (r['p50_ms'] or 1.0):>7.2f}x")
+    if not any(r["judged"] for _, r in rows):
+        print("[bench] sin consultas etiquetadas: recall@k no disponible")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# back/bench_startup.py
+"""
+Mide el arranque en frío del backend (FAST_START=1 vs FAST_START=0).
+
+Cada corrida es un proceso nuevo que importa src.main y luego compila el grafo
+(lo que hace el lifespan). Reporta, por modo, la mediana de:
+  - import_ms: `import src.main` (lo que espera uvicorn antes de aceptar conexiones)
+  - ready_ms:  import + grafo compilado (primer request sin esperas)
+  - RSS al terminar y los subsistemas más lentos de /health/startup.
+
+Los resultados se agregan a un historial JSONL (uno por corrida del bench, con el
+commit actual) para seguir el cold start entre releases; se compara con la anterior.
+
+Uso:
+    python bench_startup.py --runs 5
+    python bench_startup.py --modes 1 --history bench_results/startup.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_HISTORY = BASE_DIR / "bench_results" / "startup_history.jsonl"
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child() -> dict:
+    t0 = time.perf_counter()
+    import src.main  # noqa: F401
+    import_ms = (time.perf_counter() - t0) * 1000
+    from src.graph import get_graph
+    from src.startup import report
+    get_graph()
+    ready_ms = (time.perf_counter() - t0) * 1000
+    return {"import_ms": import_ms, "ready_ms": ready_ms, "rss_mb": _rss_mb(), "report": report()}
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty", "--tags"], cwd=str(BASE_DIR),
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def _last_entry(history: Path) -> dict | None:
+    try:
+        lines = history.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="procesos por modo (se toma la mediana)")
+    ap.add_argument("--modes", default="1,0", help="valores de FAST_START a medir")
+    ap.add_argument("--history", default=str(DEFAULT_HISTORY), help="JSONL con el historial entre releases")
+    ap.add_argument("--no-history", action="store_true", help="no agregar esta corrida al historial")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_child()))
+        return
+
+    results: dict[str, dict] = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        env = {**os.environ, "FAST_START": mode}
+        runs = []
+        for i in range(args.runs):
+            out = subprocess.run([sys.executable, __file__, "--child"], cwd=str(BASE_DIR), env=env,
+                                 capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"[bench] FAST_START={mode} corrida {i + 1} falló: {out.stderr.strip()[-400:]}")
+                continue
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            print(f"[bench] FAST_START={mode} corrida {i + 1}: import={runs[-1]['import_ms']:.0f}ms "
+                  f"ready={runs[-1]['ready_ms']:.0f}ms")
+        if not runs:
+            continue
+        slowest = sorted(runs[-1]["report"]["subsystems"].items(), key=lambda kv: -kv[1]["ms"])[:6]
+        results[mode] = {
+            "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+            "ready_ms": round(statistics.median(r["ready_ms"] for r in runs), 1),
+            "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+            "slowest": {k: v["ms"] for k, v in slowest},
+        }
+
+    history = Path(args.history)
+    prev = _last_entry(history)
+    print()
+    print(f"{'FAST_START':>10} {'import ms':>10} {'ready ms':>10} {'RSS MB':>8} {'Δimport vs prev':>16}")
+    for mode, r in results.items():
+        before = ((prev or {}).get("results") or {}).get(mode)
+        delta = f"{r['import_ms'] - before['import_ms']:+.0f}ms" if before else "-"
+        print(f"{mode:>10} {r['import_ms']:>10.0f} {r['ready_ms']:>10.0f} {r['rss_mb']:>8.1f} {delta:>16}")
+        print(f"{'':>10} más lentos: " + ", ".join(f"{k}={v:.0f}ms" for k, v in r["slowest"].items()))
+    if prev:
+        print(f"[bench] comparado con {prev.get('rev')} ({prev.get('ts')})")
+
+    if results and not args.no_history:
+        history.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "rev": _git_rev(), "python": sys.version.split()[0],
+                 "runs": args.runs, "results": results}
+        with history.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"[bench] historial: {history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# back/bench_vector_backends.py
+"""
+Compara los backends de vectores (Chroma vs NumPy mmap) sobre el índice local.
+
+Cada backend corre en un subproceso propio para medir arranque en frío y RSS sin
+interferencia. Las consultas usan vectores ya guardados en el índice (más ruido),
+así no hay llamadas de embeddings y solo se mide la búsqueda top-k.
+
+Uso:
+    python bench_vector_backends.py --queries 500 --k 6
+    python bench_vector_backends.py --filter "Software Architecture in Practice (3e)"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+BACKENDS = ("chroma", "numpy")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(backend: str, n_queries: int, k: int, title: str | None) -> dict:
+    import numpy as np
+
+    os.environ["VECTOR_BACKEND"] = backend
+    from src.numpy_store import NUMPY_SUBDIR
+    from src.rag_agent import DEFAULT_CHROMA_DIR, create_or_load_vectorstore
+
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    vs = create_or_load_vectorstore()
+    load_s = time.perf_counter() - t0
+
+    # vectores de consulta: filas del export NumPy + ruido (misma distribución que el corpus)
+    persist = Path(os.environ.get("CHROMA_DIR", DEFAULT_CHROMA_DIR))
+    mat = np.load(persist / NUMPY_SUBDIR / "vectors.npy", mmap_mode="r")
+    rng = np.random.default_rng(7)
+    rows = rng.integers(0, mat.shape[0], size=n_queries)
+    queries = np.asarray(mat[rows], dtype=np.float32)
+    queries += rng.normal(0, 0.01, size=queries.shape).astype(np.float32)
+    del mat
+
+    flt = {"title": {"$eq": title}} if title else None
+    vs.similarity_search_by_vector(queries[0].tolist(), k=k, filter=flt)  # warm-up
+    lat = []
+    for q in queries:
+        t = time.perf_counter()
+        vs.similarity_search_by_vector(q.tolist(), k=k, filter=flt)
+        lat.append(time.perf_counter() - t)
+    lat.sort()
+    return {
+        "backend": type(vs).__name__,
+        "load_ms": load_s * 1000,
+        "p50_ms": lat[len(lat) // 2] * 1000,
+        "p99_ms": lat[int(0.99 * (len(lat) - 1))] * 1000,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss0,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--filter", default=None, help="metadata.title a filtrar ($eq)")
+    ap.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.queries, args.k, args.filter)))
+        return
+
+    rows = []
+    for backend in BACKENDS:
+        cmd = [sys.executable, __file__, "--child", backend, "--queries", str(args.queries), "--k", str(args.k)]
+        if args.filter:
+            cmd += ["--filter", args.filter]
+        print(f"[bench] backend={backend} queries={args.queries} k={args.k}")
+        out = subprocess.run(cmd, cwd=str(BASE_DIR), capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"[bench]   falló: {out.stderr.strip()[-400:]}")
+            continue
+        rows.append((backend, json.loads(out.stdout.strip().splitlines()[-1])))
+
+    print()
+    print(f"{'backend':>8} {'class':>18} {'load ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'ΔRSS MB':>8}")
+    for backend, r in rows:
+        print(f"{backend:>8} {r['backend']:>18} {r['load_ms']:>9.1f} {r['p50_ms']:>8.3f} "
+              f"{r['p99_ms']:>8.3f} {r['rss_mb']:>8.1f} {r['rss_delta_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
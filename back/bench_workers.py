@@ -0,0 +1,133 @@
+# back/bench_workers.py
+"""
+Benchmark de throughput de /message según el número de workers de uvicorn.
+
+Levanta `uvicorn src.main:app --workers N` para cada N, lanza S sesiones concurrentes
+con T turnos cada una (mismo session_id por sesión, así los turnos caen en workers
+distintos y se ejercita el checkpointer compartido) y reporta req/s y latencias.
+
+Uso:
+    CHECKPOINTER=sqlite python bench_workers.py --workers 1,2,4 --sessions 16 --turns 3
+    CHECKPOINTER=postgres CHECKPOINT_POSTGRES_URL=postgresql://... python bench_workers.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent
+
+TURNS = [
+    "Create an ASR for latency in an online payments system",
+    "Which architecture style fits this ASR?",
+    "Propose tactics to satisfy this ASR",
+    "hola",
+]
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "uvicorn", "src.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=str(BASE_DIR), env=os.environ.copy())
+
+
+def _wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"el servidor no respondió /health en {timeout:.0f}s")
+
+
+async def _session(client: httpx.AsyncClient, endpoint: str, turns: int, lat: list, errors: list) -> None:
+    sid = f"bench-{uuid.uuid4().hex[:8]}"
+    for i in range(turns):
+        t0 = time.perf_counter()
+        try:
+            r = await client.post(endpoint, data={"message": TURNS[i % len(TURNS)], "session_id": sid})
+            r.raise_for_status()
+            lat.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def _load(base_url: str, endpoint: str, sessions: int, turns: int, timeout: float) -> dict:
+    lat: list[float] = []
+    errors: list[str] = []
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(_session(client, endpoint, turns, lat, errors) for _ in range(sessions)))
+        wall = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "ok": len(lat),
+        "errors": len(errors),
+        "wall_s": wall,
+        "rps": len(lat) / wall if wall else 0.0,
+        "p50_s": statistics.median(lat) if lat else 0.0,
+        "p95_s": lat[int(0.95 * (len(lat) - 1))] if lat else 0.0,
+        "first_error": errors[0] if errors else "",
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4", help="lista de N workers, separada por comas")
+    ap.add_argument("--sessions", type=int, default=16, help="sesiones concurrentes")
+    ap.add_argument("--turns", type=int, default=3, help="mensajes por sesión")
+    ap.add_argument("--endpoint", default="/message")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--request-timeout", type=float, default=180.0)
+    ap.add_argument("--startup-timeout", type=float, default=120.0)
+    args = ap.parse_args()
+
+    backend = os.getenv("CHECKPOINTER", "memory")
+    worker_counts = [int(x) for x in args.workers.split(",") if x.strip()]
+    if backend == "memory" and max(worker_counts) > 1:
+        print("[bench] AVISO: CHECKPOINTER=memory no comparte historial entre workers; usa sqlite o postgres")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for n in worker_counts:
+        print(f"[bench] workers={n} backend={backend} sessions={args.sessions} turns={args.turns}")
+        proc = _start_server(n, args.port)
+        try:
+            _wait_ready(base_url, args.startup_timeout)
+            res = asyncio.run(_load(base_url, args.endpoint, args.sessions, args.turns, args.request_timeout))
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        rows.append((n, res))
+        if res["first_error"]:
+            print(f"[bench]   primer error: {res['first_error']}")
+
+    base_rps = rows[0][1]["rps"] if rows and rows[0][1]["rps"] else 0.0
+    print()
+    print(f"{'workers':>7} {'ok':>5} {'err':>4} {'req/s':>8} {'p50 s':>7} {'p95 s':>7} {'speedup':>8}")
+    for n, r in rows:
+        speedup = r["rps"] / base_rps if base_rps else 0.0
+        print(f"{n:>7} {r['ok']:>5} {r['errors']:>4} {r['rps']:>8.2f} {r['p50_s']:>7.2f} {r['p95_s']:>7.2f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
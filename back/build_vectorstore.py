@@ -1,18 +1,32 @@
 # back/build_vectorstore.py
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
 import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 from dotenv import load_dotenv, find_dotenv
-from src.rag_agent import _embeddings as _embeddings_factory
+from src.rag_agent import _embeddings as _embeddings_factory, write_index_version, INDEX_VERSION_FILE
+from src.tactics_catalog import build_tactics_catalog
+from src.bm25_index import build_bm25_index
+from src.numpy_store import NUMPY_SUBDIR, export_from_chroma
+from src.services.doc_ingest import extract_pdf_pages, pdf_backend, pdf_page_count
+from src.utils.tokens import TOKEN_ENCODING, load_encoding
 try:
     from langchain_chroma import Chroma
 except Exception:  # pragma: no cover
     from langchain_community.vectorstores import Chroma
 
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # ================== Paths / Config ==================
@@ -27,6 +41,24 @@ PERSIST_DIR.mkdir(parents=True, exist_ok=True)
 COLLECTION_NAME = "arquia"
 EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 
+# Manifest del build incremental: hash por PDF y IDs (hash de contenido) de sus chunks
+MANIFEST_PATH = PERSIST_DIR / "build_manifest.json"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+MAX_CHUNK_TOKENS = 7000
+# Pipeline en streaming: como máximo ~BUILD_MAX_IN_FLIGHT chunks en memoria (+ una página)
+MAX_IN_FLIGHT = int(os.getenv("BUILD_MAX_IN_FLIGHT", "256"))
+# Parseo de PDFs en paralelo: rangos de páginas repartidos en un pool de procesos
+PARSE_WORKERS = int(os.getenv("BUILD_PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_SHARD_PAGES = int(os.getenv("BUILD_PARSE_SHARD_PAGES", "16"))
+# Progreso del PDF en curso (reanudar tras una caída a mitad del build)
+PROGRESS_PATH = PERSIST_DIR / "build_progress.json"
+# Versión de la metadata por chunk (token_count/token_encoding, section/heading). Si cambia, se
+# reprocesan los PDFs y se actualiza la metadata de los IDs existentes SIN re-embebir.
+CHUNK_META_VERSION = 3
+# Encabezados numerados ("4.2 Performance Tactics"); sin número de página al final (índices)
+_HEADING_RE = re.compile(r"^[ \t]*((?:\d{1,2}\.){0,3}\d{1,2})\.?[ \t]+([A-Z][^\n]{2,78}?)[ \t]*$", re.M)
+
 # Libros permitidos (título lógico -> patrones para encontrar el PDF)
 ALLOWED_BOOKS: Dict[str, List[str]] = {
     "Software Architecture in Practice (3e)": [
@@ -54,105 +86,414 @@ def _match_pdf(files: List[Path], patterns: List[str]) -> Path | None:
     return None
 
 
-def _load_docs() -> List:
+def _find_books() -> List[Tuple[str, Path]]:
     """
-    Carga en memoria las páginas de los PDFs permitidos, con metadatos uniformes.
+    (título lógico, ruta) de cada PDF permitido que esté en DOCS_DIR.
     """
     all_pdfs = sorted(list(DOCS_DIR.glob("*.pdf")))
     if not all_pdfs:
         print(f"[build] No se encontraron PDFs en {DOCS_DIR}.")
         return []
 
-    docs = []
+    books = []
     for source_title, patterns in ALLOWED_BOOKS.items():
         fpath = _match_pdf(all_pdfs, patterns)
         if not fpath:
             print(f"[build] (Aviso) No se encontró PDF para: {source_title}. "
                   f"Coloca un archivo que contenga uno de: {patterns}")
             continue
+        books.append((source_title, fpath))
+    return books
 
-        print(f"[build] Cargando: {source_title}  <-- {fpath.name}")
-        loader = PyPDFLoader(str(fpath))
-        pages = loader.load()
-        # normaliza metadatos
-        for d in pages:
-            md = d.metadata or {}
-            d.metadata = {
-                "title": Path(md.get("source") or fpath).name,   # nombre del archivo
-                "source_title": source_title,                    # título lógico del libro (para filtrar)
-                "source_path": str(fpath),                       # ruta absoluta
-                "page": md.get("page", md.get("page_number")),   # número de página (int)
-                "page_label": md.get("page_label"),              # etiqueta (si existe)
-            }
-        docs.extend(pages)
 
-    return docs
+def _page_shards(fpath: Path, start: int) -> Iterator[List[Tuple[int, str, str]]]:
+    """
+    Parsea el PDF por rangos de PARSE_SHARD_PAGES páginas en un pool de procesos.
+    Los resultados salen en orden de página; hay como máximo 2×workers rangos en
+    vuelo, así el parseo no se adelanta sin límite al embedding.
+    """
+    total = pdf_page_count(str(fpath))
+    ranges = [(a, min(a + PARSE_SHARD_PAGES, total)) for a in range(start, total, PARSE_SHARD_PAGES)]
+    if PARSE_WORKERS <= 1 or len(ranges) <= 1:
+        for a, b in ranges:
+            yield extract_pdf_pages(str(fpath), a, b)
+        return
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        pending: deque = deque()
+        it = iter(ranges)
+        for a, b in islice(it, PARSE_WORKERS * 2):
+            pending.append(pool.submit(extract_pdf_pages, str(fpath), a, b))
+        while pending:
+            shard = pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(pool.submit(extract_pdf_pages, str(fpath), *nxt))
+            yield shard
 
 
-def _split_docs(docs: List):
+def _iter_pages(source_title: str, fpath: Path, start: int = 0) -> Iterator:
+    """
+    Páginas de un PDF desde `start`, en orden, con metadatos uniformes.
+    """
+    print(f"[build] Cargando: {source_title}  <-- {fpath.name} "
+          f"({pdf_backend()}, {PARSE_WORKERS} procesos)")
+    for shard in _page_shards(fpath, start):
+        for i, text, label in shard:
+            yield Document(page_content=text, metadata={
+                "title": fpath.name,                 # nombre del archivo
+                "source_title": source_title,        # título lógico del libro (para filtrar)
+                "source_path": str(fpath),           # ruta absoluta
+                "page": i,                           # número de página (int, 0-based)
+                "page_label": label,                 # etiqueta (si existe)
+            })
+
+
+@lru_cache(maxsize=1)
+def _splitter():
     # Token-aware splitting avoids occasional oversize embedding inputs.
-    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
         encoding_name="cl100k_base",
-        chunk_size=500,
-        chunk_overlap=50,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", ". ", " ", ""],
+        add_start_index=True,  # offset del chunk en la página (para asignar la sección)
     )
-    return splitter.split_documents(docs)
 
-def _truncate_oversized_chunks(chunks: List, max_tokens: int = 7000) -> List:
+
+def _split_docs(docs: List):
+    return _splitter().split_documents(docs)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    # tokenizer de los modelos de embeddings (text-embedding-3-*): solo para el límite de entrada
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _runtime_encoder():
+    # el mismo encoding que usa PromptBudget (src.utils.tokens): token_count es exacto en runtime
+    return load_encoding()
+
+
+def _truncate_oversized_chunks(chunks: List, max_tokens: int = 7000, stats: Dict[str, int] | None = None) -> List:
     """
     Capa de seguridad: evita que cualquier chunk exceda el límite de contexto
     del endpoint de embeddings (8192 tokens en algunos modelos/configuraciones).
+    `stats` acumula max_seen / clipped entre llamadas (se reporta al final del PDF).
     """
-    try:
-        import tiktoken
-        enc = tiktoken.get_encoding("cl100k_base")
-    except Exception:
+    enc = _encoder()
+    if enc is None:
         # Si no hay tiktoken, devolvemos los chunks tal cual.
         return chunks
 
-    fixed = []
-    clipped = 0
-    max_seen = 0
+    stats = stats if stats is not None else {}
     for d in chunks:
-        text = d.page_content or ""
-        toks = enc.encode(text)
-        tok_len = len(toks)
-        if tok_len > max_seen:
-            max_seen = tok_len
-        if tok_len > max_tokens:
+        toks = enc.encode(d.page_content or "")
+        stats["max_seen"] = max(stats.get("max_seen", 0), len(toks))
+        if len(toks) > max_tokens:
             d.page_content = enc.decode(toks[:max_tokens])
-            clipped += 1
-        fixed.append(d)
+            stats["clipped"] = stats.get("clipped", 0) + 1
+    runtime = _runtime_encoder()
+    if runtime is not None:
+        for d in chunks:
+            # conteo exacto guardado en la metadata: el runtime no vuelve a tokenizar el chunk
+            d.metadata["token_count"] = len(runtime.encode(d.page_content or ""))
+            d.metadata["token_encoding"] = TOKEN_ENCODING
+    return chunks
+
+
+def _page_headings(text: str) -> List[Tuple[int, str, str]]:
+    """(offset, sección, título) de los encabezados numerados de la página."""
+    out = []
+    for m in _HEADING_RE.finditer(text or ""):
+        title = m.group(2)
+        if title.endswith((".", ",", ";", ":")) or re.search(r"\d\s*$", title):
+            continue  # frase o línea de índice ("4.2 Performance 63")
+        out.append((m.start(), m.group(1), title))
+    return out
+
+
+def _tag_sections(page, chunks: List, current: Tuple[str, str] | None) -> Tuple[str, str] | None:
+    """
+    Asigna section/heading a cada chunk: el último encabezado antes de su offset
+    en la página o, si no hay, el que viene arrastrado de páginas anteriores.
+    Devuelve el encabezado vigente al final de la página.
+    """
+    heads = _page_headings(page.page_content)
+    for d in chunks:
+        start = d.metadata.pop("start_index", 0) or 0
+        cur = current
+        for pos, sec, title in heads:
+            if pos > start:
+                break
+            cur = (sec, title)
+        if cur:
+            d.metadata["section"], d.metadata["heading"] = cur
+    return (heads[-1][1], heads[-1][2]) if heads else current
+
+
+# ================== Build incremental ==================
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _build_signature() -> dict:
+    """Lo que, si cambia, invalida todos los embeddings (rebuild completo)."""
+    if os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
+        model = "azure:" + (
+            os.getenv("AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT")
+            or os.getenv("AZURE_OPENAI_EMBED_DEPLOYMENT")
+            or os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+            or ""
+        )
+    else:
+        model = "openai:" + EMBED_MODEL
+    return {
+        "embed_model": model,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "max_chunk_tokens": MAX_CHUNK_TOKENS,
+        "pdf_parser": pdf_backend(),  # PyMuPDF y pypdf extraen texto distinto
+    }
+
+
+def _load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest: dict) -> None:
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(MANIFEST_PATH)
 
-    print(f"[build] max tokens in chunk (before safety clip): {max_seen}")
-    if clipped:
-        print(f"[build] clipped oversized chunks: {clipped}")
-    return fixed
+
+def _chunk_ids(chunks: List) -> List[str]:
+    """
+    ID determinista = hash del contenido + libro + página; un sufijo desambigua
+    chunks idénticos en la misma página (se llama por página).
+    Mismo PDF -> mismos IDs (upsert idempotente).
+    """
+    ids, seen = [], {}
+    for d in chunks:
+        md = d.metadata or {}
+        raw = f"{md.get('source_title')}\x00{md.get('page')}\x00{d.page_content}"
+        base = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        ids.append(base if n == 0 else f"{base}-{n}")
+    return ids
+
+
+def _existing_ids(vectordb, ids: List[str]) -> set:
+    found = set()
+    for i in range(0, len(ids), 1000):
+        found.update(vectordb._collection.get(ids=ids[i:i + 1000], include=[])["ids"])
+    return found
+
+
+def _load_progress(key: str, digest: str) -> dict:
+    try:
+        prog = json.loads(PROGRESS_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return prog if prog.get("key") == key and prog.get("sha256") == digest else {}
+
+
+def _save_progress(key: str, digest: str, pages_done: int, ids: List[str],
+                   heading: Tuple[str, str] | None = None) -> None:
+    tmp = PROGRESS_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"key": key, "sha256": digest, "pages_done": pages_done, "chunk_ids": ids,
+                               "heading": list(heading) if heading else None}),
+                   encoding="utf-8")
+    tmp.replace(PROGRESS_PATH)
+
+
+def _upsert(vectordb, batch: List[Tuple[str, object]]) -> int:
+    """
+    Embebe y agrega solo los IDs que la colección no tiene; devuelve cuántos.
+    A los que ya estaban se les refresca la metadata (sin re-embebir).
+    """
+    present = _existing_ids(vectordb, [i for i, _ in batch])
+    todo = [(i, d) for i, d in batch if i not in present]
+    if todo:
+        vectordb.add_documents([d for _, d in todo], ids=[i for i, _ in todo])
+    keep = [(i, d) for i, d in batch if i in present]
+    if keep:
+        vectordb._collection.update(ids=[i for i, _ in keep], metadatas=[d.metadata for _, d in keep])
+    return len(todo)
+
+
+def _index_pdf(vectordb, source_title: str, fpath: Path, digest: str) -> Tuple[List[str], int, int]:
+    """
+    Pipeline en streaming para un PDF: página -> split -> control de tokens ->
+    lote de hasta MAX_IN_FLIGHT chunks -> embed + upsert. Guarda progreso por lote;
+    si el build se cae, la próxima corrida retoma desde la última página completa.
+    Devuelve (chunk_ids, embebidos, omitidos).
+    """
+    key = str(fpath)
+    prog = _load_progress(key, digest)
+    ids: List[str] = list(prog.get("chunk_ids", []))
+    pages_done = int(prog.get("pages_done", 0))
+    heading = tuple(prog["heading"]) if prog.get("heading") else None
+    if pages_done:
+        print(f"[build] Reanudando {source_title} desde la página {pages_done} ({len(ids)} chunks ya indexados)")
+
+    embedded = skipped = 0
+    buf: List[Tuple[str, object]] = []
+    tok_stats: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    page_no = pages_done
+
+    def flush() -> None:
+        nonlocal embedded, skipped, buf
+        n = _upsert(vectordb, buf)
+        embedded += n
+        skipped += len(buf) - n
+        ids.extend(i for i, _ in buf)
+        buf = []
+        _save_progress(key, digest, page_no, ids, heading)
+        rate = (embedded + skipped) / max(time.perf_counter() - t0, 1e-6)
+        print(f"[build]   {source_title}: p.{page_no} chunks={len(ids)} embebidos={embedded} "
+              f"({rate:.1f} chunks/s)")
+
+    for page in _iter_pages(source_title, fpath, start=pages_done):
+        chunks = _truncate_oversized_chunks(_split_docs([page]), MAX_CHUNK_TOKENS, tok_stats)
+        heading = _tag_sections(page, chunks, heading)
+        buf.extend(zip(_chunk_ids(chunks), chunks))
+        page_no += 1
+        if len(buf) >= MAX_IN_FLIGHT:
+            flush()
+    if buf:
+        flush()
+
+    if tok_stats:
+        print(f"[build] max tokens in chunk (before safety clip): {tok_stats.get('max_seen', 0)}")
+        if tok_stats.get("clipped"):
+            print(f"[build] clipped oversized chunks: {tok_stats['clipped']}")
+    return ids, embedded, skipped
+
+
+def _collection_documents(vectordb) -> List:
+    """Todos los chunks de la colección (para los índices derivados)."""
+    from langchain_core.documents import Document
+    data = vectordb._collection.get(include=["documents", "metadatas"])
+    return [
+        Document(page_content=t or "", metadata=dict(m or {}))
+        for t, m in zip(data.get("documents") or [], data.get("metadatas") or [])
+    ]
+
+
+def _build_derived(vectordb) -> None:
+    """Export NumPy, BM25, catálogo de tácticas y sello de versión."""
+    # export NumPy (VECTOR_BACKEND=numpy) con los mismos embeddings, sin re-embebir
+    try:
+        np_dir = export_from_chroma(
+            vectordb, PERSIST_DIR / NUMPY_SUBDIR, dtype=os.getenv("NUMPY_VECTOR_DTYPE", "float32")
+        )
+        print("[build] numpy export      =", np_dir)
+    except Exception as e:
+        print(f"[build] (Aviso) no se pudo exportar a NumPy: {e}")
+    # índice léxico BM25 sobre los mismos chunks (retrieval híbrido)
+    print("[build] bm25 index        =", build_bm25_index(_collection_documents(vectordb), PERSIST_DIR))
+    # catálogo de tácticas (lookup O(1) en tactics_node, sin RAG en runtime)
+    print("[build] tactics catalog   =", build_tactics_catalog(vectordb, PERSIST_DIR))
+    # nueva versión del índice -> invalida la caché de retrieval del backend
+    print("[build] index_version     =", write_index_version(str(PERSIST_DIR)))
 
 
 def main():
+    ap = argparse.ArgumentParser(description="Construye (incrementalmente) el vector store local.")
+    ap.add_argument("--full", action="store_true", help="ignora el manifest y re-embebe todo")
+    args = ap.parse_args()
+
     print("[build] docs_dir          =", DOCS_DIR)
     print("[build] persist_directory =", PERSIST_DIR)
 
-    docs = _load_docs()
-    if not docs:
+    books = _find_books()
+    if not books:
         print("[build] No hay documentos válidos. Copia los PDFs a /back/docs y reintenta.")
         raise SystemExit(1)
 
-    chunks = _split_docs(docs)
-    chunks = _truncate_oversized_chunks(chunks, max_tokens=7000)
-    print(f"[build] Total chunks: {len(chunks)}")
-
-    # Embeddings y vectorstore
+    # Embeddings y vectorstore (se abre la colección existente; upsert por ID)
     emb = _embeddings_factory()  # usa Azure/OpenAI según .env
-    vectordb = Chroma.from_documents(
-        documents=chunks,
-        embedding=emb,
-        persist_directory=str(PERSIST_DIR),
+    vectordb = Chroma(
         collection_name=COLLECTION_NAME,
+        embedding_function=emb,
+        persist_directory=str(PERSIST_DIR),
     )
 
+    manifest = _load_manifest()
+    signature = _build_signature()
+    if args.full or manifest.get("signature") != signature:
+        if manifest or args.full:
+            print("[build] modelo/chunking cambió (o --full): rebuild completo")
+        vectordb.delete_collection()
+        vectordb = Chroma(
+            collection_name=COLLECTION_NAME,
+            embedding_function=emb,
+            persist_directory=str(PERSIST_DIR),
+        )
+        PROGRESS_PATH.unlink(missing_ok=True)
+        # la firma se guarda ya: si el build se cae, la próxima corrida reanuda en vez de resetear
+        manifest = {"version": 1, "signature": signature, "chunk_meta": CHUNK_META_VERSION, "pdfs": {}}
+        _save_manifest(manifest)
+    old_pdfs: Dict[str, dict] = manifest.get("pdfs", {})
+    new_pdfs: Dict[str, dict] = {}
+    # metadata por chunk de una versión anterior: se reprocesan los PDFs (los embeddings se reutilizan)
+    refresh_meta = bool(old_pdfs) and manifest.get("chunk_meta") != CHUNK_META_VERSION
+    if refresh_meta:
+        print("[build] metadata de chunks desactualizada: se actualiza sin re-embebir")
+
+    embedded = skipped = deleted = 0
+    for source_title, fpath in books:
+        key = str(fpath)
+        digest = _file_sha256(fpath)
+        prev = old_pdfs.get(key)
+        if prev and prev.get("sha256") == digest and not refresh_meta:
+            # PDF sin cambios: ni se parsea ni se embebe
+            new_pdfs[key] = prev
+            skipped += len(prev.get("chunk_ids", []))
+            print(f"[build] Sin cambios: {source_title} ({len(prev.get('chunk_ids', []))} chunks)")
+            continue
+
+        ids, n_new, n_skip = _index_pdf(vectordb, source_title, fpath, digest)
+        embedded += n_new
+        skipped += n_skip
+
+        stale = sorted(set((prev or {}).get("chunk_ids", [])) - set(ids))
+        if stale:
+            vectordb.delete(ids=stale)
+            deleted += len(stale)
+        new_pdfs[key] = {"sha256": digest, "source_title": source_title, "chunk_ids": ids}
+        # el manifest se guarda por PDF: una caída posterior no repite este libro
+        _save_manifest({"version": 1, "signature": signature, "chunk_meta": manifest.get("chunk_meta"),
+                        "pdfs": {**old_pdfs, **new_pdfs}})
+        PROGRESS_PATH.unlink(missing_ok=True)
+        print(f"[build] {source_title}: {len(ids)} chunks, {n_new} nuevos, {len(stale)} borrados")
+
+    # PDFs que ya no están en docs/: se borran sus chunks
+    for key, prev in old_pdfs.items():
+        if key not in new_pdfs and prev.get("chunk_ids"):
+            vectordb.delete(ids=prev["chunk_ids"])
+            deleted += len(prev["chunk_ids"])
+            print(f"[build] Eliminado: {prev.get('source_title')} ({len(prev['chunk_ids'])} chunks)")
+
+    _save_manifest({"version": 1, "signature": signature, "chunk_meta": CHUNK_META_VERSION, "pdfs": new_pdfs})
+    print(f"[build] embedded {embedded} / skipped {skipped} (deleted {deleted})")
+
 # Persistencia:
 # - langchain-chroma: ya quedó persistido automáticamente
 # - langchain_community: requiere .persist()
@@ -163,18 +504,16 @@ def main():
             pass
 
     print("[build] ¡Vector store construido y persistido!")
+    # Índices derivados: solo si cambió algo (o faltan); así no se invalida la caché de retrieval
+    if embedded or deleted or refresh_meta or not (PERSIST_DIR / INDEX_VERSION_FILE).exists():
+        _build_derived(vectordb)
+    else:
+        print("[build] índice sin cambios: se conservan los índices derivados")
 
-    # Resumen (fuentes únicas)
-    titles = []
-    seen = set()
-    for d in chunks[:1000]:  # muestrario
-        t = (d.metadata or {}).get("title")
-        if t and t not in seen:
-            seen.add(t)
-            titles.append(t)
-    print("[build] Fuentes (muestra):")
-    for t in titles[:10]:
-        print("   -", t)
+    # Resumen (fuentes)
+    print("[build] Fuentes:")
+    for key, info in list(new_pdfs.items())[:10]:
+        print("   -", f"{Path(key).name} ({len(info.get('chunk_ids', []))} chunks)")
 
     print(f"[build] Listo. BD en: {PERSIST_DIR}")
 
@@ -0,0 +1,144 @@
+# src/bm25_index.py
+"""
+Índice invertido BM25 local sobre los mismos chunks de Chroma.
+
+- build_bm25_index(): lo llama build_vectorstore.py; guarda bm25_index.json.gz
+  junto al índice vectorial.
+- BM25Index.search(): término a término sobre las posting lists, sin embeddings.
+- get_bm25_index(): carga perezosa (recarga si el build reescribió el archivo).
+"""
+from __future__ import annotations
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+from langchain_core.documents import Document
+
+INDEX_FILE = "bm25_index.json.gz"
+
+# Conserva términos como "3.0", "p95", "c++"
+_TOKEN_RE = re.compile(r"[a-z0-9áéíóúñü]+(?:[.+][a-z0-9]+)*\+*")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the this to was
+were what when which with why de del el la las los en y o que un una para por con se su al
+es lo como más mas
+""".split())
+
+# Metadata que se guarda por chunk (SOURCES + token_count/sección para el presupuesto de prompt)
+_META_KEYS = ("title", "source_title", "source_path", "page", "page_label", "token_count", "token_encoding",
+              "section", "heading")
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, texts: list[str], metas: list[dict], postings: dict[str, list[list[int]]],
+                 doc_len: list[int], k1: float = 1.5, b: float = 0.75):
+        self.texts = texts
+        self.metas = metas
+        self.postings = postings
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        n = len(doc_len)
+        self.avgdl = (sum(doc_len) / n) if n else 0.0
+        self.idf = {
+            t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in postings.items()
+        }
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Document]) -> "BM25Index":
+        texts, metas, doc_len = [], [], []
+        postings: dict[str, list[list[int]]] = {}
+        for i, d in enumerate(docs):
+            tf = Counter(tokenize(d.page_content))
+            texts.append(d.page_content or "")
+            md = d.metadata or {}
+            metas.append({k: md[k] for k in _META_KEYS if md.get(k) is not None})
+            doc_len.append(sum(tf.values()))
+            for term, c in tf.items():
+                postings.setdefault(term, []).append([i, c])
+        return cls(texts, metas, postings, doc_len)
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def knows(self, term: str) -> bool:
+        return term in self.postings
+
+    def search(self, query: str, k: int = 6, titles: Optional[set[str]] = None) -> list[tuple[float, int]]:
+        """Top-k (score, idx) por BM25; `titles` restringe por metadata.title."""
+        scores: dict[int, float] = {}
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for idx, tf in plist:
+                if titles is not None and self.metas[idx].get("title") not in titles:
+                    continue
+                norm = tf + k1 * (1 - b + b * self.doc_len[idx] / avgdl)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (k1 + 1) / norm
+        return heapq.nlargest(k, ((s, i) for i, s in scores.items()))
+
+    def document(self, idx: int) -> Document:
+        return Document(page_content=self.texts[idx], metadata=dict(self.metas[idx]))
+
+    # ---------- persistencia ----------
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        data = {"texts": self.texts, "metas": self.metas, "postings": self.postings, "doc_len": self.doc_len}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["texts"], data["metas"], data["postings"], data["doc_len"])
+
+
+def _index_path(persist_directory: str | Path | None = None) -> Path:
+    if persist_directory is None:
+        from src.rag_agent import DEFAULT_CHROMA_DIR
+        persist_directory = os.environ.get("CHROMA_DIR", DEFAULT_CHROMA_DIR)
+    return Path(persist_directory) / INDEX_FILE
+
+
+def build_bm25_index(docs: Iterable[Document], persist_directory: str | Path) -> Path:
+    return BM25Index.from_documents(docs).save(_index_path(persist_directory))
+
+
+_index: Optional[BM25Index] = None
+_index_mtime = 0.0
+_index_lock = threading.Lock()
+
+
+def get_bm25_index() -> Optional[BM25Index]:
+    """Índice cargado del disco; None si el build todavía no lo generó."""
+    global _index, _index_mtime
+    path = _index_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    if _index is None or mtime != _index_mtime:
+        with _index_lock:
+            if _index is None or mtime != _index_mtime:
+                _index = BM25Index.load(path)
+                _index_mtime = mtime
+    return _index
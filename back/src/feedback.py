@@ -0,0 +1,193 @@
+# src/feedback.py
+"""
+Feedback por mensaje (thumbs up/down) fuera del camino del request.
+
+- next_message_id: contador en memoria por sesión; sin I/O por request. Cada worker
+  reserva bloques de id_block IDs en la tabla message_seq (UPDATE ... RETURNING en
+  BEGIN IMMEDIATE, una vez cada id_block mensajes de la sesión): IDs únicos aunque
+  varios workers atiendan la misma sesión (no necesariamente consecutivos entre workers).
+- record / update: encolan la operación; una tarea de fondo las escribe por lotes,
+  en una sola transacción cada flush_interval segundos.
+- start / stop: se llaman desde el lifespan; stop vacía la cola antes de cerrar.
+
+El alta usa ON CONFLICT DO NOTHING y el voto es un upsert: si el voto llega a la DB
+antes que el alta (cola de otro worker), el alta posterior no lo pisa.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from src.storage import SQLitePool
+
+log = logging.getLogger("feedback")
+
+_STOP = object()  # señal de parada para el writer
+
+_SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS message_feedback (
+    session_id   TEXT NOT NULL,
+    message_id   INTEGER NOT NULL,
+    thumbs_up    INTEGER DEFAULT 0,
+    thumbs_down  INTEGER DEFAULT 0,
+    PRIMARY KEY (session_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS message_seq (
+    session_id  TEXT PRIMARY KEY,
+    last_id     INTEGER NOT NULL
+);
+"""
+# sesiones creadas antes de message_seq: se siembra desde lo ya guardado
+_SQL_SEED_SEQ = (
+    "INSERT OR IGNORE INTO message_seq (session_id, last_id) "
+    "SELECT ?, COALESCE(MAX(message_id), 0) FROM message_feedback WHERE session_id = ?"
+)
+_SQL_RESERVE = "UPDATE message_seq SET last_id = last_id + ? WHERE session_id = ? RETURNING last_id"
+_SQL_INSERT = (
+    "INSERT INTO message_feedback (session_id, message_id, thumbs_up, thumbs_down) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT (session_id, message_id) DO NOTHING"
+)
+_SQL_VOTE = (
+    "INSERT INTO message_feedback (session_id, message_id, thumbs_up, thumbs_down) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT (session_id, message_id) DO UPDATE SET "
+    "thumbs_up = excluded.thumbs_up, thumbs_down = excluded.thumbs_down"
+)
+
+FEEDBACK_ID_BLOCK = int(os.getenv("FEEDBACK_ID_BLOCK", "32"))
+
+
+class FeedbackStore:
+    def __init__(self, path: str | Path, *, flush_interval: float = 0.5, max_batch: int = 500,
+                 id_block: int = FEEDBACK_ID_BLOCK):
+        self._pool = SQLitePool(path, size=2)
+        self._pool.executescript(_SQL_CREATE)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.id_block = max(1, id_block)
+        self._blocks: dict[str, list[int]] = {}  # sesión -> [próximo ID, último ID reservado]
+        self._reserving: dict[str, asyncio.Lock] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "errors": 0, "id_blocks": 0}
+
+    # ---------- IDs ----------
+
+    def _reserve_block(self, session_id: str) -> int:
+        """Reserva id_block IDs para este proceso; devuelve el último del bloque."""
+        with self._pool.connection() as conn:
+            # lock de escritura desde el inicio: dos workers no leen el mismo last_id
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_SQL_SEED_SEQ, (session_id, session_id))
+                (last,) = conn.execute(_SQL_RESERVE, (self.id_block, session_id)).fetchone()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return last
+
+    async def next_message_id(self, session_id: str) -> int:
+        block = self._blocks.get(session_id)
+        if block is None or block[0] > block[1]:
+            # un solo request por sesión reserva; los concurrentes esperan y usan su bloque
+            async with self._reserving.setdefault(session_id, asyncio.Lock()):
+                block = self._blocks.get(session_id)
+                if block is None or block[0] > block[1]:
+                    last = await self._pool.arun(self._reserve_block, session_id)
+                    self._stats["id_blocks"] += 1
+                    block = self._blocks[session_id] = [last - self.id_block + 1, last]
+        block[0] += 1
+        return block[0] - 1
+
+    # ---------- escrituras ----------
+
+    def record(self, session_id: str, message_id: int, up: int = 0, down: int = 0) -> None:
+        """Alta del feedback de un mensaje (no pisa una fila existente)."""
+        self._enqueue(("insert", (session_id, message_id, up, down)))
+
+    def update(self, session_id: str, message_id: int, up: int, down: int) -> None:
+        """Voto de un mensaje (upsert: crea la fila si el alta todavía no llegó a la DB)."""
+        self._enqueue(("vote", (session_id, message_id, up, down)))
+
+    def _enqueue(self, op: tuple[str, tuple]) -> None:
+        self._stats["enqueued"] += 1
+        if self._queue is None:
+            # sin writer (scripts / tests): escritura directa
+            self._write_batch([op])
+            return
+        self._queue.put_nowait(op)
+
+    def _write_batch(self, ops: list[tuple[str, tuple]]) -> None:
+        """Aplica las operaciones en orden, agrupando las consecutivas del mismo tipo."""
+        with self._pool.transaction() as conn:
+            i = 0
+            while i < len(ops):
+                kind = ops[i][0]
+                j = i
+                while j < len(ops) and ops[j][0] == kind:
+                    j += 1
+                sql = _SQL_INSERT if kind == "insert" else _SQL_VOTE
+                conn.executemany(sql, [params for _, params in ops[i:j]])
+                i = j
+        self._stats["written"] += len(ops)
+        self._stats["batches"] += 1
+
+    async def _drain(self, first=None) -> bool:
+        """Escribe hasta max_batch operaciones encoladas; True si encontró la señal de parada."""
+        ops = [first] if first is not None else []
+        stop = False
+        while len(ops) < self.max_batch:
+            try:
+                op = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if op is _STOP:
+                stop = True
+                break
+            ops.append(op)
+        if ops:
+            try:
+                await asyncio.to_thread(self._write_batch, ops)
+            except Exception as e:
+                self._stats["errors"] += 1
+                log.warning("[feedback] lote de %d operaciones falló: %s", len(ops), e)
+        return stop
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            await asyncio.sleep(self.flush_interval)  # junta lo que llegue en la ventana
+            if await self._drain(first):
+                return
+
+    # ---------- ciclo de vida ----------
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="feedback-writer")
+
+    async def stop(self) -> None:
+        """Detiene el writer y escribe todo lo pendiente."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+        while not self._queue.empty():
+            await self._drain()
+        self._queue = None
+        log.info("[feedback] writer detenido (%d operaciones escritas)", self._stats["written"])
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "sessions_cached": len(self._blocks),
+        }
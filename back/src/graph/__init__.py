@@ -1,4 +1,32 @@
+import threading
 
-from src.graph.workflow import graph
+from src.startup import timed
 
-__all__ = ["graph"]
+_GRAPH = None
+_LOCK = threading.Lock()
+
+
+def get_graph():
+    """Compila el grafo en el primer uso (import de workflow incluido); thread-safe."""
+    global _GRAPH
+    if _GRAPH is None:
+        with _LOCK:
+            if _GRAPH is None:
+                with timed("graph.compile", "init"):
+                    from src.graph.workflow import graph
+                _GRAPH = graph
+    return _GRAPH
+
+
+def graph_ready() -> bool:
+    return _GRAPH is not None
+
+
+def __getattr__(name):
+    # `from src.graph import graph` sigue funcionando, pero compila recién aquí
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["graph", "get_graph", "graph_ready"]
@@ -0,0 +1,372 @@
+# src/graph/checkpoint.py
+"""
+Checkpointers del grafo.
+
+- BoundedMemorySaver: en memoria con límites (hilos LRU/TTL + checkpoints por hilo).
+  MemorySaver guarda todos los checkpoints de todas las sesiones para siempre; aquí se
+  podan los checkpoints viejos de cada hilo y se desalojan las sesiones menos usadas.
+  Opcionalmente las sesiones desalojadas se vuelcan a un SQLite local (spill) y se
+  rehidratan al volver, para que la conversación pueda continuar.
+- open_checkpointer(): checkpointer persistente compartido entre procesos según
+  CHECKPOINTER=memory|sqlite|postgres (uvicorn --workers N / varios pods).
+"""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+log = logging.getLogger("graph")
+
+BACK_DIR = Path(__file__).resolve().parents[2]  # .../back/
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """InMemorySaver con límite de hilos (LRU + TTL), de checkpoints por hilo y spill a SQLite.
+
+    - max_threads: sesiones vivas en RAM; la menos usada se desaloja primero.
+    - max_checkpoints_per_thread: solo se conservan los N checkpoints más recientes
+      (con sus writes y los blobs que ya nadie referencia).
+    - ttl_seconds: sesiones sin uso por más de este tiempo se desalojan (0 = sin TTL).
+    - spill_path: si se da, las sesiones desalojadas se guardan en SQLite y se
+      rehidratan en el próximo get_tuple/list de ese thread_id.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 500,
+        max_checkpoints_per_thread: int = 10,
+        ttl_seconds: int = 0,
+        spill_path: Optional[str] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.max_threads = max(1, max_threads)
+        self.max_checkpoints_per_thread = max(1, max_checkpoints_per_thread)
+        self.ttl_seconds = max(0, ttl_seconds)
+        self._lock = threading.RLock()
+        self._lru: "OrderedDict[str, float]" = OrderedDict()  # thread_id -> último uso
+        # (thread, ns, checkpoint_id) -> channel_versions, para podar blobs sin deserializar
+        self._versions: dict[tuple[str, str, str], dict] = {}
+        self._counters = {"evicted": 0, "expired": 0, "pruned": 0, "spilled": 0, "rehydrated": 0}
+
+        self._spill = None
+        if spill_path:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            p = Path(spill_path)
+            if not p.is_absolute():
+                p = BACK_DIR / p
+            p.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(p), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._spill = SqliteSaver(conn, serde=self.serde)
+            self._spill.setup()
+            log.info("[checkpoint] spill de sesiones desalojadas en %s", p)
+
+    @classmethod
+    def from_env(cls) -> "BoundedMemorySaver":
+        return cls(
+            max_threads=_env_int("CHECKPOINT_MAX_THREADS", 500),
+            max_checkpoints_per_thread=_env_int("CHECKPOINT_MAX_PER_THREAD", 10),
+            ttl_seconds=_env_int("CHECKPOINT_TTL_SECONDS", 0),
+            spill_path=os.getenv("CHECKPOINT_SPILL_DB") or None,
+        )
+
+    # ---------- helpers LRU / poda ----------
+
+    def _touch(self, thread_id: str) -> None:
+        self._lru[thread_id] = time.monotonic()
+        self._lru.move_to_end(thread_id)
+
+    def _has_thread(self, thread_id: str) -> bool:
+        return thread_id in self.storage and any(self.storage[thread_id].values())
+
+    def _checkpoint_versions(self, thread_id: str, ns: str, checkpoint_id: str) -> dict:
+        key = (thread_id, ns, checkpoint_id)
+        if key not in self._versions:
+            saved = self.storage[thread_id][ns].get(checkpoint_id)
+            ckpt = self.serde.loads_typed(saved[0]) if saved else {}
+            self._versions[key] = dict(ckpt.get("channel_versions", {}))
+        return self._versions[key]
+
+    def _prune_thread(self, thread_id: str) -> None:
+        """Deja solo los N checkpoints más recientes por namespace (ids uuid6 ordenables)."""
+        for ns, checkpoints in self.storage[thread_id].items():
+            if len(checkpoints) <= self.max_checkpoints_per_thread:
+                continue
+            ordered = sorted(checkpoints)
+            drop = ordered[: -self.max_checkpoints_per_thread]
+            keep = ordered[-self.max_checkpoints_per_thread:]
+
+            kept_refs = set()
+            for cid in keep:
+                kept_refs.update(self._checkpoint_versions(thread_id, ns, cid).items())
+            dropped_refs = set()
+            for cid in drop:
+                dropped_refs.update(self._checkpoint_versions(thread_id, ns, cid).items())
+                checkpoints.pop(cid, None)
+                self.writes.pop((thread_id, ns, cid), None)
+                self._versions.pop((thread_id, ns, cid), None)
+            for channel, version in dropped_refs - kept_refs:
+                self.blobs.pop((thread_id, ns, channel, version), None)
+            self._counters["pruned"] += len(drop)
+
+    def _drop_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._lru.pop(thread_id, None)
+        for key in [k for k in self._versions if k[0] == thread_id]:
+            del self._versions[key]
+
+    def _evict(self) -> None:
+        """Desaloja por TTL y luego por LRU hasta quedar en max_threads."""
+        if self.ttl_seconds:
+            cutoff = time.monotonic() - self.ttl_seconds
+            while self._lru:
+                thread_id, last = next(iter(self._lru.items()))
+                if last >= cutoff:
+                    break
+                self._evict_thread(thread_id)
+                self._counters["expired"] += 1
+        while len(self._lru) > self.max_threads:
+            thread_id = next(iter(self._lru))
+            self._evict_thread(thread_id)
+            self._counters["evicted"] += 1
+
+    def _evict_thread(self, thread_id: str) -> None:
+        if self._spill is not None:
+            try:
+                self._spill_thread(thread_id)
+            except Exception as e:
+                log.warning("[checkpoint] spill falló para %s: %s", thread_id, e)
+        self._drop_thread(thread_id)
+        log.debug("[checkpoint] hilo desalojado: %s", thread_id)
+
+    # ---------- spill / rehidratación ----------
+
+    def _spill_thread(self, thread_id: str) -> None:
+        tuples = list(super().list({"configurable": {"thread_id": thread_id}}))
+        if not tuples:
+            return
+        # reemplaza lo que hubiera de un spill anterior de la misma sesión
+        self._spill.delete_thread(thread_id)
+        for t in reversed(tuples):  # del más viejo al más nuevo
+            self._copy_tuple(t, self._spill)
+        self._counters["spilled"] += 1
+
+    def _rehydrate(self, thread_id: str) -> None:
+        if self._spill is None or self._has_thread(thread_id):
+            return
+        tuples = list(self._spill.list(
+            {"configurable": {"thread_id": thread_id}},
+            limit=self.max_checkpoints_per_thread,
+        ))
+        if not tuples:
+            return
+        for t in reversed(tuples):
+            self._copy_tuple(t, super())
+        self._touch(thread_id)
+        self._counters["rehydrated"] += 1
+        log.info("[checkpoint] sesión %s rehidratada desde spill (%d checkpoints)", thread_id, len(tuples))
+        self._evict()
+
+    @staticmethod
+    def _copy_tuple(t: CheckpointTuple, target) -> None:
+        conf = t.config["configurable"]
+        parent_id = (t.parent_config or {}).get("configurable", {}).get("checkpoint_id")
+        put_config = {"configurable": {
+            "thread_id": conf["thread_id"],
+            "checkpoint_ns": conf.get("checkpoint_ns", ""),
+            **({"checkpoint_id": parent_id} if parent_id else {}),
+        }}
+        ckpt = t.checkpoint
+        target.put(put_config, ckpt, t.metadata, dict(ckpt.get("channel_versions", {})))
+
+        by_task: dict[str, list] = {}
+        for task_id, channel, value in t.pending_writes or []:
+            by_task.setdefault(task_id, []).append((channel, value))
+        for task_id, writes in by_task.items():
+            target.put_writes(t.config, writes, task_id)
+
+    # ---------- API BaseCheckpointSaver ----------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._rehydrate(thread_id)
+            found = super().get_tuple(config)
+            if found is not None:
+                self._touch(thread_id)
+            elif not self._has_thread(thread_id):
+                # get_tuple del padre crea entradas vacías en el defaultdict
+                self.storage.pop(thread_id, None)
+            return found
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config:
+            with self._lock:
+                self._rehydrate(config["configurable"]["thread_id"])
+        yield from super().list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            out = super().put(config, checkpoint, metadata, new_versions)
+            ns = config["configurable"]["checkpoint_ns"]
+            self._versions[(thread_id, ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            self._touch(thread_id)
+            self._prune_thread(thread_id)
+            self._evict()
+            return out
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(config["configurable"]["thread_id"])
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop_thread(thread_id)
+            if self._spill is not None:
+                self._spill.delete_thread(thread_id)
+
+    # ---------- métricas ----------
+
+    def stats(self) -> dict:
+        """Gauge de uso: hilos, checkpoints, writes, blobs y bytes serializados aproximados."""
+        with self._lock:
+            self._evict()  # aplica TTL también cuando no hay tráfico de escritura
+            n_ckpt = 0
+            size = 0
+            for per_ns in self.storage.values():
+                for checkpoints in per_ns.values():
+                    n_ckpt += len(checkpoints)
+                    for ckpt, meta, _ in checkpoints.values():
+                        size += len(ckpt[1]) + len(meta[1])
+            n_writes = 0
+            for per_task in self.writes.values():
+                n_writes += len(per_task)
+                for w in per_task.values():
+                    size += len(w[2][1])
+            size += sum(len(b[1]) for b in self.blobs.values())
+            return {
+                "threads": len(self._lru),
+                "checkpoints": n_ckpt,
+                "writes": n_writes,
+                "blobs": len(self.blobs),
+                "approx_bytes": size,
+                "max_threads": self.max_threads,
+                "max_checkpoints_per_thread": self.max_checkpoints_per_thread,
+                "ttl_seconds": self.ttl_seconds,
+                "spill": self._spill is not None,
+                **self._counters,
+            }
+
+
+# ========== Checkpointer compartido entre procesos ==========
+
+CHECKPOINTER = (os.getenv("CHECKPOINTER", "memory") or "memory").strip().lower()
+SQLITE_CHECKPOINT_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "state_db/checkpoints.db")
+POSTGRES_CHECKPOINT_URL = os.getenv("CHECKPOINT_POSTGRES_URL") or os.getenv("DATABASE_URL", "")
+
+
+@asynccontextmanager
+async def open_checkpointer(backend: Optional[str] = None) -> AsyncIterator[Optional[Any]]:
+    """Abre el checkpointer persistente elegido por CHECKPOINTER y lo cierra al salir.
+
+    - memory: devuelve None (se queda el BoundedMemorySaver de este proceso).
+    - sqlite: AsyncSqliteSaver en WAL; sirve para varios workers en el mismo host.
+    - postgres: AsyncPostgresSaver sobre un pool de psycopg; sirve para varios nodos.
+
+    Pensado para el lifespan de FastAPI; los savers async solo sirven con ainvoke/astream.
+    """
+    backend = (backend or CHECKPOINTER).lower()
+
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        p = Path(SQLITE_CHECKPOINT_PATH)
+        if not p.is_absolute():
+            p = BACK_DIR / p
+        p.parent.mkdir(parents=True, exist_ok=True)
+        conn = await aiosqlite.connect(str(p))
+        try:
+            # WAL: lectores concurrentes + un escritor; busy_timeout para esperar el lock entre procesos
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute(f"PRAGMA busy_timeout={_env_int('CHECKPOINT_SQLITE_BUSY_MS', 5000)}")
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            log.info("[checkpoint] backend sqlite en %s", p)
+            yield saver
+        finally:
+            await conn.close()
+
+    elif backend == "postgres":
+        if not POSTGRES_CHECKPOINT_URL:
+            raise RuntimeError("CHECKPOINTER=postgres requiere CHECKPOINT_POSTGRES_URL (o DATABASE_URL)")
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+        pool = AsyncConnectionPool(
+            conninfo=POSTGRES_CHECKPOINT_URL,
+            min_size=1,
+            max_size=_env_int("CHECKPOINT_POSTGRES_POOL", 10),
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False,
+        )
+        await pool.open()
+        try:
+            saver = AsyncPostgresSaver(pool)
+            await saver.setup()
+            log.info("[checkpoint] backend postgres (pool max=%d)", pool.max_size)
+            yield saver
+        finally:
+            await pool.close()
+
+    else:
+        if backend != "memory":
+            log.warning("[checkpoint] CHECKPOINTER=%s desconocido; se usa memory", backend)
+        yield None
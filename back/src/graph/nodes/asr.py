@@ -4,22 +4,31 @@ from langchain_core.messages import AIMessage
 
 from src.graph.state import GraphState
 from src.graph.resources import llm, retriever
+from src.graph.retrieval import retrieve_many, aretrieve_many
 from src.graph.utils import (
+    PromptBudget,
     _clip_text, 
-    _dedupe_snippets, 
     _sanitize_plain_text, 
     _strip_tactics_sections
 )
 
-def asr_node(state: GraphState) -> GraphState:
+def _asr_concern(uq: str) -> str:
+    # Heurística del atributo
+    return "scalability" if re.search(r"scalab", uq, re.I) else \
+           "latency"     if re.search(r"latenc", uq, re.I) else "performance"
+
+def _asr_wants_rag(state: GraphState) -> bool:
+    return bool(state.get("force_rag", False)) and not bool(state.get("doc_only"))
+
+def _asr_rag_query(concern: str) -> str:
+    return f"{concern} quality attribute scenario latency measure stimulus environment artifact response response measure"
+
+def _asr_prompt(state: GraphState, docs_list: list) -> str:
     lang = state.get("language", "es")
     uq = state.get("userQuestion", "") or ""
     doc_only = bool(state.get("doc_only"))
     ctx_doc = (state.get("doc_context") or "").strip()
-
-    # Heurística del atributo
-    concern = "scalability" if re.search(r"scalab", uq, re.I) else \
-              "latency"     if re.search(r"latenc", uq, re.I) else "performance"
+    concern = _asr_concern(uq)
 
     # Dominio típico si el usuario no lo da
     low = uq.lower()
@@ -32,20 +41,18 @@ def asr_node(state: GraphState) -> GraphState:
     else:
         domain = "e-commerce flash sale"
 
-    # === RAG (saltable) ===
-    docs_list = []
-    if state.get("force_rag", False) and not doc_only:
-        try:
-            query = f"{concern} quality attribute scenario latency measure stimulus environment artifact response response measure"
-            docs_raw = list(retriever.invoke(query))
-            docs_list = docs_raw[:6]
-        except Exception:
-            docs_list = []
-
-    book_snippets = _dedupe_snippets(docs_list, max_items=6, max_chars=800)
+    # presupuesto del nodo: pregunta > fragmentos del libro > contexto del proyecto
+    parts = (
+        PromptBudget("asr")
+        .add("question", uq, priority=0, max_tokens=600)
+        .add_docs("rag", docs_list, priority=1, min_tokens=300, max_tokens=1000, max_items=6)
+        .add("context", ctx_doc if (doc_only and ctx_doc) else (state.get("add_context") or ""),
+             priority=0 if doc_only else 2, min_tokens=300)
+        .render()
+    )
+    uq, book_snippets, ctx = parts["question"], parts["rag"], parts["context"]
 
     directive = "Answer in English." if lang == "en" else "Responde en español."
-    ctx = (ctx_doc if (doc_only and ctx_doc) else (state.get("add_context") or "")).strip()[:2000]
 
     prompt = f"""{directive}
 You are an expert software architect following Attribute-Driven Design 3.0 (ADD 3.0).
@@ -95,8 +102,10 @@ Rules:
 - Keep the numbers realistic and monitorable (p95 / p99, RPS, error rate, availability, etc.).
 - Answer entirely in the requested language.
 """
+    return prompt
 
-    result = llm.invoke(prompt)
+def _asr_finish(state: GraphState, prompt: str, docs_list: list, result) -> GraphState:
+    concern = _asr_concern(state.get("userQuestion", "") or "")
     content_raw = getattr(result, "content", str(result))
     content = _sanitize_plain_text(content_raw)
     content = _strip_tactics_sections(content)
@@ -147,3 +156,28 @@ Rules:
     state["nextNode"] = "unifier"
 
     return state
+
+def asr_node(state: GraphState) -> GraphState:
+    # === RAG (saltable) ===
+    docs_list = []
+    if _asr_wants_rag(state):
+        try:
+            query = _asr_rag_query(_asr_concern(state.get("userQuestion", "") or ""))
+            docs_list = retrieve_many(retriever, [query])[0][:6]
+        except Exception:
+            docs_list = []
+
+    prompt = _asr_prompt(state, docs_list)
+    return _asr_finish(state, prompt, docs_list, llm.invoke(prompt))
+
+async def asr_node_async(state: GraphState) -> GraphState:
+    docs_list = []
+    if _asr_wants_rag(state):
+        try:
+            query = _asr_rag_query(_asr_concern(state.get("userQuestion", "") or ""))
+            docs_list = (await aretrieve_many(retriever, [query]))[0][:6]
+        except Exception:
+            docs_list = []
+
+    prompt = _asr_prompt(state, docs_list)
+    return _asr_finish(state, prompt, docs_list, await llm.ainvoke(prompt))
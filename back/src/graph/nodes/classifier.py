@@ -17,9 +17,8 @@ FOLLOWUP_PATTERNS = [
     ("checklist",       r"\b(checklist|lista de verificación|lista de verificacion)"),
 ]
 
-def classifier_node(state: GraphState) -> GraphState:
-    msg = state.get("userQuestion", "") or ""
-    prompt = f"""
+def _classifier_prompt(msg: str) -> str:
+    return f"""
 Classify the user's last message. Return JSON with:
 - language: "en" or "es"
 - intent: one of ["greeting","smalltalk","architecture","diagram","asr","tactics","style","other"]
@@ -29,11 +28,9 @@ Classify the user's last message. Return JSON with:
 User message:
 {msg}
 """
-    out = llm.with_structured_output(ClassifyOut).invoke(prompt)
-
-    low = msg.lower()
-    intent = out["intent"]
 
+def _keyword_intent(low: str, intent: str) -> str:
+    """Overrides por palabras clave sobre la intención base (LLM o forzada)."""
     #disparadores de estilo arquitectónico
     style_triggers = [
         "style", "styles",
@@ -60,7 +57,10 @@ User message:
     # No pises estilo ni ASR cuando solo dicen "this ASR"
     if any(k in low for k in diagram_triggers) and intent not in ("asr", "style"):
         intent = "diagram"
+    return intent
 
+def _apply_classification(state: GraphState, msg: str, out: ClassifyOut) -> GraphState:
+    intent = _keyword_intent(msg.lower(), out["intent"])
 
     return {
         **state,
@@ -77,3 +77,13 @@ User message:
 
         "force_rag": bool(out["use_rag"]),
     }
+
+def classifier_node(state: GraphState) -> GraphState:
+    msg = state.get("userQuestion", "") or ""
+    out = llm.with_structured_output(ClassifyOut).invoke(_classifier_prompt(msg))
+    return _apply_classification(state, msg, out)
+
+async def classifier_node_async(state: GraphState) -> GraphState:
+    msg = state.get("userQuestion", "") or ""
+    out = await llm.with_structured_output(ClassifyOut).ainvoke(_classifier_prompt(msg))
+    return _apply_classification(state, msg, out)
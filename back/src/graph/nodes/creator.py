@@ -7,7 +7,7 @@ from src.graph.resources import llm
 from src.graph.utils import _push_turn
 from src.graph.consts import prompt_creator
 
-def creator_node(state: GraphState) -> GraphState:
+def _creator_prompt(state: GraphState) -> str:
     user_q = state["userQuestion"]
     effective_q = state.get("localQuestion") or user_q
 
@@ -19,8 +19,9 @@ User request:
 If an ASR is provided, ensure components and connectors explicitly support the Response and Response Measure.
 """
     _push_turn(state, role="system", name="creator_system", content=prompt)
+    return prompt
 
-    response = llm.invoke(prompt)
+def _creator_finish(state: GraphState, response) -> GraphState:
     content = getattr(response, "content", "")
 
     match = re.search(r"```mermaid\s*(.*?)```", content, re.DOTALL | re.IGNORECASE)
@@ -34,3 +35,11 @@ If an ASR is provided, ensure components and connectors explicitly support the R
         "mermaidCode": mermaid_code,
         "hasVisitedCreator": True
     }
+
+def creator_node(state: GraphState) -> GraphState:
+    response = llm.invoke(_creator_prompt(state))
+    return _creator_finish(state, response)
+
+async def creator_node_async(state: GraphState) -> GraphState:
+    response = await llm.ainvoke(_creator_prompt(state))
+    return _creator_finish(state, response)
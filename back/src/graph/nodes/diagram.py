@@ -7,14 +7,7 @@ from src.graph.resources import llm, log
 from src.graph.consts import MERMAID_SYSTEM
 from src.graph.utils import _sanitize_mermaid
 
-def _llm_nl_to_mermaid(natural_prompt: str) -> str:
-    """
-    Llama al LLM para obtener código Mermaid puro (sin fences) y lo sanea
-    con _sanitize_mermaid antes de devolverlo.
-    """
-    msgs = [SystemMessage(content=MERMAID_SYSTEM),
-            HumanMessage(content=natural_prompt)]
-    resp = llm.invoke(msgs)
+def _parse_mermaid(resp) -> str:
     raw = getattr(resp, "content", str(resp)) or ""
 
     # Si vino con ```mermaid ...```, usamos solo el cuerpo
@@ -30,13 +23,22 @@ def _llm_nl_to_mermaid(natural_prompt: str) -> str:
     # Si no hay fences, saneamos todo el texto
     return _sanitize_mermaid(raw)
 
-def diagram_orchestrator_node(state: GraphState) -> GraphState:
+def _llm_nl_to_mermaid(natural_prompt: str) -> str:
     """
-    Nodo orquestador de diagramas:
-    - Usa el ASR + estilo + tácticas + contexto + memoria del grafo
-    - Genera SOLO el script Mermaid (state["mermaidCode"])
-    - NO llama a Kroki, ni a /diagram/nl, ni genera SVG/PNG
+    Llama al LLM para obtener código Mermaid puro (sin fences) y lo sanea
+    con _sanitize_mermaid antes de devolverlo.
     """
+    msgs = [SystemMessage(content=MERMAID_SYSTEM),
+            HumanMessage(content=natural_prompt)]
+    return _parse_mermaid(llm.invoke(msgs))
+
+async def _llm_nl_to_mermaid_async(natural_prompt: str) -> str:
+    msgs = [SystemMessage(content=MERMAID_SYSTEM),
+            HumanMessage(content=natural_prompt)]
+    return _parse_mermaid(await llm.ainvoke(msgs))
+
+def _diagram_prompt(state: GraphState) -> str:
+    """Prompt multi-sección (contexto, ASR, estilo, tácticas, petición) para el LLM de Mermaid."""
     # Pregunta actual del usuario (si existe)
     user_q = (state.get("localQuestion") or state.get("userQuestion") or "").strip()
 
@@ -114,15 +116,9 @@ def diagram_orchestrator_node(state: GraphState) -> GraphState:
         + (user_q or "Generate a deployment/component diagram aligned with the ASR and tactics.")
     )
 
-    full_prompt = "\n\n---\n\n".join(sections)
-
-    # --- Llamar al LLM especializado en Mermaid ---
-    try:
-        mermaid_code = _llm_nl_to_mermaid(full_prompt)
-    except Exception as e:
-        log.warning("diagram_orchestrator_node: Mermaid generation failed: %s", e)
-        mermaid_code = ""
+    return "\n\n---\n\n".join(sections)
 
+def _apply_mermaid(state: GraphState, mermaid_code: str) -> GraphState:
     state["mermaidCode"] = mermaid_code or ""
     # Ya no usamos imágenes ni backend de figuras
     state["diagram"] = {}
@@ -131,3 +127,29 @@ def diagram_orchestrator_node(state: GraphState) -> GraphState:
     state["intent"] = "diagram"
 
     return state
+
+def diagram_orchestrator_node(state: GraphState) -> GraphState:
+    """
+    Nodo orquestador de diagramas:
+    - Usa el ASR + estilo + tácticas + contexto + memoria del grafo
+    - Genera SOLO el script Mermaid (state["mermaidCode"])
+    - NO llama a Kroki, ni a /diagram/nl, ni genera SVG/PNG
+    """
+    full_prompt = _diagram_prompt(state)
+
+    # --- Llamar al LLM especializado en Mermaid ---
+    try:
+        mermaid_code = _llm_nl_to_mermaid(full_prompt)
+    except Exception as e:
+        log.warning("diagram_orchestrator_node: Mermaid generation failed: %s", e)
+        mermaid_code = ""
+    return _apply_mermaid(state, mermaid_code)
+
+async def diagram_orchestrator_node_async(state: GraphState) -> GraphState:
+    full_prompt = _diagram_prompt(state)
+    try:
+        mermaid_code = await _llm_nl_to_mermaid_async(full_prompt)
+    except Exception as e:
+        log.warning("diagram_orchestrator_node: Mermaid generation failed: %s", e)
+        mermaid_code = ""
+    return _apply_mermaid(state, mermaid_code)
@@ -5,7 +5,8 @@ from langgraph.prebuilt import create_react_agent
 
 from src.graph.state import GraphState
 from src.graph.resources import llm, retriever, _HAS_VERTEX
-from src.graph.utils import _push_turn
+from src.graph.utils import PromptBudget, _push_turn
+from src.graph.retrieval import retrieve_many, aretrieve_many
 from src.graph.nodes.supervisor import _looks_like_eval
 from src.graph.nodes.tools import theory_tool, viability_tool, needs_tool, analyze_tool
 
@@ -21,14 +22,13 @@ def _pick_asr_to_evaluate(state: GraphState) -> str:
             return m.content
     return ""
 
-def _book_snippets_for_eval(retriever, concern_hint: str = "") -> str:
+def _eval_book_query(concern_hint: str = "") -> str:
     q = "quality attribute scenario parts stimulus source environment artifact response response measure"
     if concern_hint:
         q = concern_hint + " " + q
-    try:
-        docs = list(retriever.invoke(q))
-    except Exception:
-        docs = []
+    return q
+
+def _format_eval_snippets(docs) -> str:
     # 4 fragmentos de 300 chars c/u
     seen, out = set(), []
     for d in docs:
@@ -39,6 +39,15 @@ def _book_snippets_for_eval(retriever, concern_hint: str = "") -> str:
         if len(out) >= 4: break
     return "\n\n".join(out)
 
+def _book_snippets_for_eval(retriever, concern_hint: str = "") -> str:
+    # con plazo: si el retriever se cuelga se evalúa sin fragmentos del libro
+    docs = retrieve_many(retriever, [_eval_book_query(concern_hint)])[0]
+    return _format_eval_snippets(docs)
+
+async def _book_snippets_for_eval_async(retriever, concern_hint: str = "") -> str:
+    docs = (await aretrieve_many(retriever, [_eval_book_query(concern_hint)]))[0]
+    return _format_eval_snippets(docs)
+
 def getEvaluatorPrompt(image_path1: str, image_path2: str) -> str:
     i1 = f"\nthis is the first image path: {image_path1}" if image_path1 else ""
     i2 = f"\nthis is the second image path: {image_path2}" if image_path2 else ""
@@ -50,29 +59,36 @@ Use:
 - Analyze Tool (compare two diagrams){i1}{i2}
 Keep answers short and decisive."""
 
-def evaluator_node(state: GraphState) -> GraphState:
+def _concern_hint(uq: str) -> str:
+    return "latency" if re.search(r"latenc", uq, re.I) else ("scalability" if re.search(r"scalab", uq, re.I) else "")
+
+def _doc_snippets(state: GraphState) -> str:
+    """En DOC-ONLY el documento del proyecto reemplaza a los snippets del libro."""
+    ctx_doc = (state.get("doc_context") or "").strip()
+    if state.get("doc_only") and ctx_doc:
+        return f"[DOC] {ctx_doc}"  # lo recorta el PromptBudget del prompt
+    return ""
+
+def _no_asr_to_evaluate(state: GraphState) -> GraphState:
+    lang = state.get("language", "es")
+    short = "No encuentro un ASR para evaluar. Pega el texto del ASR o pide que genere uno primero." if lang=="es" \
+            else "I couldn't find an ASR to evaluate. Paste the ASR text or ask me to create one first."
+    _push_turn(state, role="assistant", name="evaluator", content=short)
+    return {**state, "messages": state["messages"] + [AIMessage(content=short, name="evaluator")], "hasVisitedEvaluator": True}
+
+def _asr_eval_prompt(state: GraphState, asr_text: str, book_snips: str) -> str:
     lang = state.get("language", "es")
-    uq = (state.get("userQuestion") or "")
-    concern_hint = "latency" if re.search(r"latenc", uq, re.I) else ("scalability" if re.search(r"scalab", uq, re.I) else "")
     doc_only = bool(state.get("doc_only"))
-    ctx_doc = (state.get("doc_context") or "").strip()
 
-    # --- MODO 1: evaluación de ASR ---
-    if _looks_like_eval(uq):
-        asr_text = _pick_asr_to_evaluate(state)
-        if not asr_text:
-            short = "No encuentro un ASR para evaluar. Pega el texto del ASR o pide que genere uno primero." if lang=="es" \
-                    else "I couldn't find an ASR to evaluate. Paste the ASR text or ask me to create one first."
-            _push_turn(state, role="assistant", name="evaluator", content=short)
-            return {**state, "messages": state["messages"] + [AIMessage(content=short, name="evaluator")], "hasVisitedEvaluator": True}
-
-        if doc_only and ctx_doc:
-            book_snips = f"[DOC] {ctx_doc[:1500]}"
-        else:
-            book_snips = _book_snippets_for_eval(retriever, concern_hint)
-
-        directive = "Responde en español." if lang=="es" else "Answer in English."
-        eval_prompt = f"""{directive}
+    directive = "Responde en español." if lang=="es" else "Answer in English."
+    parts = (
+        PromptBudget("evaluator")
+        .add("asr", asr_text, priority=0)
+        .add("rag", book_snips, priority=1, min_tokens=300)
+        .render()
+    )
+    asr_text, book_snips = parts["asr"], parts["rag"]
+    eval_prompt = f"""{directive}
 You are evaluating a Quality Attribute Scenario (Architecture Significant Requirement).
 
 BOOK_SNIPPETS (ground your critique in these ideas; keep it short):
@@ -101,42 +117,56 @@ Rewrite (improved ASR):
 References:
   List 2–5 short items only if grounded by BOOK_SNIPPETS; otherwise write "None".
 """
-        eval_prompt = ("DOC-ONLY mode: ON. Reason exclusively from the PROJECT DOCUMENT.\n\n" + eval_prompt) if doc_only else eval_prompt
-        result = llm.invoke(eval_prompt)
-        content = getattr(result, "content", str(result)).strip()
+    return ("DOC-ONLY mode: ON. Reason exclusively from the PROJECT DOCUMENT.\n\n" + eval_prompt) if doc_only else eval_prompt
 
-        _push_turn(state, role="system", name="evaluator_system", content=eval_prompt)
-        _push_turn(state, role="assistant", name="evaluator", content=content)
+def _asr_eval_finish(state: GraphState, eval_prompt: str, result) -> GraphState:
+    content = getattr(result, "content", str(result)).strip()
 
-        return {
-            **state,
-            "messages": state["messages"] + [AIMessage(content=content, name="evaluator")],
-            "hasVisitedEvaluator": True
-        }
+    _push_turn(state, role="system", name="evaluator_system", content=eval_prompt)
+    _push_turn(state, role="assistant", name="evaluator", content=content)
+
+    return {
+        **state,
+        "messages": state["messages"] + [AIMessage(content=content, name="evaluator")],
+        "hasVisitedEvaluator": True
+    }
+
+def _build_tools_evaluator(state: GraphState):
+    doc_only = bool(state.get("doc_only"))
+    ctx_doc = (state.get("doc_context") or "").strip()
 
-    # --- MODO 2 (fallback): tools variados ---
     tools = [theory_tool, viability_tool, needs_tool]
     if _HAS_VERTEX:
         tools.append(analyze_tool)
     evaluator_agent = create_react_agent(llm, tools=tools)
 
     eval_prompt = getEvaluatorPrompt(state.get("imagePath1",""), state.get("imagePath2",""))
-    ctx_add = (state.get("add_context") or "").strip()[:1500]
+    # contexto del proyecto + historial dentro del presupuesto del nodo (se descartan los mensajes más viejos)
+    parts = (
+        PromptBudget("evaluator")
+        .add("context", ctx_doc if (doc_only and ctx_doc) else (state.get("add_context") or ""),
+             priority=0 if doc_only else 1, min_tokens=300, max_tokens=600)
+        .add_messages("history", state["messages"], priority=0 if not doc_only else 1)
+        .render()
+    )
+    ctx_budgeted = parts["context"]
     if doc_only and ctx_doc:
-        eval_prompt = f"DOC-ONLY: use exclusively this PROJECT DOCUMENT.\n{ctx_doc[:1500]}\n\n" + eval_prompt
-    elif ctx_add:
-        eval_prompt = f"PROJECT CONTEXT:\n{ctx_add}\n\n" + eval_prompt
+        eval_prompt = f"DOC-ONLY: use exclusively this PROJECT DOCUMENT.\n{ctx_budgeted}\n\n" + eval_prompt
+    elif ctx_budgeted:
+        eval_prompt = f"PROJECT CONTEXT:\n{ctx_budgeted}\n\n" + eval_prompt
     _push_turn(state, role="system", name="evaluator_system", content=eval_prompt)
 
-    messages_with_system = [SystemMessage(content=eval_prompt)] + state["messages"]
-    result = evaluator_agent.invoke({
+    messages_with_system = [SystemMessage(content=eval_prompt)] + parts["history"]
+    payload = {
         "messages": messages_with_system,
         "userQuestion": state.get("userQuestion",""),
         "localQuestion": state.get("localQuestion",""),
         "imagePath1": state.get("imagePath1",""),
         "imagePath2": state.get("imagePath2","")
-    })
+    }
+    return evaluator_agent, payload
 
+def _tools_eval_finish(state: GraphState, result) -> GraphState:
     for msg in result["messages"]:
         _push_turn(state, role="assistant", name="evaluator", content=str(getattr(msg, "content", msg)))
 
@@ -145,3 +175,39 @@ References:
         "messages": state["messages"] + [AIMessage(content=msg.content, name="evaluator") for msg in result["messages"]],
         "hasVisitedEvaluator": True
     }
+
+def evaluator_node(state: GraphState) -> GraphState:
+    uq = (state.get("userQuestion") or "")
+
+    # --- MODO 1: evaluación de ASR ---
+    if _looks_like_eval(uq):
+        asr_text = _pick_asr_to_evaluate(state)
+        if not asr_text:
+            return _no_asr_to_evaluate(state)
+
+        book_snips = _doc_snippets(state) or _book_snippets_for_eval(retriever, _concern_hint(uq))
+        eval_prompt = _asr_eval_prompt(state, asr_text, book_snips)
+        result = llm.invoke(eval_prompt)
+        return _asr_eval_finish(state, eval_prompt, result)
+
+    # --- MODO 2 (fallback): tools variados ---
+    evaluator_agent, payload = _build_tools_evaluator(state)
+    result = evaluator_agent.invoke(payload)
+    return _tools_eval_finish(state, result)
+
+async def evaluator_node_async(state: GraphState) -> GraphState:
+    uq = (state.get("userQuestion") or "")
+
+    if _looks_like_eval(uq):
+        asr_text = _pick_asr_to_evaluate(state)
+        if not asr_text:
+            return _no_asr_to_evaluate(state)
+
+        book_snips = _doc_snippets(state) or await _book_snippets_for_eval_async(retriever, _concern_hint(uq))
+        eval_prompt = _asr_eval_prompt(state, asr_text, book_snips)
+        result = await llm.ainvoke(eval_prompt)
+        return _asr_eval_finish(state, eval_prompt, result)
+
+    evaluator_agent, payload = _build_tools_evaluator(state)
+    result = await evaluator_agent.ainvoke(payload)
+    return _tools_eval_finish(state, result)
@@ -6,15 +6,14 @@ from langgraph.prebuilt import create_react_agent
 from src.graph.state import GraphState
 from src.graph.resources import llm, _HAS_VERTEX
 from src.graph.consts import prompt_researcher
-from src.graph.utils import _push_turn, _last_k_messages, _clip_text
+from src.graph.utils import PromptBudget, _push_turn, _last_k_messages, _clip_text
 from src.graph.nodes.tools import local_RAG, LLM, LLMWithImages
 
-def researcher_node(state: GraphState) -> GraphState:
+def _researcher_shortcut(state: GraphState) -> GraphState | None:
+    """Turnos que no necesitan al agente de investigación (ASR sin RAG, diagrama, saludo)."""
     lang = state.get("language", "es")
     intent = state.get("intent", "general")
     force_rag = bool(state.get("force_rag", False))
-    doc_only = bool(state.get("doc_only"))
-    ctx_doc = (state.get("doc_context") or "").strip()
 
     # ⛔ GUARD 1: si estamos en turno ASR y NO se forzó RAG, no investigues
     if intent == "asr" and not force_rag:
@@ -47,6 +46,15 @@ def researcher_node(state: GraphState) -> GraphState:
             "messages": state["messages"] + [AIMessage(content=quick, name="researcher")],
             "hasVisitedInvestigator": True
         }
+    return None
+
+def _build_researcher(state: GraphState):
+    """Arma el agente ReAct, su payload y el system message (para el reintento corto)."""
+    lang = state.get("language", "es")
+    intent = state.get("intent", "general")
+    force_rag = bool(state.get("force_rag", False))
+    doc_only = bool(state.get("doc_only"))
+    ctx_doc = (state.get("doc_context") or "").strip()
 
     # ---- Agente de investigación (con RAG opcional / DOC-ONLY bloquea RAG) ----
     sys = (
@@ -62,7 +70,15 @@ def researcher_node(state: GraphState) -> GraphState:
 
     # Contexto: prioriza doc_context en DOC-ONLY, si no, usa add_context
     ctx_add = (state.get("add_context") or "").strip()
-    ctx_for_prompt = ctx_doc if (doc_only and ctx_doc) else ctx_add
+    # contexto + últimos mensajes dentro del presupuesto del nodo
+    parts = (
+        PromptBudget("investigator")
+        .add("context", ctx_doc if (doc_only and ctx_doc) else ctx_add,
+             priority=0 if doc_only else 1, min_tokens=500)
+        .add_messages("history", _last_k_messages(state["messages"], k=6), priority=0 if not doc_only else 1)
+        .render()
+    )
+    ctx_for_prompt = parts["context"]
     context_message = SystemMessage(
         content=f"PROJECT DOCUMENT (exclusive source):\n{ctx_for_prompt}"
     ) if (doc_only and ctx_for_prompt) else (
@@ -81,7 +97,7 @@ def researcher_node(state: GraphState) -> GraphState:
         hint_lines.append("Also explain the tactics in the provided Mermaid, if any.")
     hint = _clip_text("\n".join(hint_lines).strip(), 100) if hint_lines else ""
 
-    short_history = _last_k_messages(state["messages"], k=6)
+    short_history = parts["history"]
     messages_with_system = [system_message] + ([context_message] if context_message else []) + short_history
 
     payload = {
@@ -91,15 +107,9 @@ def researcher_node(state: GraphState) -> GraphState:
         "imagePath1": state["imagePath1"],
         "imagePath2": state["imagePath2"]
     }
+    return agent, payload, system_message
 
-    try:
-        # Limita la recursión para evitar planeos largos del agente
-        result = agent.invoke(payload, config={"recursion_limit": 12})
-    except Exception:
-        messages_with_system = [system_message] + _last_k_messages(state["messages"], k=3)
-        payload["messages"] = messages_with_system
-        result = agent.invoke(payload, config={"recursion_limit": 8})
-
+def _researcher_finish(state: GraphState, result) -> GraphState:
     msgs_out = result.get("messages", [])
     for m in msgs_out:
         _push_turn(state, role="assistant", name="researcher", content=str(getattr(m, "content", m)))
@@ -121,3 +131,31 @@ def researcher_node(state: GraphState) -> GraphState:
         "hasVisitedInvestigator": True
     }
     return state
+
+def researcher_node(state: GraphState) -> GraphState:
+    early = _researcher_shortcut(state)
+    if early is not None:
+        return early
+
+    agent, payload, system_message = _build_researcher(state)
+    try:
+        # Limita la recursión para evitar planeos largos del agente
+        result = agent.invoke(payload, config={"recursion_limit": 12})
+    except Exception:
+        messages_with_system = [system_message] + _last_k_messages(state["messages"], k=3)
+        payload["messages"] = messages_with_system
+        result = agent.invoke(payload, config={"recursion_limit": 8})
+    return _researcher_finish(state, result)
+
+async def researcher_node_async(state: GraphState) -> GraphState:
+    early = _researcher_shortcut(state)
+    if early is not None:
+        return early
+
+    agent, payload, system_message = _build_researcher(state)
+    try:
+        result = await agent.ainvoke(payload, config={"recursion_limit": 12})
+    except Exception:
+        payload["messages"] = [system_message] + _last_k_messages(state["messages"], k=3)
+        result = await agent.ainvoke(payload, config={"recursion_limit": 8})
+    return _researcher_finish(state, result)
@@ -3,15 +3,7 @@ import json
 from src.graph.state import GraphState
 from src.graph.resources import llm
 
-def style_node(state: GraphState) -> GraphState:
-    """
-    Architecture style node (ADD 3.0):
-
-    - Proposes EXACTLY 2 candidate styles.
-    - Evaluates the impact of each one on the ASR.
-    - Recommends one of them.
-    - Stores only the recommended style as the active style in the pipeline.
-    """
+def _style_prompt(state: GraphState) -> str:
     lang = state.get("language", "es")
     directive = "Answer in English." if lang == "en" else "Responde en español."
 
@@ -59,8 +51,10 @@ You MUST respond with a VALID JSON object ONLY, with NO extra text, in the follo
 
 Do NOT add comments or any text outside of this JSON object.
 """
+    return prompt
 
-    result = llm.invoke(prompt)
+def _style_finish(state: GraphState, result) -> GraphState:
+    lang = state.get("language", "es")
     raw = getattr(result, "content", str(result))
 
     # 3) Parse JSON (fallback if it fails)
@@ -143,3 +137,17 @@ Do NOT add comments or any text outside of this JSON object.
     state["nextNode"] = "unifier"
 
     return state
+
+def style_node(state: GraphState) -> GraphState:
+    """
+    Architecture style node (ADD 3.0):
+
+    - Proposes EXACTLY 2 candidate styles.
+    - Evaluates the impact of each one on the ASR.
+    - Recommends one of them.
+    - Stores only the recommended style as the active style in the pipeline.
+    """
+    return _style_finish(state, llm.invoke(_style_prompt(state)))
+
+async def style_node_async(state: GraphState) -> GraphState:
+    return _style_finish(state, await llm.ainvoke(_style_prompt(state)))
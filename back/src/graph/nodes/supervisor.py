@@ -62,19 +62,8 @@ User question: {state["userQuestion"]}
 Outputs: ['investigator','creator','evaluator','asr','unifier'].
 """
 
-def supervisor_node(state: GraphState):
-    uq = (state.get("userQuestion") or "")
-
-    # si ya hay un SVG listo en este turno, vamos directo al unifier
-    d = state.get("diagram") or {}
-    if d.get("ok") and d.get("svg_b64"):
-        return {**state, "nextNode": "unifier", "intent": "diagram"}
-
-    # idioma
-    lang = detect_lang(uq)
-    state_lang = "es" if lang == "es" else "en"
-
-    # CORTE DE CIRCUITO: respeta la intención forzada desde main.py
+def _forced_route(state: GraphState, uq: str, state_lang: str) -> GraphState | None:
+    """CORTE DE CIRCUITO: respeta la intención forzada desde main.py."""
     forced = state.get("intent")
     if forced == "asr":
         return {**state,
@@ -109,8 +98,41 @@ def supervisor_node(state: GraphState):
                 "nextNode": "diagram_agent",
                 "intent": "diagram",
                 "language": state_lang}
+    return None
+
+def _pre_route(state: GraphState) -> GraphState | None:
+    """Rutas que no necesitan LLM (diagrama listo, intención forzada, evaluación de ASR)."""
+    uq = (state.get("userQuestion") or "")
+
+    # si ya hay un SVG listo en este turno, vamos directo al unifier
+    d = state.get("diagram") or {}
+    if d.get("ok") and d.get("svg_b64"):
+        return {**state, "nextNode": "unifier", "intent": "diagram"}
+
+    # idioma
+    lang = detect_lang(uq)
+    state_lang = "es" if lang == "es" else "en"
+
+    forced = _forced_route(state, uq, state_lang)
+    if forced is not None:
+        return forced
 
     # (a partir de aquí, SOLO si no vino intención forzada)
+    if _looks_like_eval(uq):
+        return {**state,
+                "localQuestion": uq,
+                "nextNode": "evaluator",
+                "intent": "architecture",
+                "language": state_lang}
+    return None
+
+def _keyword_route(state: GraphState) -> tuple[str, str, str | None] | None:
+    """(nextNode, intent, localQuestion) cuando las palabras clave deciden la ruta.
+
+    Si devuelve algo, la decisión del LLM del supervisor se descarta de todas formas.
+    """
+    uq = (state.get("userQuestion") or "")
+    state_lang = "es" if detect_lang(uq) == "es" else "en"
     fu_intent = classify_followup(uq)
 
         # --- NEW: detectar petición de estilos arquitectónicos ---
@@ -121,14 +143,6 @@ def supervisor_node(state: GraphState):
     ]
     wants_style = any(t in uq.lower() for t in style_terms)
 
-
-    if _looks_like_eval(uq):
-        return {**state,
-                "localQuestion": uq,
-                "nextNode": "evaluator",
-                "intent": "architecture",
-                "language": state_lang}
-
     # keywords para DIAGRAMAS (ES/EN)
     diagram_terms = [
         "diagrama", "diagrama de componentes", "diagrama de arquitectura",
@@ -146,53 +160,44 @@ def supervisor_node(state: GraphState):
     ]
     wants_tactics = any(t in uq.lower() for t in tactics_terms)  # NEW
 
-    sys_messages = [SystemMessage(content=makeSupervisorPrompt(state))]
-
-    # baseline LLM (con fallback defensivo)
-    try:
-        resp = llm.with_structured_output(supervisorSchema).invoke(sys_messages)
-        next_node = resp.get("nextNode", "investigator")
-        local_q = resp.get("localQuestion", uq)
-    except Exception:
-        next_node, local_q = "investigator", uq
-
-    intent_val = state.get("intent", "general")
-
         # 1) STYLE cuando el usuario lo pide explícitamente
     if wants_style or fu_intent == "style" or state.get("intent") == "style":
-        next_node = "style"
-        intent_val = "style"
-        local_q = uq or (
+        return "style", "style", uq or (
             "Select the most appropriate architecture style for the current ASR."
             if state_lang == "en"
             else "Selecciona el estilo arquitectónico más adecuado para el ASR actual."
         )
 
     # 2) ASR después (no incluir tácticas aquí)
-    elif any(x in uq.lower() for x in ["asr", "quality attribute scenario", "qas"]) or fu_intent == "make_asr":
-        next_node = "asr"
-        intent_val = "asr"
-        local_q = f"Create a concrete QAS (ASR) for: {state['userQuestion']}"
+    if any(x in uq.lower() for x in ["asr", "quality attribute scenario", "qas"]) or fu_intent == "make_asr":
+        return "asr", "asr", f"Create a concrete QAS (ASR) for: {state['userQuestion']}"
 
     # 3) DIAGRAMA cuando lo piden
-    elif wants_diagram or fu_intent in ("component_view", "deployment_view", "functional_view"):
-        next_node = "diagram_agent"
-        intent_val = "diagram"
-        local_q = uq
+    if wants_diagram or fu_intent in ("component_view", "deployment_view", "functional_view"):
+        return "diagram_agent", "diagram", uq
 
     # 4) TÁCTICAS solo cuando el usuario las pide
-    elif wants_tactics or fu_intent in ("explain_tactics", "tactics"):
-        next_node = "tactics"
-        intent_val = "tactics"
-        local_q = (
+    if wants_tactics or fu_intent in ("explain_tactics", "tactics"):
+        return "tactics", "tactics", (
             "Propose architecture tactics to satisfy the previous ASR. "
             "Explain why each tactic helps and how it ties to the ASR response/measure."
         )
 
     # 4) Resto
-    elif fu_intent in ("compare", "checklist"):
-        next_node = "investigator"
-        intent_val = "architecture"
+    if fu_intent in ("compare", "checklist"):
+        return "investigator", "architecture", None
+    return None
+
+def _post_route(state: GraphState, next_node: str, local_q: str) -> GraphState:
+    """Aplica las heurísticas por palabras clave sobre la decisión del LLM."""
+    uq = (state.get("userQuestion") or "")
+    state_lang = "es" if detect_lang(uq) == "es" else "en"
+    intent_val = state.get("intent", "general")
+
+    kw = _keyword_route(state)
+    if kw is not None:
+        next_node, intent_val, kw_q = kw
+        local_q = kw_q if kw_q is not None else local_q
 
     # evita unifier si no se visitó nada este turno
     if next_node == "unifier" and not (
@@ -209,3 +214,38 @@ def supervisor_node(state: GraphState):
         "intent": intent_val,
         "language": state_lang
     }
+
+def supervisor_node(state: GraphState):
+    routed = _pre_route(state)
+    if routed is not None:
+        return routed
+
+    uq = (state.get("userQuestion") or "")
+    sys_messages = [SystemMessage(content=makeSupervisorPrompt(state))]
+
+    # baseline LLM (con fallback defensivo)
+    try:
+        resp = llm.with_structured_output(supervisorSchema).invoke(sys_messages)
+        next_node = resp.get("nextNode", "investigator")
+        local_q = resp.get("localQuestion", uq)
+    except Exception:
+        next_node, local_q = "investigator", uq
+
+    return _post_route(state, next_node, local_q)
+
+async def supervisor_node_async(state: GraphState):
+    routed = _pre_route(state)
+    if routed is not None:
+        return routed
+
+    uq = (state.get("userQuestion") or "")
+    sys_messages = [SystemMessage(content=makeSupervisorPrompt(state))]
+
+    try:
+        resp = await llm.with_structured_output(supervisorSchema).ainvoke(sys_messages)
+        next_node = resp.get("nextNode", "investigator")
+        local_q = resp.get("localQuestion", uq)
+    except Exception:
+        next_node, local_q = "investigator", uq
+
+    return _post_route(state, next_node, local_q)
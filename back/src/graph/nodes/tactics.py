@@ -2,10 +2,12 @@
 import re
 import os
 import json
+from langchain_core.documents import Document
 from langchain_core.messages import AIMessage
 
 from src.graph.state import GraphState
 from src.graph.resources import llm, retriever, log
+from src.graph.retrieval import retrieve_many, aretrieve_many
 from src.utils.json_helpers import (
     extract_json_array,
     strip_first_json_fence,
@@ -13,13 +15,15 @@ from src.utils.json_helpers import (
     build_json_from_markdown,
 )
 from src.graph.utils import (
-    _dedupe_snippets,
+    PromptBudget,
     _clip_text,
     _push_turn,
     _json_only_repair_pass,
+    _json_only_repair_pass_async,
     _structured_tactics_fallback
 )
 from src.graph.consts import TACTICS_JSON_EXAMPLE
+from src.tactics_catalog import get_catalog
 
 def _guess_quality_attribute(text: str) -> str:
     low = (text or "").lower()
@@ -31,13 +35,13 @@ def _guess_quality_attribute(text: str) -> str:
     if "reliab" in low or "fault" in low:          return "reliability"
     return "performance"
 
-def tactics_node(state: GraphState) -> GraphState:
+def _tactics_inputs(state: GraphState) -> dict:
     lang = state.get("language", "es")
     directive = "Answer in English." if lang == "en" else "Responde en español."
     doc_only = bool(state.get("doc_only"))
     ctx_doc = (state.get("doc_context") or "").strip()
     ctx_add = (state.get("add_context") or "").strip()
-    ctx = (ctx_doc if (doc_only and ctx_doc) else ctx_add)[:2000]
+    ctx = ctx_doc if (doc_only and ctx_doc) else ctx_add  # se recorta en _tactics_prompt (PromptBudget)
 
     # 1) Tomamos el ASR actual (o lo inferimos del mensaje)
     asr_text = state.get("asr_text") or state.get("last_asr") or ""
@@ -50,36 +54,92 @@ def tactics_node(state: GraphState) -> GraphState:
     qa = state.get("quality_attribute") or _guess_quality_attribute(asr_text)
     # Estilo (si lo trae el flujo de ESTILOS)
     style_text = state.get("style") or state.get("selected_style") or state.get("last_style") or ""
+    return {
+        "directive": directive,
+        "doc_only": doc_only,
+        "ctx_doc": ctx_doc,
+        "ctx": ctx,
+        "asr_text": asr_text,
+        "qa": qa,
+        "style_text": style_text,
+    }
+
+def _grounding_queries(qa: str) -> list[str]:
+    return [
+        f"{qa} architectural tactics",
+        f"{qa} tactics performance scalability latency availability security modifiability",
+        "Bass Clements Kazman performance and scalability tactics",
+        "quality attribute tactics list"
+    ]
 
-    # 3) Contexto para grounding: DOC-ONLY → sin RAG; otro caso → RAG normal
-    docs_list = []
-    if doc_only and ctx_doc:
-        book_snippets = f"[DOC] {ctx_doc[:2000]}"
+def _add_grounding(gathered: list, seen: set, docs) -> bool:
+    """Agrega docs sin repetir (source_path, page); True cuando ya hay suficientes."""
+    for d in docs:
+        key = (d.metadata.get("source_path"), d.metadata.get("page"))
+        if key in seen:
+            continue
+        seen.add(key)
+        gathered.append(d)
+        if len(gathered) >= 6:
+            return True
+    return False
+
+def _catalog_grounding(qa: str):
+    """Grounding desde el catálogo offline (lookup por atributo); None si no hay entradas."""
+    catalog = get_catalog()
+    entries = catalog.for_quality_attribute(qa) if catalog else []
+    if not entries:
+        return None
+    lines, docs = [], []
+    for t in entries:
+        label = t.get("page_label") or t.get("page")
+        ref = f"{t.get('source_title')}, p.{label}" if label is not None else t.get("source_title")
+        lines.append(f"- {t['name']} [{t['category']}] ({ref}): {t['description']}")
+        docs.append(Document(page_content=t["description"], metadata={
+            "source_title": t.get("source_title"),
+            "page": t.get("page"),
+            "page_label": t.get("page_label"),
+            "source_path": t.get("source_path"),
+        }))
+    return "CANONICAL TACTICS (catalog):\n" + "\n".join(lines), docs
+
+def _validate_against_catalog(struct: list) -> list:
+    """Marca cada táctica propuesta con su nombre canónico del catálogo ("" si no hay)."""
+    catalog = get_catalog()
+    if not catalog:
+        return struct
+    for it in struct or []:
+        if not isinstance(it, dict):
+            continue
+        hit = catalog.match(it.get("name") or "")
+        it["catalog_match"] = hit["name"] if hit else ""
+        if hit and not it.get("categories"):
+            it["categories"] = [hit["category"]]
+    unmatched = [it.get("name") for it in struct or [] if isinstance(it, dict) and not it.get("catalog_match")]
+    if unmatched:
+        log.info("tactics not in catalog: %s", unmatched)
+    return struct
+
+def _tactics_prompt(inp: dict, book_snippets: str, rag_docs: list | None = None) -> str:
+    directive = inp["directive"]
+    qa = inp["qa"]
+    doc_grounded = book_snippets.startswith("[DOC]")
+    # presupuesto del nodo: ASR > estilo > grounding > contexto del proyecto
+    budget = (
+        PromptBudget("tactics")
+        .add("asr", inp["asr_text"], priority=0)
+        .add("style", inp["style_text"], priority=0, max_tokens=200)
+    )
+    if rag_docs is not None:
+        # chunks del retriever: cuenta con token_count del build
+        budget.add_docs("rag", rag_docs, priority=1, min_tokens=400, max_tokens=700, max_items=5)
     else:
-        try:
-            queries = [
-                f"{qa} architectural tactics",
-                f"{qa} tactics performance scalability latency availability security modifiability",
-                "Bass Clements Kazman performance and scalability tactics",
-                "quality attribute tactics list"
-            ]
-            seen = set()
-            gathered = []
-            for q in queries:
-                for d in retriever.invoke(q):
-                    key = (d.metadata.get("source_path"), d.metadata.get("page"))
-                    if key in seen:
-                        continue
-                    seen.add(key)
-                    gathered.append(d)
-                    if len(gathered) >= 6:
-                        break
-                if len(gathered) >= 6:
-                    break
-            docs_list = gathered
-        except Exception:
-            docs_list = []
-        book_snippets = _dedupe_snippets(docs_list, max_items=5, max_chars=600)
+        budget.add("rag", book_snippets, priority=1, min_tokens=400)
+    # en DOC-ONLY el documento ya va como GROUNDING: no se repite como contexto
+    parts = budget.add("context", "" if doc_grounded else inp["ctx"], priority=2, min_tokens=200).render()
+    asr_text, style_text, book_snippets = parts["asr"], parts["style"], parts["rag"]
+    ctx = "(see GROUNDING)" if doc_grounded else parts["context"]
+
     JSON_EXAMPLE = TACTICS_JSON_EXAMPLE
     # 4) Prompt: pedimos Markdown + JSON
     prompt = f"""{directive}
@@ -139,26 +199,17 @@ STRICT RULES:
 - Output EXACTLY 3 tactics — do not list more than 3.
 - Provide a numeric "success_probability" in [0,1] and a unique "rank" (1..3) consistent with the markdown ranking.
 """
-    resp = llm.invoke(prompt)
-    raw = getattr(resp, "content", str(resp)).strip()
+    return prompt
 
-    # LOG opcional (útil para depurar)
-    log.debug("tactics raw (first 400): %s", raw[:400].replace("\n"," "))
-    log.debug("has ```json fence? %s", bool(re.search(r"```json", raw, re.I)))
-
-    # 5) Parseo + reparación en cascada (solo helpers existentes)
-    struct = extract_json_array(raw) or []
-
-    if not (isinstance(struct, list) and struct):
-        struct = _json_only_repair_pass(
-            llm, asr_text=asr_text, qa=qa, style_text=style_text, md_preview=raw
-        ) or []
+def _tactics_finish(state: GraphState, inp: dict, prompt: str, raw: str, struct, docs_list: list) -> GraphState:
+    asr_text = inp["asr_text"]
+    qa = inp["qa"]
 
     if not (isinstance(struct, list) and struct):
         struct = build_json_from_markdown(raw, top_n=3)
 
     # Normaliza a TOP-3 + shape final
-    struct = normalize_tactics_json(struct, top_n=3)
+    struct = _validate_against_catalog(normalize_tactics_json(struct, top_n=3))
     log.info(
         "tactics_struct.len=%s names=%s",
         len(struct) if isinstance(struct, list) else 0,
@@ -223,3 +274,73 @@ STRICT RULES:
     state["nextNode"] = "unifier"
     prev_msgs = state.get("messages", [])
     return {**state, "messages": prev_msgs + msgs}
+
+def tactics_node(state: GraphState) -> GraphState:
+    inp = _tactics_inputs(state)
+
+    # 3) Contexto para grounding: DOC-ONLY → sin RAG; otro caso → RAG normal
+    docs_list, rag_docs, book_snippets = [], None, ""
+    if inp["doc_only"] and inp["ctx_doc"]:
+        book_snippets = f"[DOC] {inp['ctx_doc']}"
+    elif (grounded := _catalog_grounding(inp["qa"])) is not None:
+        book_snippets, docs_list = grounded  # catálogo offline: sin búsqueda vectorial
+    else:
+        try:
+            # las consultas van en paralelo; se agregan en orden hasta juntar suficientes
+            seen, gathered = set(), []
+            for docs in retrieve_many(retriever, _grounding_queries(inp["qa"])):
+                if _add_grounding(gathered, seen, docs):
+                    break
+            docs_list = gathered
+        except Exception:
+            docs_list = []
+        rag_docs = docs_list
+
+    prompt = _tactics_prompt(inp, book_snippets, rag_docs)
+    resp = llm.invoke(prompt)
+    raw = getattr(resp, "content", str(resp)).strip()
+
+    # LOG opcional (útil para depurar)
+    log.debug("tactics raw (first 400): %s", raw[:400].replace("\n"," "))
+    log.debug("has ```json fence? %s", bool(re.search(r"```json", raw, re.I)))
+
+    # 5) Parseo + reparación en cascada (solo helpers existentes)
+    struct = extract_json_array(raw) or []
+
+    if not (isinstance(struct, list) and struct):
+        struct = _json_only_repair_pass(
+            llm, asr_text=inp["asr_text"], qa=inp["qa"], style_text=inp["style_text"], md_preview=raw
+        ) or []
+
+    return _tactics_finish(state, inp, prompt, raw, struct, docs_list)
+
+async def tactics_node_async(state: GraphState) -> GraphState:
+    inp = _tactics_inputs(state)
+
+    docs_list, rag_docs, book_snippets = [], None, ""
+    if inp["doc_only"] and inp["ctx_doc"]:
+        book_snippets = f"[DOC] {inp['ctx_doc']}"
+    elif (grounded := _catalog_grounding(inp["qa"])) is not None:
+        book_snippets, docs_list = grounded
+    else:
+        try:
+            seen, gathered = set(), []
+            for docs in await aretrieve_many(retriever, _grounding_queries(inp["qa"])):
+                if _add_grounding(gathered, seen, docs):
+                    break
+            docs_list = gathered
+        except Exception:
+            docs_list = []
+        rag_docs = docs_list
+
+    prompt = _tactics_prompt(inp, book_snippets, rag_docs)
+    resp = await llm.ainvoke(prompt)
+    raw = getattr(resp, "content", str(resp)).strip()
+
+    struct = extract_json_array(raw) or []
+    if not (isinstance(struct, list) and struct):
+        struct = await _json_only_repair_pass_async(
+            llm, asr_text=inp["asr_text"], qa=inp["qa"], style_text=inp["style_text"], md_preview=raw
+        ) or []
+
+    return _tactics_finish(state, inp, prompt, raw, struct, docs_list)
@@ -3,13 +3,14 @@ import re
 import math
 from pathlib import Path
 from langchain_core.tools import tool
-from src.graph.resources import llm, retriever, _HAS_VERTEX, Image, GenerativeModel
+from src.graph.resources import llm, _HAS_VERTEX, Image, GenerativeModel
 from src.graph.state import investigatorSchema, evaluatorSchema
 from src.graph.consts import (
     EVAL_THEORY_PREFIX, EVAL_VIABILITY_PREFIX, 
     EVAL_NEEDS_PREFIX, ANALYZE_PREFIX
 )
 from src.graph.utils import _clip_text
+from src.rag_agent import multi_query_retrieve
 
 @tool
 def LLM(prompt: str) -> dict:
@@ -49,23 +50,11 @@ def local_RAG(prompt: str) -> str:
                      "scalability tactics", "architectural tactics performance"]
 
     queries = [q] + [f"{q} — {s}" for s in synonyms]
-    docs_all = []
-    seen_ids = set()
-
-    for qq in queries:
-        try:
-            for d in retriever.invoke(qq):
-                # Basic dedup by source+page
-                doc_id = f"{d.metadata.get('source_path')}_{d.metadata.get('page')}"
-                if doc_id not in seen_ids:
-                    seen_ids.add(doc_id)
-                    docs_all.append(d)
-                if len(docs_all) >= 8:
-                    break
-        except Exception:
-            pass
-        if len(docs_all) >= 8:
-            break
+    # Un solo embedding por lotes + una búsqueda; RRF y dedup por source+page
+    try:
+        docs_all = multi_query_retrieve(queries, k=6, limit=8)
+    except Exception:
+        docs_all = []
 
     # preview solo 2 y cada uno 400 chars
     preview = []
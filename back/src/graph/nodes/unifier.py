@@ -53,7 +53,8 @@ def _split_sections(text: str) -> dict:
         sections[k] = sections[k].strip()
     return sections
 
-def unifier_node(state: GraphState) -> GraphState:
+def _unifier_shortcut(state: GraphState) -> GraphState | None:
+    """Ramas que arman la respuesta final sin LLM (diagrama, estilo, tácticas, ASR, saludo)."""
     lang = state.get("language", "es")
     intent = state.get("intent", "general")
 
@@ -265,6 +266,12 @@ def unifier_node(state: GraphState) -> GraphState:
         state["suggestions"] = nexts
         return {**state, "endMessage": end_text}
 
+    return None
+
+def _unifier_prompt(state: GraphState) -> str:
+    lang = state.get("language", "es")
+    intent = state.get("intent", "general")
+
     # 🔵 Caso por defecto: síntesis de investigador / evaluador / etc.
     researcher_txt = _last_ai_by(state, "researcher")
     evaluator_txt = _last_ai_by(state, "evaluator")
@@ -315,8 +322,9 @@ RAG_SOURCES:
 SOURCE:
 {synthesis_source}
 """
+    return prompt
 
-    resp = llm.invoke(prompt)
+def _unifier_finish(state: GraphState, prompt: str, resp) -> GraphState:
     final_text = getattr(resp, "content", str(resp))
     final_text = _strip_all_markdown(final_text)
 
@@ -333,3 +341,17 @@ SOURCE:
     _push_turn(state, role="assistant", name="unifier", content=final_text)
 
     return {**state, "endMessage": final_text}
+
+def unifier_node(state: GraphState) -> GraphState:
+    done = _unifier_shortcut(state)
+    if done is not None:
+        return done
+    prompt = _unifier_prompt(state)
+    return _unifier_finish(state, prompt, llm.invoke(prompt))
+
+async def unifier_node_async(state: GraphState) -> GraphState:
+    done = _unifier_shortcut(state)
+    if done is not None:
+        return done
+    prompt = _unifier_prompt(state)
+    return _unifier_finish(state, prompt, await llm.ainvoke(prompt))
@@ -2,6 +2,7 @@
 import os
 import requests
 import logging
+import threading
 from pathlib import Path
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
@@ -10,22 +11,11 @@ from dotenv import load_dotenv, find_dotenv
 # Automatically find and load .env regardless of where the script is started
 load_dotenv(find_dotenv())
 
-from src.services.llm_factory import get_chat_model
-from src.rag_agent import get_retriever
-
-# (Opcional) GCP Vision for image compare – protegido con try/except
-try:
-    from vertexai.generative_models import GenerativeModel
-    from vertexai.preview.generative_models import Image
-    _HAS_VERTEX = True
-except Exception:
-    _HAS_VERTEX = False
-    GenerativeModel = None
-    Image = None
+from src.startup import timed
 
 # LangGraph builder + checkpointer
 from langgraph.graph import StateGraph
-from langgraph.checkpoint.memory import MemorySaver
+from src.graph.checkpoint import BoundedMemorySaver
 from src.graph.state import GraphState
 
 # Setup Logging
@@ -35,7 +25,36 @@ log = logging.getLogger("graph")
 
 # ========== Resources ==========
 
-llm = get_chat_model(temperature=0.0)
+# (Opcional) GCP Vision for image compare – el probe de vertexai (lento) se hace en el primer uso
+def _probe_vertex() -> dict:
+    with timed("vertexai.probe", "import"):
+        try:
+            from vertexai.generative_models import GenerativeModel
+            from vertexai.preview.generative_models import Image
+            return {"_HAS_VERTEX": True, "GenerativeModel": GenerativeModel, "Image": Image}
+        except Exception:
+            return {"_HAS_VERTEX": False, "GenerativeModel": None, "Image": None}
+
+def _make_llm():
+    with timed("llm.default", "init"):
+        from src.services.llm_factory import get_chat_model
+        return get_chat_model(temperature=0.0)
+
+# `from src.graph.resources import llm / _HAS_VERTEX / Image / GenerativeModel` se resuelve
+# aquí la primera vez (los nodos se importan en su primer uso con FAST_START)
+_LAZY = {"llm": lambda: {"llm": _make_llm()}, "_HAS_VERTEX": _probe_vertex,
+         "GenerativeModel": _probe_vertex, "Image": _probe_vertex}
+
+_LAZY_LOCK = threading.Lock()
+
+def __getattr__(name):
+    make = _LAZY.get(name)
+    if make is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _LAZY_LOCK:
+        if name not in globals():
+            globals().update(make())
+    return globals()[name]
 
 # Lazy retriever: initialized on first access to avoid import-time OpenAI errors
 _retriever = None
@@ -43,6 +62,7 @@ _retriever = None
 def _get_retriever():
     global _retriever
     if _retriever is None:
+        from src.rag_agent import get_retriever
         _retriever = get_retriever()
     return _retriever
 
@@ -53,11 +73,13 @@ class _LazyRetriever:
         return getattr(_get_retriever(), name)
     def invoke(self, *a, **kw):
         return _get_retriever().invoke(*a, **kw)
+    async def ainvoke(self, *a, **kw):
+        return await _get_retriever().ainvoke(*a, **kw)
 
 retriever = _LazyRetriever()
 
-# State-graph builder & checkpointer
-sqlite_saver = MemorySaver()
+# State-graph builder & checkpointer (acotado: CHECKPOINT_MAX_THREADS / _MAX_PER_THREAD / _TTL_SECONDS / _SPILL_DB)
+sqlite_saver = BoundedMemorySaver.from_env()
 builder = StateGraph(GraphState)
 
 # Sesión HTTP con retries y timeouts
@@ -0,0 +1,77 @@
+# src/graph/retrieval.py
+"""
+Fan-out concurrente de consultas al retriever para los nodos del grafo.
+
+- retrieve_many: pool de hilos acotado (nodos sync).
+- aretrieve_many: asyncio.gather con semáforo (nodos async).
+
+Las consultas corren en paralelo con un plazo común (RETRIEVAL_TIMEOUT_S); la que
+falla o no llega a tiempo devuelve [] y el resto se usa igual (resultados parciales).
+El resultado conserva el orden de `queries`.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, Sequence
+
+from langchain_core.documents import Document
+
+log = logging.getLogger("retrieval")
+
+RETRIEVAL_TIMEOUT_S = float(os.getenv("RETRIEVAL_TIMEOUT_S", "8"))
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval")
+
+
+def retrieve_many(retriever, queries: Sequence[str], timeout: Optional[float] = None) -> list[list[Document]]:
+    """Corre retriever.invoke para cada consulta en paralelo; [] para las que fallan o vencen."""
+    timeout = RETRIEVAL_TIMEOUT_S if timeout is None else timeout
+    # cada hilo hereda el contexto (config/callbacks de LangChain) del nodo
+    futures = [
+        _executor.submit(contextvars.copy_context().run, retriever.invoke, q)
+        for q in queries
+    ]
+    deadline = time.monotonic() + timeout
+    out: list[list[Document]] = []
+    for q, fut in zip(queries, futures):
+        try:
+            out.append(list(fut.result(timeout=max(0.0, deadline - time.monotonic()))))
+        except FutureTimeout:
+            fut.cancel()
+            log.warning("[retrieval] timeout (%.1fs): %s", timeout, q[:80])
+            out.append([])
+        except Exception as e:
+            log.warning("[retrieval] falló %r: %s", q[:80], e)
+            out.append([])
+    return out
+
+
+async def aretrieve_many(retriever, queries: Sequence[str], timeout: Optional[float] = None) -> list[list[Document]]:
+    """Versión async: retriever.ainvoke concurrente con el mismo plazo y fallback parcial."""
+    timeout = RETRIEVAL_TIMEOUT_S if timeout is None else timeout
+    sem = asyncio.Semaphore(RETRIEVAL_MAX_WORKERS)
+
+    async def _one(q: str) -> list[Document]:
+        async with sem:
+            return list(await retriever.ainvoke(q))
+
+    results = await asyncio.gather(
+        *(asyncio.wait_for(_one(q), timeout) for q in queries), return_exceptions=True
+    )
+    out: list[list[Document]] = []
+    for q, res in zip(queries, results):
+        if isinstance(res, BaseException):
+            if isinstance(res, asyncio.TimeoutError):
+                log.warning("[retrieval] timeout (%.1fs): %s", timeout, q[:80])
+            else:
+                log.warning("[retrieval] falló %r: %s", q[:80], res)
+            out.append([])
+        else:
+            out.append(res)
+    return out
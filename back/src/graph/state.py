@@ -153,6 +153,10 @@ class GraphState(TypedDict):
     intent: Literal["general","greeting","smalltalk","architecture","diagram","asr","tactics","style"]
     force_rag: bool
 
+    # fast-path router: ruta decidida sin classifier/supervisor (LLM)
+    fast_path: bool
+    llm_calls_avoided: int
+
     # etapa actual del pipeline ASR -> estilos -> tacticas -> despliegue
     arch_stage: str
     quality_attribute: str
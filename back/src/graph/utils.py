@@ -1,9 +1,11 @@
 
+import os
 import re
 import json
 import logging
-import tiktoken
+from functools import lru_cache
 from typing import Any
+from langgraph.constants import TAG_NOSTREAM
 from src.utils.json_helpers import extract_json_array
 from src.graph.consts import TACTICS_HEADINGS
 from src.graph.state import GraphState, TACTICS_ARRAY_SCHEMA
@@ -18,20 +20,47 @@ def _push_turn(state: GraphState, role: str, name: str, content: str) -> None:
 
 
 # ========== Token utils (soft) ==========
-try:
-    _enc = tiktoken.encoding_for_model("gpt-4o")
-    def _count_tokens(text: str) -> int:
-        return len(_enc.encode(text or ""))
-except Exception:
-    def _count_tokens(text: str) -> int:
-        # aproximación si no hay tiktoken
-        return max(1, int(len(text or "") / 3))
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken se carga en el primer conteo (no al importar); None si no está disponible."""
+    from src.startup import timed
+    with timed("tiktoken.encoding", "import"):
+        from src.utils.tokens import load_encoding
+        return load_encoding()  # None sin tiktoken: aproximación de 3 chars/token
+
+@lru_cache(maxsize=32)
+def _token_ids(text: str) -> tuple:
+    # memoizado: el mismo contexto/ASR se cuenta y recorta varias veces por turno. Caché
+    # chica a propósito: las claves son prompts enteros (contexto, historial) y quedan vivas
+    return tuple(_encoding().encode(text))
+
+def _count_tokens(text: str) -> int:
+    text = text or ""
+    if _encoding() is None:
+        return max(1, int(len(text) / 3))
+    return len(_token_ids(text))
+
+def _trim_tokens(text: str, max_tokens: int) -> str:
+    """Recorta en frontera de token; si se puede, cierra en el último fin de frase."""
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    # cada token ocupa >= 1 byte: si cabe en bytes, cabe en tokens (sin tokenizar)
+    if len(text.encode("utf-8")) <= max_tokens or _count_tokens(text) <= max_tokens:
+        return text
+    enc = _encoding()
+    if enc is None:
+        cut = text[: max_tokens * 3]
+    else:
+        cut = enc.decode(list(_token_ids(text)[:max_tokens - 1]))  # 1 token para "…"
+    # evita cortar a mitad de frase si se pierde poco (último 25%)
+    end = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("\n"))
+    if end >= int(len(cut) * 0.75):
+        cut = cut[: end + 1]
+    return cut.rstrip() + "…"
 
 def _clip_text(text: str, max_tokens: int) -> str:
-    if _count_tokens(text) <= max_tokens:
-        return text
-    target_chars = max(100, int(max_tokens * 3))  # 3 chars/token aprox
-    return (text or "")[:target_chars] + "…"
+    return _trim_tokens(text, max_tokens)
 
 def _clip_lines(lines: list[str], max_tokens: int) -> list[str]:
     out, total = [], 0
@@ -42,6 +71,150 @@ def _clip_lines(lines: list[str], max_tokens: int) -> list[str]:
         total += t
     return out
 
+# ========== Prompt budget ==========
+# Tokens totales para las secciones variables del prompt de cada nodo (la plantilla fija
+# no cuenta). Se sobreescriben con PROMPT_BUDGET_<NODO>, p.ej. PROMPT_BUDGET_TACTICS=3000.
+NODE_BUDGETS = {
+    "asr": 2000,
+    "tactics": 2200,
+    "evaluator": 1600,
+    "investigator": 3000,
+}
+
+def _node_budget(node: str) -> int:
+    return int(os.getenv(f"PROMPT_BUDGET_{node.upper()}", str(NODE_BUDGETS.get(node, 2000))))
+
+class PromptBudget:
+    """
+    Reparte el presupuesto de tokens de un nodo entre secciones con nombre
+    (asr, context, rag, history...). priority: 0 = más importante.
+
+    1) cada sección recibe su min_tokens (por prioridad, mientras alcance);
+    2) el resto se asigna por prioridad hasta cubrir lo que pide cada una
+       (acotado por max_tokens); dentro de una misma prioridad se reparte en
+       partes iguales (una sección larga no deja sin nada a las demás).
+    Los textos se recortan en frontera de token; el historial descarta los
+    mensajes más viejos; los chunks (add_docs) se cuentan con su token_count
+    y se descartan los menos relevantes. render() devuelve {nombre: texto | lista} y loguea el uso.
+    """
+
+    def __init__(self, node: str, total: int | None = None):
+        self.node = node
+        self.total = _node_budget(node) if total is None else int(total)
+        self._sections: list[dict] = []
+        self.usage: dict[str, tuple[int, int]] = {}  # nombre -> (usados, pedidos)
+
+    def add(self, name: str, text: str, priority: int = 1, min_tokens: int = 0,
+            max_tokens: int | None = None) -> "PromptBudget":
+        text = (text or "").strip()
+        self._sections.append({"name": name, "text": text, "msgs": None, "docs": None, "priority": priority,
+                               "min": min_tokens, "max": max_tokens, "need": _count_tokens(text) if text else 0})
+        return self
+
+    def add_docs(self, name: str, docs: list, priority: int = 1, min_tokens: int = 0,
+                 max_tokens: int | None = None, max_items: int = 6) -> "PromptBudget":
+        """Chunks del retriever: se cuentan con su token_count del build (sin tokenizar).
+
+        El texto va tal cual (page_content): el token_count es del chunk sin modificar.
+        """
+        seen, items = set(), []
+        for d in docs or []:
+            t = getattr(d, "page_content", "") or ""
+            key = " ".join(t.split())  # duplicados que solo difieren en espacios / saltos
+            if key and key not in seen:
+                seen.add(key)
+                items.append((t, _doc_tokens(d)))
+            if len(items) >= max_items:
+                break
+        self._sections.append({"name": name, "text": None, "msgs": None, "docs": items, "priority": priority,
+                               "min": min_tokens, "max": max_tokens, "need": sum(n for _, n in items)})
+        return self
+
+    def add_messages(self, name: str, msgs: list, priority: int = 1, min_tokens: int = 0,
+                     max_tokens: int | None = None) -> "PromptBudget":
+        msgs = list(msgs or [])
+        sizes = [_count_tokens(str(getattr(m, "content", m) or "")) for m in msgs]
+        self._sections.append({"name": name, "text": None, "msgs": (msgs, sizes), "docs": None, "priority": priority,
+                               "min": min_tokens, "max": max_tokens, "need": sum(sizes)})
+        return self
+
+    def _allocate(self) -> dict[str, int]:
+        order = sorted(self._sections, key=lambda s: s["priority"])  # estable: respeta el orden de add()
+        left = self.total
+        alloc = {s["name"]: 0 for s in order}
+        wants = {s["name"]: min(s["need"], s["max"] if s["max"] is not None else s["need"]) for s in order}
+        for s in order:
+            got = min(s["min"], wants[s["name"]], left)
+            alloc[s["name"]] = got
+            left -= got
+        for prio in sorted({s["priority"] for s in order}):
+            if left <= 0:
+                break
+            left = self._share(order, prio, wants, alloc, left)
+        return alloc
+
+    @staticmethod
+    def _share(order: list[dict], prio: int, wants: dict, alloc: dict, left: int) -> int:
+        # reparto max-min: partes iguales; lo que no usa una sección chica pasa a las demás
+        active = [s["name"] for s in order if s["priority"] == prio and wants[s["name"]] > alloc[s["name"]]]
+        while active and left > 0:
+            share = max(1, left // len(active))
+            for name in list(active):
+                got = min(wants[name] - alloc[name], share, left)
+                alloc[name] += got
+                left -= got
+                if alloc[name] >= wants[name]:
+                    active.remove(name)
+        return left
+
+    @staticmethod
+    def _fit_messages(msgs: list, sizes: list[int], limit: int) -> list:
+        # de más nuevo a más viejo; el último mensaje (la pregunta) se conserva siempre
+        keep, total = [], 0
+        for m, n in zip(reversed(msgs), reversed(sizes)):
+            if keep and total + n > limit:
+                break
+            keep.append(m)
+            total += n
+        return list(reversed(keep))
+
+    @staticmethod
+    def _fit_docs(items: list[tuple[str, int]], limit: int) -> tuple[str, int]:
+        # en orden de relevancia; solo se tokeniza el chunk que queda cortado
+        out, total = [], 0
+        for t, n in items:
+            if total + n > limit:
+                if limit - total >= 48:
+                    cut = _trim_tokens(t, limit - total)
+                    out.append(cut)
+                    total += _count_tokens(cut)
+                break
+            out.append(t)
+            total += n
+        return "\n\n".join(out), total
+
+    def render(self) -> dict[str, Any]:
+        alloc = self._allocate()
+        out: dict[str, Any] = {}
+        for s in self._sections:
+            name, limit = s["name"], alloc[s["name"]]
+            if s["msgs"] is not None:
+                msgs, sizes = s["msgs"]
+                out[name] = self._fit_messages(msgs, sizes, limit)
+                used = sum(n for m, n in zip(msgs, sizes) if any(m is k for k in out[name]))
+            elif s["docs"] is not None:
+                out[name], used = self._fit_docs(s["docs"], limit)
+            else:
+                out[name] = _trim_tokens(s["text"], limit) if s["text"] else ""
+                used = _count_tokens(out[name]) if out[name] else 0
+            self.usage[name] = (used, s["need"])
+        log.info(
+            "prompt_budget node=%s total=%d used=%d %s",
+            self.node, self.total, sum(u for u, _ in self.usage.values()),
+            " ".join(f"{n}={u}/{w}" + ("(trim)" if u < w else "") for n, (u, w) in self.usage.items()),
+        )
+        return out
+
 def _last_k_messages(msgs, k=6):
     # Mantén solo los últimos K mensajes de usuario/asistente (sin repetir system)
     core = [m for m in msgs if getattr(m, "type", "") != "system"]
@@ -102,10 +275,8 @@ def _structured_tactics_fallback(llm, asr_text: str, qa: str, style_text: str):
         log.warning("structured tactics fallback failed: %s", e)
     return None
 
-def _json_only_repair_pass(llm, *, asr_text: str, qa: str, style_text: str, md_preview: str):
-    """Second-chance: ask the LLM to emit ONLY a JSON array of 3 tactics,
-    using the markdown preview it already produced as context."""
-    prompt = (
+def _json_repair_prompt(*, asr_text: str, qa: str, style_text: str, md_preview: str) -> str:
+    return (
         "The following text should contain a JSON array of EXACTLY 3 architecture tactics "
         "but the JSON could not be parsed.\n\n"
         f"--- ORIGINAL TEXT (first 1500 chars) ---\n{md_preview[:1500]}\n---\n\n"
@@ -114,12 +285,29 @@ def _json_only_repair_pass(llm, *, asr_text: str, qa: str, style_text: str, md_p
         "Each object must have at minimum: name, rationale, categories (array), "
         "success_probability (float 0-1), rank (int 1-3)."
     )
+
+def _parse_repair(result):
+    raw = getattr(result, "content", str(result)).strip()
+    arr = json.loads(raw)
+    if isinstance(arr, list) and len(arr) >= 1:
+        return arr
+    return None
+
+def _json_only_repair_pass(llm, *, asr_text: str, qa: str, style_text: str, md_preview: str):
+    """Second-chance: ask the LLM to emit ONLY a JSON array of 3 tactics,
+    using the markdown preview it already produced as context.
+    Tagged nostream: its tokens are not part of the answer streamed by /message/stream."""
+    prompt = _json_repair_prompt(asr_text=asr_text, qa=qa, style_text=style_text, md_preview=md_preview)
     try:
-        result = llm.invoke(prompt)
-        raw = getattr(result, "content", str(result)).strip()
-        arr = json.loads(raw)
-        if isinstance(arr, list) and len(arr) >= 1:
-            return arr
+        return _parse_repair(llm.with_config(tags=[TAG_NOSTREAM]).invoke(prompt))
+    except Exception as e:
+        log.warning("_json_only_repair_pass failed: %s", e)
+    return None
+
+async def _json_only_repair_pass_async(llm, *, asr_text: str, qa: str, style_text: str, md_preview: str):
+    prompt = _json_repair_prompt(asr_text=asr_text, qa=qa, style_text=style_text, md_preview=md_preview)
+    try:
+        return _parse_repair(await llm.with_config(tags=[TAG_NOSTREAM]).ainvoke(prompt))
     except Exception as e:
         log.warning("_json_only_repair_pass failed: %s", e)
     return None
@@ -139,18 +327,14 @@ def _sanitize_plain_text(txt: str) -> str:
     txt = re.sub(r"\n{3,}", "\n\n", txt)
     return txt.strip()
 
-def _dedupe_snippets(docs_list, max_items=3, max_chars=400) -> str:
-    """Toma documentos del retriever y arma texto sin duplicados/ruido."""
-    seen, out = set(), []
-    for d in docs_list:
-        t = (d.page_content or "").strip().replace("\n", " ")
-        t = t[:max_chars]
-        if t and t not in seen:
-            seen.add(t)
-            out.append(t)
-        if len(out) >= max_items:
-            break
-    return "\n\n".join(out)
+def _doc_tokens(d) -> int:
+    """Tokens del chunk: token_count guardado en el build (si es del mismo encoding) o se cuenta."""
+    from src.utils.tokens import TOKEN_ENCODING
+    md = getattr(d, "metadata", None) or {}
+    n = md.get("token_count")
+    if isinstance(n, int) and n >= 0 and md.get("token_encoding") == TOKEN_ENCODING:
+        return n
+    return _count_tokens(getattr(d, "page_content", "") or "")
 
 def _sanitize_mermaid(code: str) -> str:
     if not code:
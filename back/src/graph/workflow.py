@@ -1,21 +1,46 @@
 
+import asyncio
+import importlib
+import logging
+import os
+import re
+import sys
 from typing import Literal
 
 from langgraph.graph import StateGraph, START, END
+from langchain_core.runnables import RunnableLambda
 
 from src.graph.state import GraphState
 from src.graph.resources import sqlite_saver, builder
+from src.startup import FAST_START, timed
 
-from src.graph.nodes.classifier import classifier_node
-from src.graph.nodes.supervisor import supervisor_node
-from src.graph.nodes.investigator import researcher_node
-from src.graph.nodes.creator import creator_node
-from src.graph.nodes.diagram import diagram_orchestrator_node
-from src.graph.nodes.evaluator import evaluator_node
-from src.graph.nodes.unifier import unifier_node
-from src.graph.nodes.asr import asr_node
-from src.graph.nodes.style import style_node
-from src.graph.nodes.tactics import tactics_node
+log = logging.getLogger("graph")
+
+# Nodos: nombre -> (módulo en src.graph.nodes, función sync, función async).
+# Con FAST_START cada módulo (y sus clientes LLM / vertex / tiktoken) se importa en su primer uso.
+NODES = {
+    "classifier": ("classifier", "classifier_node", "classifier_node_async"),
+    "supervisor": ("supervisor", "supervisor_node", "supervisor_node_async"),
+    "investigator": ("investigator", "researcher_node", "researcher_node_async"),
+    "creator": ("creator", "creator_node", "creator_node_async"),
+    "diagram_agent": ("diagram", "diagram_orchestrator_node", "diagram_orchestrator_node_async"),  # Orquestador
+    "evaluator": ("evaluator", "evaluator_node", "evaluator_node_async"),
+    "unifier": ("unifier", "unifier_node", "unifier_node_async"),
+    "asr": ("asr", "asr_node", "asr_node_async"),
+    "style": ("style", "style_node", "style_node_async"),
+    "tactics": ("tactics", "tactics_node", "tactics_node_async"),
+}
+
+def _node_module(mod: str):
+    full = f"src.graph.nodes.{mod}"
+    if full in sys.modules:
+        # import_module (no sys.modules directo): espera si otro hilo lo está importando
+        return importlib.import_module(full)
+    with timed(f"node.{mod}", "import"):
+        return importlib.import_module(full)
+
+# FAST_ROUTER=0 vuelve al camino classifier -> supervisor (LLM) en todos los turnos
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER", "1") != "0"
 
 def boot_node(state: GraphState) -> GraphState:
     """Resetea banderas y buffers al inicio de cada turno (sin borrar last_asr)."""
@@ -29,8 +54,70 @@ def boot_node(state: GraphState) -> GraphState:
         "mermaidCode": "",
         "diagram": {},
         "endMessage": "",
+        "fast_path": False,
+        "llm_calls_avoided": 0,
     }
 
+# ========== Fast-path router (sin LLM)
+
+GREETING_RE = re.compile(
+    r"^\s*[¡!¿]*\s*(hola|hello|hi|hey|saludos|buenas|buenas tardes|buenas noches|buenos d[ií]as|"
+    r"good (morning|afternoon|evening)|qu[eé] tal)\s*[!¡?¿.,]*\s*$",
+    re.I,
+)
+
+def _visited_any(state: GraphState) -> bool:
+    return any(state.get(k) for k in (
+        "hasVisitedInvestigator", "hasVisitedCreator", "hasVisitedEvaluator",
+        "hasVisitedASR", "hasVisitedDiagram",
+    ))
+
+def _fast_route(state: GraphState) -> tuple[GraphState, str] | None:
+    """Ruta determinista para casos claros: (estado ruteado, tipo de regla) o None si es ambiguo.
+
+    Solo decide con los saludos y con _pre_route (intención forzada por main.py u override
+    por palabras clave del classifier): ahí la salida de los LLM se iba a descartar igual.
+    """
+    classifier, supervisor = _node_module("classifier"), _node_module("supervisor")
+    uq = state.get("userQuestion") or ""
+    lang = "es" if supervisor.detect_lang(uq) == "es" else "en"
+
+    if GREETING_RE.match(uq):
+        return {**state, "intent": "greeting", "nextNode": "unifier",
+                "localQuestion": uq, "language": lang}, "greeting"
+
+    # intención forzada por main.py + overrides por palabras clave del classifier
+    intent = state.get("intent", "general") or "general"
+    intent = classifier._keyword_intent(uq.lower(), intent)
+
+    # intención forzada / evaluación de ASR: el supervisor no llama al LLM.
+    # Las demás palabras clave (_keyword_route) dependen del estado que deja el classifier
+    # (force_rag, idioma): ese caso sigue por classifier -> supervisor.
+    routed = supervisor._pre_route({**state, "intent": intent})
+    if routed is not None:
+        return routed, "forced"
+    return None
+
+def fast_router_node(state: GraphState) -> GraphState:
+    """Evita classifier/supervisor (LLM) cuando la ruta es obvia; cuenta las llamadas evitadas."""
+    if not FAST_ROUTER_ENABLED:
+        return {**state, "fast_path": False}
+
+    reentry = bool(state.get("fast_path")) and _visited_any(state)
+    out = _fast_route(state)
+    if out is None:
+        if reentry:
+            log.info("[fast_router] sin ruta determinista al volver del worker; sigue el supervisor")
+        return {**state, "fast_path": False}
+
+    routed, kind = out
+    # classifier (solo en la primera pasada) + supervisor (si hubiera llamado al LLM)
+    avoided = (0 if reentry else 1) + (0 if kind == "forced" else 1)
+    total = (state.get("llm_calls_avoided") or 0) + avoided
+    log.info("[fast_router] %s -> %s (LLM calls avoided this turn: %d)",
+             kind, routed.get("nextNode"), total)
+    return {**routed, "fast_path": True, "llm_calls_avoided": total}
+
 def router(state: GraphState) -> Literal["investigator","creator","evaluator","diagram_agent","tactics","asr","style","unifier"]:
     if state["nextNode"] == "unifier":
         return "unifier"
@@ -60,29 +147,49 @@ def router(state: GraphState) -> Literal["investigator","creator","evaluator","d
     else:
         return "unifier"
 
+def after_fast_router(state: GraphState) -> Literal["classifier","supervisor","investigator","creator","evaluator","diagram_agent","tactics","asr","style","unifier"]:
+    if state.get("fast_path"):
+        return router(state)
+    # camino LLM: turno nuevo -> classifier; vuelta de un worker -> supervisor
+    return "supervisor" if _visited_any(state) else "classifier"
+
+def after_worker(state: GraphState) -> Literal["fast_router","supervisor"]:
+    return "fast_router" if state.get("fast_path") else "supervisor"
+
+def _dual(name: str, mod: str, fn: str, afn: str) -> RunnableLambda:
+    """Nodo con variante sync (graph.invoke) y async (graph.ainvoke / astream)."""
+    if not FAST_START:
+        m = _node_module(mod)
+        return RunnableLambda(getattr(m, fn), afunc=getattr(m, afn), name=name)
+
+    def _sync(state: GraphState) -> GraphState:
+        return getattr(_node_module(mod), fn)(state)
+
+    async def _async(state: GraphState) -> GraphState:
+        # el primer import es pesado: fuera del event loop
+        full = f"src.graph.nodes.{mod}"
+        m = importlib.import_module(full) if full in sys.modules else await asyncio.to_thread(_node_module, mod)
+        return await getattr(m, afn)(state)
+
+    return RunnableLambda(_sync, afunc=_async, name=name)
+
 # ========== Wiring
 
-builder.add_node("classifier", classifier_node)
-builder.add_node("supervisor", supervisor_node)
-builder.add_node("investigator", researcher_node)
-builder.add_node("creator", creator_node)
-builder.add_node("diagram_agent", diagram_orchestrator_node)  # Orquestador
-builder.add_node("evaluator", evaluator_node)
-builder.add_node("unifier", unifier_node)
-builder.add_node("asr", asr_node)
-builder.add_node("style", style_node) 
-builder.add_node("tactics", tactics_node)
+for _name, (_mod, _fn, _afn) in NODES.items():
+    builder.add_node(_name, _dual(_name, _mod, _fn, _afn))
 
 
 builder.add_node("boot", boot_node)
+builder.add_node("fast_router", fast_router_node)
 builder.add_edge(START, "boot")
-builder.add_edge("boot", "classifier")
+builder.add_edge("boot", "fast_router")
+builder.add_conditional_edges("fast_router", after_fast_router)
 builder.add_edge("classifier", "supervisor")
 builder.add_conditional_edges("supervisor", router)
-builder.add_edge("investigator", "supervisor")
-builder.add_edge("creator", "supervisor")
-builder.add_edge("diagram_agent", "supervisor")
-builder.add_edge("evaluator", "supervisor")
+builder.add_conditional_edges("investigator", after_worker)
+builder.add_conditional_edges("creator", after_worker)
+builder.add_conditional_edges("diagram_agent", after_worker)
+builder.add_conditional_edges("evaluator", after_worker)
 builder.add_edge("asr", "unifier")
 builder.add_edge("style", "unifier")
 builder.add_edge("tactics", "unifier")
@@ -3,29 +3,69 @@
 from typing import Optional
 from pathlib import Path
 
-import os, re, sqlite3, base64
+import os, re, json, base64, asyncio, time
+
+from src.startup import FAST_START, timed, record as record_startup, report as startup_report
 
 from dotenv import load_dotenv
 _ENV_PATH = Path(__file__).resolve().parent / ".env"
 load_dotenv(_ENV_PATH)
 
-from fastapi import UploadFile, File, Form, HTTPException, Request, FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+with timed("fastapi", "import"):
+    from fastapi import UploadFile, File, Form, HTTPException, Request, FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 
 
-from langchain_core.messages import HumanMessage
-from src.graph import graph
-from src.rag_agent import create_or_load_vectorstore
-from src.memory import (
-    init as memory_init,
-    get as memory_get,
-    set_kv as memory_set,
-    load_arch_flow,
-    save_arch_flow,
-)
-from src.services.doc_ingest import extract_pdf_text
-memory_init()
+with timed("langgraph.checkpoint", "import"):
+    from langchain_core.messages import HumanMessage
+    from src.graph import get_graph, graph_ready
+    from src.graph.resources import sqlite_saver
+    from src.graph.checkpoint import CHECKPOINTER, open_checkpointer
+with timed("rag_agent", "import"):
+    from src.rag_agent import create_or_load_vectorstore, get_retrieval_cache, hybrid_stats
+with timed("services", "import"):
+    from src.memory import (
+        init as memory_init,
+        MemorySession,
+        pool_stats as memory_pool_stats,
+    )
+    from src.services.doc_ingest import extract_pdf_text
+    from src.feedback import FeedbackStore
+    from src.services.llm_cache import get_llm_cache
+    from src.services.llm_factory import llm_client_stats
+    from src.services.single_flight import single_flight_stats
+    from src.services.embedding_cache import get_embedding_store
+    from src.warmup import WARMUP_ENABLED, warmup
+with timed("memory.init", "init"):
+    memory_init()
+
+# Grafo activo: se compila en el lifespan (en segundo plano con FAST_START) y se liga al
+# checkpointer persistente si CHECKPOINTER != memory
+graph = None
+_graph_task: "asyncio.Task | None" = None
+_saver = None
+if not FAST_START:
+    get_graph()  # modo anterior: nodos importados y grafo compilado al importar
+
+def _bind_graph():
+    g = get_graph()
+    return g.copy(update={"checkpointer": _saver}) if _saver is not None else g
+
+async def _active_graph():
+    """Grafo listo para usar; si la compilación en segundo plano no terminó, la espera."""
+    global graph, _graph_task
+    if graph is None:
+        try:
+            if _graph_task is not None:
+                graph = await asyncio.shield(_graph_task)
+            else:
+                graph = await asyncio.to_thread(_bind_graph)
+        except Exception:
+            _graph_task = None  # el próximo request reintenta
+            raise
+    return graph
 
 # ===================== Detección simple de idioma (ES/EN) ==========================
 def detect_lang(q: str) -> str:
@@ -38,13 +78,47 @@ def detect_lang(q: str) -> str:
 # ===================== Lifespan ==========================
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    try:
-        create_or_load_vectorstore()
-        print("[startup] RAG listo")
-    except Exception as e:
-        print(f"[startup] RAG init omitido: {e}")
-    yield
-    print("[shutdown] Cerrando app...")
+    global graph, _graph_task, _saver
+
+    def _init_rag():
+        try:
+            with timed("rag.vectorstore", "init"):
+                create_or_load_vectorstore()
+            print("[startup] RAG listo")
+        except Exception as e:
+            print(f"[startup] RAG init omitido: {e}")
+
+    # con FAST_START el worker acepta requests mientras Chroma se abre en segundo plano
+    rag_task = asyncio.create_task(asyncio.to_thread(_init_rag)) if FAST_START else None
+    if rag_task is None:
+        _init_rag()
+
+    # Checkpointer compartido entre workers (sqlite WAL / postgres); se cierra al apagar
+    t_ckpt = time.perf_counter()
+    async with open_checkpointer() as saver:
+        record_startup("checkpointer.open", (time.perf_counter() - t_ckpt) * 1000)
+        _saver = saver
+        print(f"[startup] checkpointer: {CHECKPOINTER if saver is not None else 'memory'}")
+        if FAST_START:
+            _graph_task = asyncio.create_task(asyncio.to_thread(_bind_graph))  # compila en segundo plano
+        else:
+            graph = _bind_graph()
+        await feedback_store.start()
+        # warm-up (LLM, embeddings, vector store, tokenizer) en segundo plano; /ready da 200 al terminar
+        warmup_task = asyncio.create_task(warmup.arun()) if WARMUP_ENABLED else None
+        if warmup_task is None:
+            warmup.skip()
+        try:
+            yield
+        finally:
+            await feedback_store.stop()  # vacía los feedback pendientes
+            if warmup_task is not None and not warmup_task.done():
+                warmup_task.cancel()  # el hilo termina solo; no se espera a una llamada colgada
+            for t in (rag_task, _graph_task):
+                if t is not None and not t.done():
+                    await asyncio.gather(t, return_exceptions=True)
+            graph, _graph_task, _saver = None, None, None
+            print("[shutdown] Cerrando app...")
 
 # Una sola instancia de FastAPI
 app = FastAPI(title="ArquIA API", lifespan=lifespan)
@@ -61,43 +135,8 @@ FEEDBACK_DIR.mkdir(parents=True, exist_ok=True)
 FEEDBACK_DB_PATH = FEEDBACK_DIR / "feedback.db"
 
 # ===================== DB Feedback ======================
-def init_feedback_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(FEEDBACK_DB_PATH), check_same_thread=False)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS message_feedback (
-            session_id   TEXT NOT NULL,
-            message_id   INTEGER NOT NULL,
-            thumbs_up    INTEGER DEFAULT 0,
-            thumbs_down  INTEGER DEFAULT 0,
-            PRIMARY KEY (session_id, message_id)
-        )
-        """
-    )
-    conn.commit()
-    return conn
-
-feedback_conn = init_feedback_db()
-
-def get_next_message_id(session_id: str) -> int:
-    cur = feedback_conn.cursor()
-    cur.execute("SELECT MAX(message_id) FROM message_feedback WHERE session_id = ?", (session_id,))
-    row = cur.fetchone()
-    return (row[0] or 0) + 1
-
-def upsert_feedback(session_id: str, message_id: int, up: int = 0, down: int = 0):
-    feedback_conn.execute(
-        "INSERT OR REPLACE INTO message_feedback (session_id, message_id, thumbs_up, thumbs_down) VALUES (?, ?, ?, ?)",
-        (session_id, message_id, up, down),
-    )
-    feedback_conn.commit()
-
-def update_feedback(session_id: str, message_id: int, up: int, down: int):
-    feedback_conn.execute(
-        "UPDATE message_feedback SET thumbs_up = ?, thumbs_down = ? WHERE session_id = ? AND message_id = ?",
-        (up, down, session_id, message_id),
-    )
-    feedback_conn.commit()
+# IDs por sesión en memoria + writer en segundo plano (start/stop en el lifespan)
+feedback_store = FeedbackStore(FEEDBACK_DB_PATH)
 
 # ===================== CORS ==============================
 app.add_middleware(
@@ -228,15 +267,48 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Readiness para el balanceador: 503 hasta que termine el warm-up del worker."""
+    st = warmup.status()
+    return st if st["ready"] else JSONResponse(st, status_code=503)
+
+@app.get("/health/startup")
+def health_startup():
+    """Desglose de tiempos de import / init por subsistema (y si el grafo ya compiló)."""
+    return {**startup_report(), "graph_ready": graph_ready()}
+
+@app.get("/metrics")
+def metrics():
+    # _saver se abre en el lifespan antes de compilar el grafo (con FAST_START `graph` puede seguir en None)
+    if _saver is None:
+        ckpt = {"backend": "memory", **sqlite_saver.stats()}
+    else:
+        ckpt = {"backend": CHECKPOINTER, "graph_bound": graph is not None}
+    llm_cache = get_llm_cache()
+    rag_cache = get_retrieval_cache()
+    embed_cache = get_embedding_store()
+    return {
+        "checkpointer": ckpt,
+        "memory_db": memory_pool_stats(),
+        "feedback": feedback_store.stats(),
+        "llm_cache": llm_cache.stats() if llm_cache is not None else {"enabled": False},
+        "llm_clients": llm_client_stats(),
+        "rag_cache": rag_cache.stats() if rag_cache is not None else {"enabled": False},
+        "hybrid_retrieval": hybrid_stats(),
+        "embed_cache": embed_cache.stats() if embed_cache is not None else {"enabled": False},
+        "single_flight": single_flight_stats(),
+    }
+
 # ===================== /message =========================
-@app.post("/message")
-async def message(
+async def _prepare_turn(
     request: Request,
-    message: str = Form(...),
-    session_id: str = Form(...),
-    image1: Optional[UploadFile] = File(None),
-    image2: Optional[UploadFile] = File(None),
-):
+    message: str,
+    session_id: str,
+    image1: Optional[UploadFile],
+    image2: Optional[UploadFile],
+) -> dict:
+    """Valida, guarda adjuntos, arma memoria e input del grafo. Compartido por /message y /message/stream."""
     if not message:
         raise HTTPException(status_code=400, detail="No message provided")
     if not session_id:
@@ -244,10 +316,12 @@ async def message(
 
     # Identidad simple por sesión
     user_id = request.headers.get("X-User-Id") or session_id
-    arch_flow = load_arch_flow(user_id)
+    # Snapshot de memoria del usuario: 1 lectura ahora, 1 escritura (solo llaves sucias) al final
+    mem = await MemorySession.aopen(user_id)
+    arch_flow = mem.load_arch_flow()
 
     # ID incremental para feedback por mensaje
-    message_id = get_next_message_id(session_id)
+    message_id = await feedback_store.next_message_id(session_id)
 
     # Usar un thread_id POR SESION, no por mensaje
     thread_id = session_id
@@ -262,8 +336,9 @@ async def message(
     async def _save(up, dst_dir):
         safe = re.sub(r"[^A-Za-z0-9_.-]", "_", up.filename or "file")
         p = dst_dir / f"{session_id}__{safe}"
-        with open(p, "wb") as f:
-            f.write(await up.read())
+        data = await up.read()
+        # escritura a disco fuera del event loop
+        await asyncio.to_thread(p.write_bytes, data)
         return p
 
     image_path1, image_path2 = "", ""
@@ -273,7 +348,7 @@ async def message(
     if image1 and image1.filename:
         if _is_pdf(image1):
             p = await _save(image1, DOCS_DIR)
-            doc_context = extract_pdf_text(str(p), max_chars=8000) or ""
+            doc_context = await asyncio.to_thread(extract_pdf_text, str(p), max_chars=8000) or ""
             doc_only = bool(doc_context.strip())
         else:
             p = await _save(image1, IMAGES_DIR)
@@ -283,7 +358,7 @@ async def message(
     if image2 and image2.filename:
         if _is_pdf(image2):
             p = await _save(image2, DOCS_DIR)
-            extra = extract_pdf_text(str(p), max_chars=8000) or ""
+            extra = await asyncio.to_thread(extract_pdf_text, str(p), max_chars=8000) or ""
             doc_context = (doc_context + "\n\n" + extra).strip() if extra else doc_context
             doc_only = bool(doc_context.strip())
         else:
@@ -301,7 +376,7 @@ async def message(
         turn_messages.append(HumanMessage(content=f"[DOCUMENT_EXCERPT]\n{doc_context[:4000]}"))
 
     # --- Memoria previa (MEJORADA) ---
-    last_topic = memory_get(user_id, "topic", "")
+    last_topic = mem.get("topic", "")
 
     # ➜ FIX: antes se usaba uploaded_pdf_snippets (no existe). Usamos doc_context.
     pdf_context_turn = doc_context  # FIX
@@ -311,7 +386,7 @@ async def message(
         af = dict(arch_flow)
         prev_ctx = (af.get("add_context") or "").strip()
         af["add_context"] = (prev_ctx + "\n\n" + pdf_context_turn).strip() if prev_ctx else pdf_context_turn
-        save_arch_flow(user_id, af)
+        mem.save_arch_flow(af)
         arch_flow = af  # usarlo ya mismo
 
     memory_text = (
@@ -327,7 +402,7 @@ async def message(
     # --- ASR pegado por el usuario (si lo hay) ---
     asr_in_msg = _extract_asr_from_message(message)
     if asr_in_msg:
-        memory_set(user_id, "current_asr", asr_in_msg)
+        mem.set("current_asr", asr_in_msg)
     made_asr = _looks_like_make_asr(message)
 
     # --- Config del grafo ---
@@ -363,82 +438,99 @@ async def message(
 
     # --- Limpieza parcial del estado (sin borrar historial persistente del grafo) ---
     try:
-        graph.update_state(config, {"values": {
+        await (await _active_graph()).aupdate_state(config, {"values": {
             "endMessage": "",
             "mermaidCode": "",
             "diagram": {},  # FIX: dict vacío, no None
             "hasVisitedDiagram": False,
             "turn_messages": [],
-            "current_asr": memory_get(user_id, "current_asr", ""),
+            "current_asr": mem.get("current_asr", ""),
         }})
     except Exception:
         pass
 
-    # --- Invocación del grafo ---
-    try:
-        result = graph.invoke(
-            {
-                "messages": turn_messages,
-                "userQuestion": message,
-                "localQuestion": "",
-                "hasVisitedInvestigator": False,
-                "hasVisitedCreator": False,
-                "hasVisitedEvaluator": False,
-                "hasVisitedASR": False,
-                "nextNode": "supervisor",
-                "imagePath1": image_path1,
-                "imagePath2": image_path2,
-                "doc_only": doc_only,
-                "doc_context": doc_context,
-                "endMessage": "",
-                "mermaidCode": "",
-                "turn_messages": [],
-                "retrieved_docs": [],
-                "memory_text": memory_text,  # memoria rica
-                "suggestions": [],
-                "language": user_lang,
-                "intent": user_intent,
-                "force_rag": force_rag,
-                "topic_hint": topic_hint,  # opcional; el grafo puede ignorarlo
-                "current_asr": memory_get(user_id, "current_asr", ""),
-                "style": arch_flow.get("style", ""),
-                "selected_style": arch_flow.get("style", ""),
-                "last_style": arch_flow.get("style", ""),
-                "arch_stage": arch_flow.get("stage", ""),
-                "quality_attribute": arch_flow.get("quality_attribute", ""),
-                "add_context": arch_flow.get("add_context", ""),
-                "tactics_list": arch_flow.get("tactics", []),
-            },
-            config,
-        )
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Graph error: {e}")
+    graph_input = {
+        "messages": turn_messages,
+        "userQuestion": message,
+        "localQuestion": "",
+        "hasVisitedInvestigator": False,
+        "hasVisitedCreator": False,
+        "hasVisitedEvaluator": False,
+        "hasVisitedASR": False,
+        "nextNode": "supervisor",
+        "imagePath1": image_path1,
+        "imagePath2": image_path2,
+        "doc_only": doc_only,
+        "doc_context": doc_context,
+        "endMessage": "",
+        "mermaidCode": "",
+        "turn_messages": [],
+        "retrieved_docs": [],
+        "memory_text": memory_text,  # memoria rica
+        "suggestions": [],
+        "language": user_lang,
+        "intent": user_intent,
+        "force_rag": force_rag,
+        "topic_hint": topic_hint,  # opcional; el grafo puede ignorarlo
+        "current_asr": mem.get("current_asr", ""),
+        "style": arch_flow.get("style", ""),
+        "selected_style": arch_flow.get("style", ""),
+        "last_style": arch_flow.get("style", ""),
+        "arch_stage": arch_flow.get("stage", ""),
+        "quality_attribute": arch_flow.get("quality_attribute", ""),
+        "add_context": arch_flow.get("add_context", ""),
+        "tactics_list": arch_flow.get("tactics", []),
+    }
+
+    return {
+        "message": message,
+        "session_id": session_id,
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "message_id": message_id,
+        "arch_flow": arch_flow,
+        "made_asr": made_asr,
+        "user_intent": user_intent,
+        "config": config,
+        "graph_input": graph_input,
+        "mem": mem,
+    }
+
+
+async def _finalize_turn(turn: dict, result: dict) -> dict:
+    """Persiste feedback/memoria a partir del resultado del grafo y arma el payload del front."""
+    message = turn["message"]
+    session_id = turn["session_id"]
+    thread_id = turn["thread_id"]
+    message_id = turn["message_id"]
+    arch_flow = turn["arch_flow"]
+    made_asr = turn["made_asr"]
+    user_intent = turn["user_intent"]
+    mem = turn["mem"]
 
     # --- Feedback inicial ---
-    upsert_feedback(session_id=session_id, message_id=message_id, up=0, down=0)
+    feedback_store.record(session_id=session_id, message_id=message_id, up=0, down=0)
 
     # --- Actualiza memoria simple ---
     low = message.lower()
     if "latencia" in low:
-        memory_set(user_id, "topic", "latencia")
+        mem.set("topic", "latencia")
     elif "escalabilidad" in low:
-        memory_set(user_id, "topic", "escalabilidad")
+        mem.set("topic", "escalabilidad")
     if "asr" in low:
-        memory_set(user_id, "asr_notes", message)
+        mem.set("asr_notes", message)
 
     # --- Captura ASR desde la respuesta del grafo (si redactó uno) ---
     end_msg = result.get("endMessage", "") or ""
     asr_from_result = _extract_asr_from_result_text(end_msg)
     if asr_from_result:
-        memory_set(user_id, "current_asr", asr_from_result)
+        mem.set("current_asr", asr_from_result)
     elif made_asr and len(end_msg) > 80:
-        memory_set(user_id, "current_asr", end_msg.strip())
+        mem.set("current_asr", end_msg.strip())
 
     # Actualizar arch_flow con el ASR generado/refinado
     if result.get("hasVisitedASR"):
-        arch_flow["current_asr"] = memory_get(user_id, "current_asr", "")
+        arch_flow["current_asr"] = mem.get("current_asr", "")
         arch_flow["quality_attribute"] = result.get(
             "asr_quality_attribute",
             arch_flow.get("quality_attribute", "")
@@ -477,7 +569,8 @@ async def message(
         arch_flow["stage"] = "DEPLOYMENT"
 
     # Persistimos el flujo ADD 3.0 actualizado (ASR, estilo, tácticas, stage, etc.)
-    save_arch_flow(user_id, arch_flow)
+    mem.save_arch_flow(arch_flow)
+    await mem.aflush()
 
     # Mermaid generado por el grafo (diagram_orchestrator_node)
         # Mermaid generado por el grafo (diagram_orchestrator_node)
@@ -511,11 +604,170 @@ async def message(
         "message_id": message_id,
         "thread_id": thread_id,
         "suggestions": result.get("suggestions", []),
+        "llm_calls_avoided": result.get("llm_calls_avoided", 0),
     }
 
     return clean_payload
 
 
+@app.post("/message")
+async def message(
+    request: Request,
+    message: str = Form(...),
+    session_id: str = Form(...),
+    image1: Optional[UploadFile] = File(None),
+    image2: Optional[UploadFile] = File(None),
+):
+    turn = await _prepare_turn(request, message, session_id, image1, image2)
+
+    # --- Invocación del grafo ---
+    try:
+        result = await (await _active_graph()).ainvoke(turn["graph_input"], turn["config"])
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        await turn["mem"].aflush()  # ASR/contexto del turno ya capturados antes del grafo
+        raise HTTPException(status_code=500, detail=f"Graph error: {e}")
+
+    return await _finalize_turn(turn, result)
+
+
+# ===================== /message/stream (SSE) ============
+# Nodos cuya salida de LLM es la respuesta final al usuario: sus tokens se reenvían.
+STREAM_TOKEN_NODES = {"unifier", "asr", "tactics", "style"}
+# Nodos que quitan de su respuesta el primer bloque ```json y el encabezado "(2) JSON:"
+# (tactics._tactics_finish): el stream de tokens hace lo mismo para coincidir con "final".
+FENCED_TOKEN_NODES = {"tactics"}
+_FENCE_OPEN = "```json"
+_JSON_HEADING_RE = re.compile(r"\(?2\)?\s*JSON\s*:?\s*", re.I)
+_JSON_HEADING_PREFIX_RE = re.compile(r"\(?(?:2\)?\s*(?:J(?:S(?:O(?:N\s*:?\s*)?)?)?)?)?", re.I)
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _chunk_text(chunk) -> str:
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):  # bloques de contenido (p.ej. Anthropic)
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    return ""
+
+class _JsonFenceFilter:
+    """Filtro de tokens en vivo: descarta el bloque ```json y la línea "(2) JSON:".
+
+    Solo retiene la línea en curso mientras todavía pueda ser la apertura del bloque o
+    el encabezado; el resto del texto pasa sin demora.
+    """
+
+    def __init__(self) -> None:
+        self.line = ""       # comienzo de la línea en curso, aún no emitido
+        self.free = False    # la línea en curso ya no puede ser especial: se emite directo
+        self.inside = False  # dentro del bloque ```json
+        self.done = False    # el primer bloque ya se quitó (como strip_first_json_fence)
+        self.tail = ""       # últimos caracteres dentro del bloque, para ver el cierre
+
+    def _maybe_special(self, s: str) -> bool:
+        return (not self.done and _FENCE_OPEN.startswith(s)) or bool(_JSON_HEADING_PREFIX_RE.fullmatch(s))
+
+    def feed(self, text: str) -> str:
+        out = []
+        for ch in text:
+            if self.inside:
+                self.tail = (self.tail + ch)[-3:]
+                if self.tail == "```":
+                    self.inside, self.done, self.tail = False, True, ""
+                continue
+            if self.free:
+                out.append(ch)
+                self.free = ch != "\n"
+                continue
+            if ch == "\n":
+                if not _JSON_HEADING_RE.fullmatch(self.line.strip()):
+                    out.append(self.line + ch)
+                self.line = ""
+                continue
+            self.line += ch
+            s = self.line.lstrip().lower()
+            if not self.done and s.startswith(_FENCE_OPEN):
+                self.inside, self.line = True, ""
+            elif not self._maybe_special(s):
+                out.append(self.line)
+                self.line, self.free = "", True
+        return "".join(out)
+
+    def flush(self) -> str:
+        line, self.line = self.line, ""
+        if self.inside or _JSON_HEADING_RE.fullmatch(line.strip()):
+            return ""
+        return line
+
+@app.post("/message/stream")
+async def message_stream(
+    request: Request,
+    message: str = Form(...),
+    session_id: str = Form(...),
+    image1: Optional[UploadFile] = File(None),
+    image2: Optional[UploadFile] = File(None),
+):
+    """Igual que /message pero como Server-Sent Events.
+
+    Eventos: node_start / node_end por cada nodo, token para el LLM del nodo final
+    y final con el mismo payload que /message (o error si el grafo falla).
+    """
+    turn = await _prepare_turn(request, message, session_id, image1, image2)
+
+    async def _events():
+        yield _sse("start", {"session_id": session_id, "message_id": turn["message_id"]})
+        result = {}
+        fence_filters: dict[str, _JsonFenceFilter] = {}
+        try:
+            async for mode, chunk in (await _active_graph()).astream(
+                turn["graph_input"],
+                turn["config"],
+                stream_mode=["tasks", "updates", "messages", "values"],
+            ):
+                if mode == "tasks":
+                    # solo el inicio; el fin lo reporta "updates" con la salida del nodo
+                    if "input" in chunk:
+                        if chunk.get("name") in FENCED_TOKEN_NODES:
+                            fence_filters[chunk["name"]] = _JsonFenceFilter()
+                        yield _sse("node_start", {"node": chunk.get("name")})
+                elif mode == "updates":
+                    for node, upd in (chunk or {}).items():
+                        upd = upd if isinstance(upd, dict) else {}
+                        ff = fence_filters.pop(node, None)
+                        if ff is not None and (rest := ff.flush()):
+                            yield _sse("token", {"node": node, "text": rest})
+                        yield _sse("node_end", {"node": node, "nextNode": upd.get("nextNode")})
+                elif mode == "messages":
+                    msg_chunk, meta = chunk
+                    node = (meta or {}).get("langgraph_node")
+                    if node not in STREAM_TOKEN_NODES:
+                        continue
+                    text = _chunk_text(msg_chunk)
+                    if node in fence_filters:
+                        text = fence_filters[node].feed(text)
+                    if text:
+                        yield _sse("token", {"node": node, "text": text})
+                elif mode == "values":
+                    result = chunk
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            await turn["mem"].aflush()
+            yield _sse("error", {"detail": f"Graph error: {e}"})
+            return
+
+        yield _sse("final", await _finalize_turn(turn, result))
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 
 # ===================== /feedback ========================
 @app.post("/feedback")
@@ -525,7 +777,7 @@ async def feedback(
     thumbs_up: int = Form(...),
     thumbs_down: int = Form(...),
 ):
-    update_feedback(session_id=session_id, message_id=message_id, up=thumbs_up, down=thumbs_down)
+    feedback_store.update(session_id=session_id, message_id=message_id, up=thumbs_up, down=thumbs_down)
     return {"status": "Feedback recorded successfully"}
 
 # ===================== /test (mock) =====================
@@ -1,32 +1,37 @@
 # src/memory.py
-import sqlite3, os, json
+import os, json
 from pathlib import Path
+
+from src.storage import SQLitePool
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_DIR = BASE_DIR / "state_db"
 DB_DIR.mkdir(parents=True, exist_ok=True)
 DB_PATH = DB_DIR / "memory.db"
 
-def _conn():
-    return sqlite3.connect(str(DB_PATH))
+# Conexiones de larga vida (WAL + sentencias preparadas) en vez de un connect por llamada
+_pool = SQLitePool(DB_PATH, size=int(os.getenv("MEMORY_DB_POOL_SIZE", "4")))
+
+_SQL_SET = """INSERT INTO memory(user_id, key, value) VALUES(?,?,?)
+              ON CONFLICT(user_id,key) DO UPDATE SET value=excluded.value, updated_at=CURRENT_TIMESTAMP"""
+_SQL_GET = "SELECT value FROM memory WHERE user_id=? AND key=?"
 
 def init():
-    with _conn() as c:
-        c.execute("""CREATE TABLE IF NOT EXISTS memory (
+    _pool.executescript("""CREATE TABLE IF NOT EXISTS memory (
             user_id TEXT, key TEXT, value TEXT,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             PRIMARY KEY (user_id, key)
-        )""")
+        );""")
 
 def set_kv(user_id: str, key: str, value: str):
-    with _conn() as c:
-        c.execute("""INSERT INTO memory(user_id, key, value) VALUES(?,?,?)
-                     ON CONFLICT(user_id,key) DO UPDATE SET value=excluded.value, updated_at=CURRENT_TIMESTAMP""",
-                  (user_id, key, value))
+    _pool.execute(_SQL_SET, (user_id, key, value))
 
 def get(user_id: str, key: str, default: str = "") -> str:
-    with _conn() as c:
-        row = c.execute("SELECT value FROM memory WHERE user_id=? AND key=?", (user_id, key)).fetchone()
-        return row[0] if row else default
+    row = _pool.fetchone(_SQL_GET, (user_id, key))
+    return row[0] if row else default
+
+def pool_stats() -> dict:
+    return _pool.stats()
 
 ###
 ### Nueva memoria persistente para el flujo ADD 3.0
@@ -55,12 +60,7 @@ def empty_arch_flow() -> dict:
         "deployment_diagram_svg_b64":"", #SVG base 64 del despliegue final
     }
 
-def load_arch_flow(user_id: str) -> dict:
-    """
-    Devuelve el estado ADD 3.0 para este usuario/sesión
-    Siempre retorna todas las llaves esperadas.
-    """
-    raw = get(user_id, ARCH_FLOW_KEY, "")
+def _parse_arch_flow(raw: str) -> dict:
     if not raw:
         return empty_arch_flow()
     try:
@@ -71,10 +71,80 @@ def load_arch_flow(user_id: str) -> dict:
     base.update(data or {})
     return base
 
+def _dump_arch_flow(flow: dict) -> str:
+    base = empty_arch_flow()
+    base.update(flow or {})
+    return json.dumps(base)
+
+def load_arch_flow(user_id: str) -> dict:
+    """
+    Devuelve el estado ADD 3.0 para este usuario/sesión
+    Siempre retorna todas las llaves esperadas.
+    """
+    return _parse_arch_flow(get(user_id, ARCH_FLOW_KEY, ""))
+
 def save_arch_flow(user_id: str, flow: dict):
     """
     Guarda el estado ADD 3.0 actualizado
     """
-    base = empty_arch_flow()
-    base.update(flow or {})
-    set_kv(user_id, ARCH_FLOW_KEY, json.dumps(base))
\ No newline at end of file
+    set_kv(user_id, ARCH_FLOW_KEY, _dump_arch_flow(flow))
+
+###
+### Unidad de trabajo por request
+###
+
+class MemorySession:
+    """
+    Snapshot de la memoria de un usuario para un request.
+    - open/aopen: carga todas sus llaves en una sola consulta
+    - get/set: leen y escriben sobre el snapshot (se leen las propias escrituras)
+    - flush/aflush: persiste solo las llaves modificadas en una sola transacción
+    """
+
+    def __init__(self, user_id: str, values: dict[str, str] | None = None):
+        self.user_id = user_id
+        self._values: dict[str, str] = dict(values or {})
+        self._dirty: set[str] = set()
+
+    @classmethod
+    def open(cls, user_id: str) -> "MemorySession":
+        rows = _pool.fetchall("SELECT key, value FROM memory WHERE user_id=?", (user_id,))
+        return cls(user_id, {k: v for k, v in rows})
+
+    @classmethod
+    async def aopen(cls, user_id: str) -> "MemorySession":
+        return await _pool.arun(cls.open, user_id)
+
+    def get(self, key: str, default: str = "") -> str:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: str):
+        if key in self._values and self._values[key] == value:
+            return
+        self._values[key] = value
+        self._dirty.add(key)
+
+    def load_arch_flow(self) -> dict:
+        return _parse_arch_flow(self.get(ARCH_FLOW_KEY, ""))
+
+    def save_arch_flow(self, flow: dict):
+        self.set(ARCH_FLOW_KEY, _dump_arch_flow(flow))
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def flush(self) -> int:
+        """Escribe las llaves sucias en una transacción; devuelve cuántas se escribieron."""
+        if not self._dirty:
+            return 0
+        rows = [(self.user_id, k, self._values[k]) for k in sorted(self._dirty)]
+        with _pool.transaction() as c:
+            c.executemany(_SQL_SET, rows)
+        self._dirty.clear()
+        return len(rows)
+
+    async def aflush(self) -> int:
+        if not self._dirty:
+            return 0
+        return await _pool.arun(self.flush)
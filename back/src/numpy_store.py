@@ -0,0 +1,186 @@
+# src/numpy_store.py
+"""
+Vector store de fuerza bruta sobre NumPy (alternativa a Chroma para corpus chicos).
+
+- vectors.npy: embeddings normalizados (float16 o float32), abiertos con mmap.
+- meta.json: textos y metadata en el mismo orden que las filas.
+- Top-k = un producto matriz-vector + argpartition; filtros por metadata
+  (title / source_title, con $eq / $in) como máscaras vectorizadas.
+
+Se exporta desde Chroma sin re-embebir (export_from_chroma) y se elige con
+VECTOR_BACKEND=numpy en create_or_load_vectorstore().
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+NUMPY_SUBDIR = "numpy"  # dentro del persist dir de Chroma
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+# Campos filtrables (los que usan get_retriever y el catálogo)
+FILTER_KEYS = ("title", "source_title")
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def save_arrays(directory: str | Path, embeddings, texts: list[str], metadatas: list[dict],
+                dtype: str = "float32") -> Path:
+    d = Path(directory)
+    d.mkdir(parents=True, exist_ok=True)
+    mat = _normalize_rows(embeddings).astype(dtype)
+    np.save(d / VECTORS_FILE, mat)
+    (d / META_FILE).write_text(
+        json.dumps({"texts": texts, "metadatas": metadatas}, ensure_ascii=False, separators=(",", ":")),
+        encoding="utf-8",
+    )
+    return d
+
+
+def export_from_chroma(vectordb, directory: str | Path, dtype: str = "float32") -> Path:
+    """Vuelca la colección de Chroma (embeddings ya calculados) al formato NumPy."""
+    data = vectordb._collection.get(include=["embeddings", "documents", "metadatas"])
+    embs = data.get("embeddings")
+    if embs is None or len(embs) == 0:
+        raise ValueError("la colección no tiene embeddings")
+    return save_arrays(
+        directory,
+        np.asarray(embs, dtype=np.float32),
+        list(data.get("documents") or []),
+        [dict(m or {}) for m in (data.get("metadatas") or [])],
+        dtype=dtype,
+    )
+
+
+class NumpyVectorStore(VectorStore):
+    def __init__(self, directory: str | Path, embedding: Embeddings, mmap: bool = True):
+        d = Path(directory)
+        self.directory = d
+        self._embedding = embedding
+        self._mat = np.load(d / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        meta = json.loads((d / META_FILE).read_text(encoding="utf-8"))
+        self._texts: list[str] = meta["texts"]
+        self._metas: list[dict] = meta["metadatas"]
+        # códigos enteros por campo filtrable -> máscaras sin recorrer dicts
+        self._codes: dict[str, tuple[dict[Any, int], np.ndarray]] = {}
+        for key in FILTER_KEYS:
+            vocab: dict[Any, int] = {}
+            codes = np.fromiter(
+                (vocab.setdefault(m.get(key), len(vocab)) for m in self._metas),
+                dtype=np.int32, count=len(self._metas),
+            )
+            self._codes[key] = (vocab, codes)
+
+    @classmethod
+    def exists(cls, directory: str | Path) -> bool:
+        d = Path(directory)
+        return (d / VECTORS_FILE).exists() and (d / META_FILE).exists()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    # ---------- filtros ----------
+
+    def _mask(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        mask = np.ones(len(self._texts), dtype=bool)
+        for key, cond in filter.items():
+            if isinstance(cond, dict):
+                if "$eq" in cond:
+                    values = [cond["$eq"]]
+                elif "$in" in cond:
+                    values = list(cond["$in"])
+                else:
+                    raise ValueError(f"operador no soportado en filtro: {cond}")
+            else:
+                values = [cond]
+            if key in self._codes:
+                vocab, codes = self._codes[key]
+                wanted = [vocab[v] for v in values if v in vocab]
+                mask &= np.isin(codes, wanted)
+            else:
+                allowed = set(values)
+                mask &= np.fromiter((m.get(key) in allowed for m in self._metas), dtype=bool,
+                                    count=len(self._metas))
+        return mask
+
+    # ---------- búsqueda ----------
+
+    def _topk(self, scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        part = np.argpartition(-scores, k - 1)[:k]
+        return part[np.argsort(-scores[part])]
+
+    def search_by_vectors(self, vectors, k: int = 4, filter: Optional[dict] = None) -> list[list[tuple[Document, float]]]:
+        """Top-k para varias consultas con un solo producto matriz-matriz."""
+        q = _normalize_rows(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        mask = self._mask(filter)
+        if mask is None:
+            rows = None
+            mat = self._mat
+        else:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return [[] for _ in range(q.shape[0])]
+            mat = self._mat[rows]
+        scores = np.asarray(mat @ q.T.astype(mat.dtype), dtype=np.float32)  # (N, m)
+        out = []
+        for j in range(q.shape[0]):
+            col = scores[:, j]
+            top = self._topk(col, k)
+            idx = top if rows is None else rows[top]
+            out.append([
+                (Document(page_content=self._texts[i], metadata=dict(self._metas[i])), float(col[t]))
+                for i, t in zip(idx.tolist(), top.tolist())
+            ])
+        return out
+
+    def similarity_search_with_score_by_vector(self, embedding: list[float], k: int = 4,
+                                               filter: Optional[dict] = None, **kwargs: Any):
+        return self.search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4,
+                                    filter: Optional[dict] = None, **kwargs: Any) -> list[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any):
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> list[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0  # coseno [-1, 1] -> [0, 1]
+
+    # ---------- escritura ----------
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list[dict]] = None, **kwargs: Any) -> list[str]:
+        raise NotImplementedError("NumpyVectorStore es de solo lectura; reconstruye con build_vectorstore.py")
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: Optional[list[dict]] = None,
+                   *, directory: str | Path, dtype: str = "float32", **kwargs: Any) -> "NumpyVectorStore":
+        texts = list(texts)
+        save_arrays(directory, embedding.embed_documents(texts), texts,
+                    [dict(m or {}) for m in (metadatas or [{} for _ in texts])], dtype=dtype)
+        return cls(directory, embedding)
@@ -1,16 +1,27 @@
 # src/rag_agent.py
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any, Optional
 
-# Usa el paquete nuevo si está instalado; si no, cae al community.
-try:
-    from langchain_chroma import Chroma
-except Exception:  # pragma: no cover
-    from langchain_community.vectorstores import Chroma
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
 
-from langchain_openai import OpenAIEmbeddings
+from src.services.single_flight import SINGLE_FLIGHT_ENABLED, SingleFlight
+from src.startup import timed
 
 # ================== Paths / Config ==================
 
@@ -23,13 +34,30 @@ EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
 # Nombre de colección (consistente con el build)
 COLLECTION_NAME = "arquia"
 
+# Backend de vectores: "chroma" (default) o "numpy" (fuerza bruta sobre .npy mmap)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
 # Singleton del vectorstore
-_VDB: Chroma | None = None
+_VDB: VectorStore | None = None
+_VDB_LOCK = threading.Lock()
+
+# Sello escrito por build_vectorstore.py en cada build (invalida la caché de retrieval)
+INDEX_VERSION_FILE = ".index_version"
+
+
+def _chroma_cls():
+    # import diferido (chromadb es lento de importar); usa el paquete nuevo si está, si no el community
+    with timed("chroma.import", "import"):
+        try:
+            from langchain_chroma import Chroma
+        except Exception:  # pragma: no cover
+            from langchain_community.vectorstores import Chroma
+    return Chroma
 
 
 def _embeddings():
-    """Selecciona embeddings según proveedor (Azure/OpenAI)."""
-    import os
+    """Selecciona embeddings según proveedor (Azure/OpenAI), con caché de consultas (EMBED_CACHE)."""
+    from src.services.embedding_cache import with_query_cache
     # Azure
     if os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
         from langchain_openai import AzureOpenAIEmbeddings
@@ -40,57 +68,490 @@ def _embeddings():
         )
         if not dep:
             raise ValueError("Usando Azure: define AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT (deployment de embeddings).")
-        return AzureOpenAIEmbeddings(
+        inner = AzureOpenAIEmbeddings(
             azure_deployment=dep,
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_key=os.getenv("AZURE_OPENAI_API_KEY"),
             openai_api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
         )
+        return with_query_cache(inner, f"azure:{dep}")
     # OpenAI (pública/compatibles)
     from langchain_openai import OpenAIEmbeddings
     model = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
-    return OpenAIEmbeddings(model=model, chunk_size=10)
+    return with_query_cache(OpenAIEmbeddings(model=model, chunk_size=10), f"openai:{model}")
 
 
-def create_or_load_vectorstore() -> Chroma:
+def create_or_load_vectorstore() -> VectorStore:
     """
     Carga la BD de Chroma ya persistida (construida por build_vectorstore.py).
     Si la carpeta está vacía, la instancia se crea igualmente (sin data).
+    Con VECTOR_BACKEND=numpy usa el export NumPy del mismo índice si existe.
+    Thread-safe: el lifespan la abre en segundo plano mientras llegan requests.
     """
     global _VDB
-    if _VDB is not None:
-        return _VDB
+    if _VDB is None:
+        with _VDB_LOCK:
+            if _VDB is None:
+                _VDB = _open_vectorstore()
+    return _VDB
+
 
+def _open_vectorstore() -> VectorStore:
     persist_directory = os.environ.get("CHROMA_DIR", DEFAULT_CHROMA_DIR)
     print(f"[RAG] persist_directory = {persist_directory}")
 
+    if VECTOR_BACKEND == "numpy":
+        from src.numpy_store import NUMPY_SUBDIR, NumpyVectorStore
+        np_dir = Path(persist_directory) / NUMPY_SUBDIR
+        if NumpyVectorStore.exists(np_dir):
+            vdb = NumpyVectorStore(np_dir, _embeddings())
+            print(f"[RAG] backend = numpy ({len(vdb)} chunks)")
+            return vdb
+        print("[RAG] VECTOR_BACKEND=numpy pero no hay export NumPy; se usa Chroma")
+
     # Solo cargar (el build se hace con back/build_vectorstore.py)
-    _VDB = Chroma(
+    # Nota: si no hay datos aún, el store está “vacío” pero funcional.
+    return _chroma_cls()(
         collection_name=COLLECTION_NAME,
         embedding_function=_embeddings(),
         persist_directory=persist_directory,
     )
-    # Nota: si no hay datos aún, _VDB está “vacío” pero funcional.
-    return _VDB
+
+
+# ================== Caché de retrieval ==================
+
+def _persist_directory() -> str:
+    return os.environ.get("CHROMA_DIR", DEFAULT_CHROMA_DIR)
+
+
+def write_index_version(persist_directory: str | None = None) -> str:
+    """Sella el índice con una versión nueva; lo llama build_vectorstore.py al terminar."""
+    d = Path(persist_directory or _persist_directory())
+    d.mkdir(parents=True, exist_ok=True)
+    version = f"{time.time():.6f}-{os.urandom(4).hex()}"
+    (d / INDEX_VERSION_FILE).write_text(version, encoding="utf-8")
+    return version
+
+
+def collection_fingerprint() -> str:
+    """Identifica la versión del índice: sello del build o, si no hay, conteo + mtime del sqlite."""
+    d = Path(_persist_directory())
+    stamp = d / INDEX_VERSION_FILE
+    try:
+        return "v:" + stamp.read_text(encoding="utf-8").strip()
+    except OSError:
+        pass
+    try:
+        vs = create_or_load_vectorstore()
+        count = len(vs) if hasattr(vs, "search_by_vectors") else vs._collection.count()
+    except Exception:
+        count = -1
+    db = d / "chroma.sqlite3"
+    mtime = db.stat().st_mtime if db.exists() else 0.0
+    return f"c:{count}:{mtime:.0f}"
+
+
+class RetrievalCache:
+    """LRU en memoria + tier opcional en disco (SQLite) para resultados del retriever.
+
+    La llave incluye la huella de la colección, así que un rebuild invalida todo solo.
+    """
+
+    def __init__(self, max_entries: int = 512, disk_path: Optional[Path] = None,
+                 fingerprint_ttl: float = 30.0):
+        self.max_entries = max(1, max_entries)
+        self.fingerprint_ttl = fingerprint_ttl
+        self._mem: "OrderedDict[str, list[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fp: tuple[float, str] = (0.0, "")
+        self._stats = {"hits_mem": 0, "hits_disk": 0, "misses": 0}
+        self._disk = None
+        if disk_path is not None:
+            from src.storage import SQLitePool
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._disk = SQLitePool(disk_path, size=2)
+            self._disk.executescript(
+                "CREATE TABLE IF NOT EXISTS rag_cache ("
+                " key TEXT PRIMARY KEY, fingerprint TEXT, docs TEXT, created_at REAL);"
+            )
+
+    def fingerprint(self) -> str:
+        now = time.monotonic()
+        ts, fp = self._fp
+        if not fp or now - ts > self.fingerprint_ttl:
+            fp = collection_fingerprint()
+            if fp != self._fp[1] and self._fp[1]:
+                with self._lock:
+                    self._mem.clear()
+                if self._disk is not None:
+                    self._disk.execute("DELETE FROM rag_cache WHERE fingerprint != ?", (fp,))
+            self._fp = (now, fp)
+        return fp
+
+    def invalidate(self) -> None:
+        """Olvida la huella y todo lo cacheado (rebuild en caliente)."""
+        with self._lock:
+            self._mem.clear()
+        if self._disk is not None:
+            self._disk.execute("DELETE FROM rag_cache")
+        self._fp = (0.0, "")
+
+    def key(self, query: str, search_tag: str) -> str:
+        q = re.sub(r"\s+", " ", (query or "").strip())
+        raw = f"{self.fingerprint()}\x00{search_tag}\x00{q}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _to_docs(items: list[dict]) -> list[Document]:
+        # copias: quien llama puede mutar metadata sin ensuciar la caché
+        return [Document(page_content=i["page_content"], metadata=dict(i["metadata"])) for i in items]
+
+    def get(self, key: str) -> Optional[list[Document]]:
+        with self._lock:
+            items = self._mem.get(key)
+            if items is not None:
+                self._mem.move_to_end(key)
+                self._stats["hits_mem"] += 1
+                return self._to_docs(items)
+        if self._disk is not None:
+            row = self._disk.fetchone("SELECT docs FROM rag_cache WHERE key = ?", (key,))
+            if row is not None:
+                items = json.loads(row[0])
+                self._remember(key, items)
+                with self._lock:
+                    self._stats["hits_disk"] += 1
+                return self._to_docs(items)
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def _remember(self, key: str, items: list[dict]) -> None:
+        with self._lock:
+            self._mem[key] = items
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def put(self, key: str, docs: list[Document]) -> None:
+        items = [{"page_content": d.page_content, "metadata": dict(d.metadata or {})} for d in docs]
+        self._remember(key, items)
+        if self._disk is not None:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO rag_cache (key, fingerprint, docs, created_at) VALUES (?, ?, ?, ?)",
+                (key, self._fp[1], json.dumps(items, ensure_ascii=False, default=str), time.time()),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            size = len(self._mem)
+        looked = s["hits_mem"] + s["hits_disk"] + s["misses"]
+        hits = s["hits_mem"] + s["hits_disk"]
+        return {
+            **s,
+            "entries_mem": size,
+            "hit_rate": round(hits / looked, 3) if looked else 0.0,
+            "fingerprint": self._fp[1],
+            "disk": self._disk is not None,
+        }
+
+
+_RAG_CACHE: RetrievalCache | None = None
+
+
+def get_retrieval_cache() -> RetrievalCache | None:
+    """Caché compartida (None si RAG_CACHE=0). RAG_CACHE_DISK=1 activa el tier en disco."""
+    global _RAG_CACHE
+    if os.getenv("RAG_CACHE", "1") == "0":
+        return None
+    if _RAG_CACHE is None:
+        disk = None
+        if os.getenv("RAG_CACHE_DISK", "0") == "1":
+            disk = Path(os.getenv("RAG_CACHE_PATH", str(PROJECT_ROOT / "state_db" / "rag_cache.db")))
+        _RAG_CACHE = RetrievalCache(
+            max_entries=int(os.getenv("RAG_CACHE_SIZE", "512")),
+            disk_path=disk,
+        )
+    return _RAG_CACHE
+
+
+# Llamadas idénticas concurrentes (misma búsqueda y query) comparten un solo fetch
+_RETRIEVAL_FLIGHT = SingleFlight("retrieval", wait_timeout=15.0)
+
+
+def _clone_docs(docs: list[Document]) -> list[Document]:
+    return [Document(page_content=d.page_content, metadata=dict(d.metadata or {})) for d in docs]
+
+
+class CachingRetriever(BaseRetriever):
+    """
+    Envuelve un retriever y reutiliza resultados para (índice, búsqueda, query) idénticos.
+    Con `cache=None` (RAG_CACHE=0) solo coalesce las llamadas concurrentes (single-flight).
+    """
+
+    inner: BaseRetriever
+    cache: Any = None
+    search_tag: str = ""
+
+    def _key(self, query: str) -> str:
+        if self.cache is not None:
+            return self.cache.key(query, self.search_tag)
+        q = re.sub(r"\s+", " ", (query or "").strip())
+        return hashlib.sha256(f"{self.search_tag}\x00{q}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, query: str) -> tuple[str, Optional[list[Document]]]:
+        key = self._key(query)
+        return key, (self.cache.get(key) if self.cache is not None else None)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        key, docs = self._lookup(query)
+        if docs is None:
+            def fetch() -> list[Document]:
+                out = self.inner.invoke(query, config={"callbacks": run_manager.get_child()})
+                if self.cache is not None:
+                    self.cache.put(key, out)
+                return out
+            docs = _RETRIEVAL_FLIGHT.do(key, fetch, clone=_clone_docs)
+        return docs
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        # huella del índice (stat / count()) y tier en disco son bloqueantes: fuera del event loop
+        key, docs = await asyncio.to_thread(self._lookup, query)
+        if docs is None:
+            async def fetch() -> list[Document]:
+                out = await self.inner.ainvoke(query, config={"callbacks": run_manager.get_child()})
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.put, key, out)
+                return out
+            docs = await _RETRIEVAL_FLIGHT.ado(key, fetch, clone=_clone_docs)
+        return docs
+
+
+def _title_filter(title: str | list[str] | None) -> dict | None:
+    if isinstance(title, list) and title:
+        return {"title": {"$in": title}}
+    if isinstance(title, str) and title:
+        return {"title": {"$eq": title}}
+    return None
+
+
+# ================== Retrieval híbrido (BM25 + vector) ==================
+
+# Modo por defecto: "hybrid" si existe el índice BM25, "vector" fuerza solo embeddings
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "hybrid")
+HYBRID_KEYWORD_MAX_TOKENS = int(os.getenv("HYBRID_KEYWORD_MAX_TOKENS", "4"))
+
+_HYBRID_STATS = {"lexical_only": 0, "fused": 0}
+
+
+def hybrid_stats() -> dict:
+    return dict(_HYBRID_STATS)
+
+
+def _chunk_key(d: Document) -> tuple:
+    md = d.metadata or {}
+    return (md.get("source_path") or md.get("source"), md.get("page"), hashlib.md5(
+        (d.page_content or "").encode("utf-8")).hexdigest())
+
+
+def _keyword_dominant(index: Any, query: str, max_tokens: int = HYBRID_KEYWORD_MAX_TOKENS) -> bool:
+    """Consulta corta con todos sus términos en el vocabulario BM25 (se responde sin embeddings)."""
+    from src.bm25_index import tokenize
+    toks = tokenize(query)
+    return 0 < len(toks) <= max_tokens and all(index.knows(t) for t in toks)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fusiona BM25 (índice local) y búsqueda vectorial por reciprocal-rank fusion.
+    Consultas cortas cuyos términos están todos en el vocabulario se responden
+    solo con BM25: sin llamada de embeddings.
+    """
+
+    vector: BaseRetriever
+    index: Any
+    k: int = 6
+    titles: Optional[list[str]] = None
+    rrf_k: int = 60
+    keyword_max_tokens: int = HYBRID_KEYWORD_MAX_TOKENS
+
+    def _lexical(self, query: str, n: int) -> list[Document]:
+        titles = set(self.titles) if self.titles else None
+        return [self.index.document(i) for _, i in self.index.search(query, k=n, titles=titles)]
+
+    def _keyword_dominant(self, query: str) -> bool:
+        return _keyword_dominant(self.index, query, self.keyword_max_tokens)
+
+    def _fuse(self, lexical: list[Document], vector: list[Document]) -> list[Document]:
+        scores: dict[tuple, float] = {}
+        docs: dict[tuple, Document] = {}
+        for ranked in (lexical, vector):
+            for rank, d in enumerate(ranked):
+                key = _chunk_key(d)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                docs.setdefault(key, d)
+        return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[: self.k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        if self._keyword_dominant(query):
+            lexical = self._lexical(query, self.k)
+            if len(lexical) >= self.k:
+                _HYBRID_STATS["lexical_only"] += 1
+                return lexical
+        lexical = self._lexical(query, self.k * 2)
+        vector = self.vector.invoke(query, config={"callbacks": run_manager.get_child()})
+        _HYBRID_STATS["fused"] += 1
+        return self._fuse(lexical, vector)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        if self._keyword_dominant(query):
+            lexical = self._lexical(query, self.k)
+            if len(lexical) >= self.k:
+                _HYBRID_STATS["lexical_only"] += 1
+                return lexical
+        lexical = self._lexical(query, self.k * 2)
+        vector = await self.vector.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        _HYBRID_STATS["fused"] += 1
+        return self._fuse(lexical, vector)
 
 
 # src/rag_agent.py  (reemplaza tu get_retriever por este)
-def get_retriever(title: str | list[str] | None = None, k: int = 6):
+def get_retriever(title: str | list[str] | None = None, k: int = 6, mode: str | None = None):
     """
     Devuelve un retriever del vector store.
     - Si `title` es string: filtra por igualdad exacta en metadata.title
     - Si `title` es lista: usa $in para cualquiera
+    - mode "hybrid" (default, RETRIEVER_MODE) fusiona con BM25 si el índice existe
+    Envuelto en CachingRetriever (con RAG_CACHE=0 solo coalesce llamadas concurrentes;
+    con SINGLE_FLIGHT=0 además se devuelve el retriever sin envolver).
     """
     vectorstore = create_or_load_vectorstore()
-    if isinstance(title, list) and title:
-        return vectorstore.as_retriever(
-            search_kwargs={"k": k, "filter": {"title": {"$in": title}}}
-        )
-    if isinstance(title, str) and title:
-        return vectorstore.as_retriever(
-            search_kwargs={"k": k, "filter": {"title": {"$eq": title}}}
-        )
-    return vectorstore.as_retriever(search_kwargs={"k": k})
+    search_kwargs: dict[str, Any] = {"k": k}
+    where = _title_filter(title)
+    if where:
+        search_kwargs["filter"] = where
+    base = vectorstore.as_retriever(search_kwargs=search_kwargs)
+
+    mode = mode or RETRIEVER_MODE
+    if mode == "hybrid":
+        from src.bm25_index import get_bm25_index
+        index = get_bm25_index()
+        if index is not None and len(index):
+            titles = [title] if isinstance(title, str) and title else (title or None)
+            base = HybridRetriever(vector=base, index=index, k=k, titles=titles)
+        else:
+            mode = "vector"
+
+    cache = get_retrieval_cache()
+    if cache is None and not SINGLE_FLIGHT_ENABLED:
+        return base
+    return CachingRetriever(
+        inner=base,
+        cache=cache,
+        search_tag=json.dumps({**search_kwargs, "mode": mode}, sort_keys=True),
+    )
+
+
+def _doc_key(meta: dict) -> tuple:
+    return (meta.get("source_path") or meta.get("source"), meta.get("page"))
+
+
+def multi_query_retrieve(
+    queries: list[str],
+    k: int = 6,
+    title: str | list[str] | None = None,
+    limit: int = 8,
+    rrf_k: int = 60,
+) -> list[Document]:
+    """
+    Recupera para varias consultas con un solo embedding por lotes (solo las que no
+    están en la caché de retrieval) y la API pública del vector store. En modo hybrid
+    suma el ranking BM25 de cada consulta; las de palabras clave (p.ej. "ADD 3.0") se
+    responden solo con BM25, sin embeddings. Fusiona todo por reciprocal-rank fusion y
+    deduplica por (source_path, page). Devuelve hasta `limit`.
+    Llamadas concurrentes con las mismas consultas comparten la búsqueda (single-flight).
+    """
+    qs = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    if not qs:
+        return []
+    key = ("multi", tuple(qs), k, json.dumps(title), limit, rrf_k)
+    return _RETRIEVAL_FLIGHT.do(key, lambda: _multi_query_retrieve(qs, k, title, limit, rrf_k),
+                                clone=_clone_docs)
+
+
+def _vector_rows(qs: list[str], k: int, where: dict | None) -> list[list[Document]]:
+    """
+    Top-k vectorial por consulta. Pasa por la caché de retrieval (misma que CachingRetriever)
+    y embebe en un solo lote solo las consultas que faltan.
+    """
+    cache = get_retrieval_cache()
+    tag = json.dumps({"k": k, "filter": where, "mode": "vector"}, sort_keys=True)
+    keys = [cache.key(q, tag) for q in qs] if cache is not None else [None] * len(qs)
+    rows: list[Optional[list[Document]]] = [cache.get(key) if key else None for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if not missing:
+        return rows
+
+    vectorstore = create_or_load_vectorstore()
+    emb = vectorstore.embeddings
+    embed_many = getattr(emb, "embed_queries", None) or emb.embed_documents
+    vectors = embed_many([qs[i] for i in missing])
+    if hasattr(vectorstore, "search_by_vectors"):
+        # backend NumPy: un solo producto matriz-matriz para todas las consultas
+        found = [[d for d, _ in row] for row in vectorstore.search_by_vectors(vectors, k=k, filter=where)]
+    else:
+        found = [vectorstore.similarity_search_by_vector(vec, k=k, filter=where) for vec in vectors]
+    for i, docs in zip(missing, found):
+        rows[i] = docs
+        if cache is not None:
+            cache.put(keys[i], docs)
+    return rows
+
+
+def _multi_query_retrieve(
+    qs: list[str], k: int, title: str | list[str] | None, limit: int, rrf_k: int
+) -> list[Document]:
+    per_query: list[list[Document]] = []
+    vector_qs = qs
+    index = None
+    if RETRIEVER_MODE == "hybrid":
+        from src.bm25_index import get_bm25_index
+        index = get_bm25_index()
+    if index is not None and len(index):
+        # mismo criterio que HybridRetriever: las consultas de palabras clave no se embeben
+        titles = {title} if isinstance(title, str) and title else (set(title) if title else None)
+        vector_qs = []
+        for q in qs:
+            if _keyword_dominant(index, q):
+                lexical = [index.document(i) for _, i in index.search(q, k=k, titles=titles)]
+                if len(lexical) >= k:
+                    _HYBRID_STATS["lexical_only"] += 1
+                    per_query.append(lexical)
+                    continue
+            per_query.append([index.document(i) for _, i in index.search(q, k=k * 2, titles=titles)])
+            vector_qs.append(q)
+        _HYBRID_STATS["fused"] += len(vector_qs)
+    if vector_qs:
+        per_query += _vector_rows(vector_qs, k, _title_filter(title))
+
+    scores: dict[tuple, float] = {}
+    docs: dict[tuple, Document] = {}
+    for row in per_query:
+        for rank, d in enumerate(row):
+            meta = dict(d.metadata or {})
+            key = _doc_key(meta)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, Document(page_content=d.page_content or "", metadata=meta))
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:limit]]
 
 
 def rebuild_vectorstore():
@@ -105,4 +566,6 @@ def rebuild_vectorstore():
         print(f"[RAG] Removing existing Chroma DB at {persist_directory}")
         shutil.rmtree(persist_directory, ignore_errors=True)
     _VDB = None
+    if _RAG_CACHE is not None:
+        _RAG_CACHE.invalidate()
     return create_or_load_vectorstore()
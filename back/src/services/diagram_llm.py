@@ -40,6 +40,7 @@ def _sanitize_puml(s: str) -> str:
     return s
 
 def _call_llm(prompt: str) -> str:
+    # memoizado en llm_factory: misma instancia (y pool HTTP) en cada request
     llm = get_chat_model(provider=PROVIDER, model=DIAGRAM_LLM_MODEL, temperature=0.2, max_retries=2)
     msg = llm.invoke([SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=prompt)])
     return msg.content
@@ -37,3 +37,49 @@ def extract_pdf_text(path: str, max_chars: int = 6000) -> str:
             text = ""
 
     return _strip_ws(text)[:max_chars]
+
+
+# ---------- extracción por páginas (build del índice) ----------
+
+def pdf_backend() -> str:
+    """Extractor que usan las funciones de abajo: misma preferencia que extract_pdf_text."""
+    try:
+        import fitz  # noqa: F401  PyMuPDF
+        return "pymupdf"
+    except Exception:
+        return "pypdf"
+
+
+def pdf_page_count(path: str) -> int:
+    try:
+        import fitz
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except Exception:
+        from pypdf import PdfReader
+        return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, end: int) -> list[tuple[int, str, str]]:
+    """
+    Texto de las páginas [start, end) como (índice 0-based, texto, page_label).
+    Sin recortes ni limpieza: el splitter trabaja sobre el texto crudo.
+    Se ejecuta en procesos del pool, por eso es una función de módulo.
+    """
+    out = []
+    try:
+        import fitz
+        with fitz.open(path) as doc:
+            for i in range(start, min(end, doc.page_count)):
+                page = doc[i]
+                # sin /PageLabels, pypdf numera 1..n; se replica para metadatos idénticos
+                out.append((i, page.get_text() or "", page.get_label() or str(i + 1)))
+        return out
+    except Exception:
+        out = []
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    labels = reader.page_labels
+    for i in range(start, min(end, len(reader.pages))):
+        out.append((i, reader.pages[i].extract_text() or "", labels[i] if i < len(labels) else str(i + 1)))
+    return out
@@ -0,0 +1,230 @@
+# src/services/embedding_cache.py
+"""
+Caché persistente de embeddings de consultas delante del cliente de embeddings.
+
+- Llave: sha256(modelo + texto normalizado); valor: vector float32 como BLOB.
+- SQLite en WAL: la comparten todos los workers del mismo host.
+- LRU por last_hit con tope EMBED_CACHE_MAX_ENTRIES; además un LRU chico en
+  memoria para no tocar la DB en consultas repetidas del mismo proceso.
+- Solo se cachean consultas (embed_query / embed_queries); embed_documents pasa
+  directo, el build del índice no debe llenar la caché.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.storage import SQLitePool
+
+log = logging.getLogger("embedding_cache")
+
+BACK_DIR = Path(__file__).resolve().parents[2]  # .../back/
+
+_SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    dim        INTEGER NOT NULL,
+    vec        BLOB NOT NULL,
+    last_hit   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_hit ON query_embeddings(last_hit);
+"""
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+def _pack(vec: list[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+
+class EmbeddingStore:
+    """Vectores de consultas en SQLite (float32) con expulsión LRU."""
+
+    def __init__(self, path: str | Path, *, max_entries: int = 20000, mem_entries: int = 512,
+                 evict_every: int = 100) -> None:
+        self._pool = SQLitePool(path, size=4)
+        self._pool.executescript(_SQL_CREATE)
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._mem: "OrderedDict[str, list[float]]" = OrderedDict()
+        self._mem_entries = max(0, mem_entries)
+        self._lock = threading.Lock()
+        self._stats = {"hits_mem": 0, "hits_disk": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._evict()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _remember(self, key: str, vec: list[float]) -> None:
+        if not self._mem_entries:
+            return
+        with self._lock:
+            self._mem[key] = vec
+            self._mem.move_to_end(key)
+            while len(self._mem) > self._mem_entries:
+                self._mem.popitem(last=False)
+
+    def _evict(self) -> None:
+        if not self.max_entries:
+            return
+        with self._pool.transaction() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            if total <= self.max_entries:
+                return
+            removed = conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN "
+                "(SELECT key FROM query_embeddings ORDER BY last_hit ASC LIMIT ?)",
+                (total - self.max_entries,),
+            ).rowcount
+        self._count("evictions", removed)
+
+    def get(self, key: str) -> Optional[list[float]]:
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self._stats["hits_mem"] += 1
+                return list(vec)
+        row = self._pool.fetchone("SELECT vec FROM query_embeddings WHERE key = ?", (key,))
+        if row is None:
+            self._count("misses")
+            return None
+        self._pool.execute("UPDATE query_embeddings SET last_hit = ? WHERE key = ?", (time.time(), key))
+        vec = _unpack(row[0])
+        self._remember(key, vec)
+        self._count("hits_disk")
+        return list(vec)
+
+    def put(self, key: str, model: str, vec: list[float]) -> None:
+        self._pool.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, model, dim, vec, last_hit) VALUES (?, ?, ?, ?, ?)",
+            (key, model, len(vec), _pack(vec), time.time()),
+        )
+        self._remember(key, list(vec))
+        self._count("writes")
+        if self._stats["writes"] % self.evict_every == 0:
+            self._evict()
+
+    def stats(self) -> dict:
+        row = self._pool.fetchone("SELECT COUNT(*) FROM query_embeddings")
+        with self._lock:
+            s = dict(self._stats)
+            mem = len(self._mem)
+        looked = s["hits_mem"] + s["hits_disk"] + s["misses"]
+        hits = s["hits_mem"] + s["hits_disk"]
+        return {
+            **s,
+            "entries": row[0] if row else 0,
+            "entries_mem": mem,
+            "hit_rate": round(hits / looked, 3) if looked else 0.0,
+            "max_entries": self.max_entries,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Envuelve un Embeddings y sirve embed_query desde el EmbeddingStore."""
+
+    def __init__(self, inner: Embeddings, model: str, store: EmbeddingStore) -> None:
+        self.inner = inner
+        self.model = model
+        self.store = store
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.inner.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.inner.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self.store.key(self.model, text)
+        vec = self.store.get(key)
+        if vec is None:
+            vec = self.inner.embed_query(text)
+            self.store.put(key, self.model, vec)
+        return vec
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Varias consultas: las que faltan en caché van en un solo embed_documents."""
+        keys = [self.store.key(self.model, t) for t in texts]
+        out: list[Optional[list[float]]] = [self.store.get(k) for k in keys]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            vecs = self.inner.embed_documents([texts[i] for i in missing])
+            for i, vec in zip(missing, vecs):
+                self.store.put(keys[i], self.model, vec)
+                out[i] = vec
+        return out  # type: ignore[return-value]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self.store.key(self.model, text)
+        vec = await asyncio.to_thread(self.store.get, key)
+        if vec is None:
+            vec = await self.inner.aembed_query(text)
+            await asyncio.to_thread(self.store.put, key, self.model, vec)
+        return vec
+
+
+# ---------- singleton ----------
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "1") != "0"
+_store: Optional[EmbeddingStore] = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Store compartido del proceso (None si EMBED_CACHE=0 o si no se pudo abrir)."""
+    global _store, _store_failed
+    if not EMBED_CACHE_ENABLED or _store_failed:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                p = Path(os.getenv("EMBED_CACHE_PATH", "state_db/embed_cache.db"))
+                if not p.is_absolute():
+                    p = BACK_DIR / p
+                p.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    _store = EmbeddingStore(
+                        p,
+                        max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "20000")),
+                        mem_entries=int(os.getenv("EMBED_CACHE_MEM_ENTRIES", "512")),
+                    )
+                except Exception as e:
+                    _store_failed = True
+                    log.warning("[embedding_cache] deshabilitada: %s", e)
+                    return None
+    return _store
+
+
+def with_query_cache(inner: Embeddings, model: str) -> Embeddings:
+    """Devuelve `inner` envuelto con la caché de consultas (o tal cual si está deshabilitada)."""
+    store = get_embedding_store()
+    if store is None:
+        return inner
+    return CachedEmbeddings(inner, model, store)
@@ -0,0 +1,224 @@
+# src/services/llm_cache.py
+"""
+Caché persistente (SQLite) de respuestas de LLM por coincidencia exacta.
+
+LangChain arma la llave: `prompt` son los mensajes serializados y `llm_string`
+incluye proveedor, modelo, parámetros (temperature, max_tokens, ...) y los kwargs
+ligados como tools / response_format de with_structured_output (el schema).
+Aquí se guarda sha256(llm_string + prompt) -> generaciones serializadas.
+
+- Expulsión por TTL (LLM_CACHE_TTL_SECONDS) y por tamaño (LLM_CACHE_MAX_ENTRIES, LRU).
+- Opt-in / opt-out por nodo del grafo: LLM_CACHE_NODES (lista blanca, vacía = todos)
+  y LLM_CACHE_SKIP_NODES (lista negra). El nodo se toma de la metadata
+  `langgraph_node` del contexto de LangChain.
+- Un hit solo reescribe last_hit / hits si last_hit tiene más de LLM_CACHE_TOUCH_SECONDS
+  (los hits intermedios se acumulan en memoria y se suman en esa escritura).
+- Contadores hits / misses / skipped / writes / evictions para /metrics.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from langchain_core.runnables.config import var_child_runnable_config
+
+from src.storage import SQLitePool
+
+log = logging.getLogger("llm_cache")
+
+BACK_DIR = Path(__file__).resolve().parents[2]  # .../back/
+
+_SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    node       TEXT,
+    value      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit   REAL NOT NULL,
+    hits       INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit);
+"""
+
+
+def _csv_env(name: str) -> frozenset[str]:
+    return frozenset(x.strip() for x in (os.getenv(name) or "").split(",") if x.strip())
+
+
+def current_node() -> str:
+    """Nodo de LangGraph que está ejecutando la llamada ('' fuera del grafo)."""
+    cfg = var_child_runnable_config.get() or {}
+    return str((cfg.get("metadata") or {}).get("langgraph_node") or "")
+
+
+class SQLiteLLMCache(BaseCache):
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        nodes: Optional[frozenset[str]] = None,
+        skip_nodes: Optional[frozenset[str]] = None,
+        evict_every: int = 50,
+        touch_seconds: float = 60.0,
+    ) -> None:
+        self._pool = SQLitePool(path, size=4)
+        self._pool.executescript(_SQL_CREATE)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.nodes = nodes or frozenset()
+        self.skip_nodes = skip_nodes or frozenset()
+        self.evict_every = max(1, evict_every)
+        self.touch_seconds = touch_seconds
+        self._pending_hits: dict[str, int] = {}  # hits aún no escritos en la fila
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "writes": 0, "evictions": 0}
+        self._evict()
+
+    # ---------- helpers ----------
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _allowed(self, node: str) -> bool:
+        if node in self.skip_nodes:
+            return False
+        return not self.nodes or node in self.nodes
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _evict(self) -> None:
+        """Borra lo vencido por TTL y, si sobra, lo menos usado recientemente."""
+        removed = 0
+        with self._pool.transaction() as conn:
+            if self.ttl_seconds:
+                removed += conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            total = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if self.max_entries and total > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_hit ASC LIMIT ?)",
+                    (total - self.max_entries,),
+                ).rowcount
+        if removed:
+            self._count("evictions", removed)
+        with self._lock:
+            self._pending_hits.clear()  # acotado: se pierden a lo sumo touch_seconds de conteos
+
+    # ---------- API BaseCache ----------
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if not self._allowed(current_node()):
+            self._count("skipped")
+            return None
+        key = self._key(prompt, llm_string)
+        row = self._pool.fetchone("SELECT value, created_at, last_hit FROM llm_cache WHERE key = ?", (key,))
+        now = time.time()
+        if row is None or (self.ttl_seconds and row[1] < now - self.ttl_seconds):
+            self._count("misses")
+            return None
+        try:
+            gens = [loads(g) for g in json.loads(row[0])]
+        except Exception as e:
+            log.warning("[llm_cache] entrada ilegible, se descarta: %s", e)
+            self._pool.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+        # last_hit / hits solo se escriben si last_hit quedó viejo (LRU a resolución de
+        # touch_seconds): un hit no cuesta una transacción de escritura
+        with self._lock:
+            self._stats["hits"] += 1
+            pending = self._pending_hits.get(key, 0) + 1
+            touch = now - row[2] >= self.touch_seconds
+            if touch:
+                self._pending_hits.pop(key, None)
+            else:
+                self._pending_hits[key] = pending
+        if touch:
+            self._pool.execute("UPDATE llm_cache SET last_hit = ?, hits = hits + ? WHERE key = ?",
+                               (now, pending, key))
+        return gens
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        node = current_node()
+        if not self._allowed(node):
+            return
+        now = time.time()
+        value = json.dumps([dumps(g) for g in return_val])
+        self._pool.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, node, value, created_at, last_hit, hits) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (self._key(prompt, llm_string), node, value, now, now),
+        )
+        self._count("writes")
+        if self._stats["writes"] % self.evict_every == 0:
+            self._evict()
+
+    def clear(self, **kwargs: Any) -> None:
+        self._pool.execute("DELETE FROM llm_cache")
+        with self._lock:
+            self._pending_hits.clear()
+
+    def stats(self) -> dict:
+        row = self._pool.fetchone("SELECT COUNT(*) FROM llm_cache")
+        with self._lock:
+            s = dict(self._stats)
+        looked = s["hits"] + s["misses"]
+        return {
+            **s,
+            "entries": row[0] if row else 0,
+            "hit_rate": round(s["hits"] / looked, 3) if looked else 0.0,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# ---------- singleton ----------
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+_cache: Optional[SQLiteLLMCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Caché compartida del proceso (None si LLM_CACHE=0 o si no se pudo abrir)."""
+    global _cache, _cache_failed
+    if not LLM_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                p = Path(os.getenv("LLM_CACHE_PATH", "state_db/llm_cache.db"))
+                if not p.is_absolute():
+                    p = BACK_DIR / p
+                p.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    _cache = SQLiteLLMCache(
+                        p,
+                        ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                        nodes=_csv_env("LLM_CACHE_NODES"),
+                        skip_nodes=_csv_env("LLM_CACHE_SKIP_NODES"),
+                        touch_seconds=float(os.getenv("LLM_CACHE_TOUCH_SECONDS", "60")),
+                    )
+                except Exception as e:
+                    _cache_failed = True
+                    log.warning("[llm_cache] deshabilitada: %s", e)
+                    return None
+    return _cache
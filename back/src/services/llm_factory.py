@@ -1,8 +1,17 @@
 # src/services/llm_factory.py
 from __future__ import annotations
-from typing import Optional, Literal, Any, Dict
+from typing import Optional, Literal, Any, Dict, Tuple
+import hashlib
+import importlib.util
+import logging
 import os
+import threading
 from langchain_core.language_models import BaseChatModel
+from pydantic import PrivateAttr
+from src.services.llm_cache import get_llm_cache
+from src.services.single_flight import SINGLE_FLIGHT_ENABLED, SingleFlight
+
+log = logging.getLogger("llm_factory")
 
 # --------------------------- utilidades ---------------------------
 
@@ -81,7 +90,231 @@ def _resolve_ollama_model(sel: Optional[str]) -> str:
         return OLLAMA_ALIASES.get(k, sel)
     return _env("OLLAMA_MODEL", "llama3.2:3b")
 
-# --------------------------- fábrica principal ---------------------------
+# --------------------------- transporte HTTP compartido ---------------------------
+# Un solo par httpx.Client / AsyncClient para todos los modelos Azure/OpenAI: keep-alive,
+# HTTP/2 (si está instalado `h2`) y límites de pool configurables. LLM_SHARED_HTTP=0 vuelve
+# al cliente propio de cada modelo. El AsyncClient queda ligado al event loop del servidor.
+LLM_SHARED_HTTP = os.getenv("LLM_SHARED_HTTP", "1") != "0"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "64"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "32"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") != "0"
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# Timeout total por proveedor (si no se pasa `timeout=`)
+PROVIDER_TIMEOUTS = {
+    "azure": float(os.getenv("LLM_TIMEOUT_AZURE", "60")),
+    "openai": float(os.getenv("LLM_TIMEOUT_OPENAI", "60")),
+    "ollama": float(os.getenv("LLM_TIMEOUT_OLLAMA", "120")),
+}
+
+_HTTP_LOCK = threading.Lock()
+_HTTP: Dict[str, Any] = {}  # "sync" / "async" -> cliente httpx
+_HTTP_STATS = {"requests": 0, "saturated": 0, "peak_active": 0, "peak_queued": 0}
+
+
+def _pool_snapshot(client: Any) -> Tuple[int, int, int]:
+    """(conexiones activas, ociosas, requests en cola) del pool de httpcore.
+
+    Lee atributos privados de httpx/httpcore: si cambian entre versiones devuelve ceros
+    en lugar de fallar (corre dentro del event hook de cada request al LLM).
+    """
+    try:
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        conns = list(getattr(pool, "_connections", None) or [])
+        active = sum(1 for c in conns if not c.is_idle())
+        queued = sum(1 for r in list(getattr(pool, "_requests", None) or []) if r.is_queued())
+    except Exception as e:
+        log.debug("pool snapshot no disponible: %s", e)
+        return 0, 0, 0
+    return active, len(conns) - active, queued
+
+
+def _note_request(kind: str) -> None:
+    """Event hook de httpx: solo métricas, nunca debe hacer fallar el request."""
+    active, _, queued = _pool_snapshot(_HTTP.get(kind))
+    _HTTP_STATS["requests"] += 1
+    _HTTP_STATS["peak_active"] = max(_HTTP_STATS["peak_active"], active)
+    _HTTP_STATS["peak_queued"] = max(_HTTP_STATS["peak_queued"], queued)
+    if active >= LLM_HTTP_MAX_CONNECTIONS or queued:
+        _HTTP_STATS["saturated"] += 1  # el request tuvo que esperar una conexión libre
+
+
+def _http_clients() -> Tuple[Any, Any]:
+    with _HTTP_LOCK:
+        if not _HTTP:
+            import httpx
+            http2 = LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+            if LLM_HTTP2 and not http2:
+                log.info("LLM_HTTP2=1 pero falta el paquete h2; se usa HTTP/1.1")
+            limits = httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+            )
+            timeout = httpx.Timeout(PROVIDER_TIMEOUTS["openai"], connect=LLM_CONNECT_TIMEOUT)
+
+            async def _async_hook(request):
+                _note_request("async")
+
+            _HTTP["sync"] = httpx.Client(limits=limits, timeout=timeout, http2=http2,
+                                         event_hooks={"request": [lambda request: _note_request("sync")]})
+            _HTTP["async"] = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2,
+                                               event_hooks={"request": [_async_hook]})
+            _HTTP["http2"] = http2
+        return _HTTP["sync"], _HTTP["async"]
+
+
+def _timeout(provider: str, timeout: Any) -> Any:
+    if timeout is not None:
+        return timeout
+    import httpx
+    return httpx.Timeout(PROVIDER_TIMEOUTS.get(provider, 60.0), connect=LLM_CONNECT_TIMEOUT)
+
+
+def _http_kwargs(provider: str) -> Dict[str, Any]:
+    if not LLM_SHARED_HTTP or provider not in ("azure", "openai"):
+        return {}
+    sync, async_ = _http_clients()
+    return {"http_client": sync, "http_async_client": async_}
+
+
+# --------------------------- single-flight ---------------------------
+# Llamadas idénticas concurrentes (mismo modelo, parámetros y mensajes) comparten una sola
+# request al proveedor; complementa la caché LLM (que solo ayuda cuando la primera ya terminó).
+# Las llamadas con streaming de tokens no se coalescen (cada una necesita sus callbacks).
+_LLM_FLIGHT = SingleFlight("llm", wait_timeout=90.0)
+
+
+# La llamada real no lleva callbacks: la observa el run del wrapper (tokens, trazas, eventos).
+_NO_CALLBACKS = {"callbacks": []}
+
+
+def _own_ids(message: Any) -> Any:
+    """Quita el id generado por el run del modelo real: el wrapper asigna el de su propio run."""
+    from langchain_core.utils.utils import LC_ID_PREFIX
+    if (getattr(message, "id", None) or "").startswith(LC_ID_PREFIX):
+        message = message.model_copy(update={"id": None})
+    return message
+
+
+class SingleFlightChatModel(BaseChatModel):
+    """Modelo de chat que delega en `inner` y coalesce llamadas idénticas concurrentes.
+
+    Solo usa la API pública del modelo real (invoke / ainvoke / stream / astream / bind_tools /
+    with_structured_output); su caché LLM y su cliente HTTP siguen siendo los mismos.
+    """
+
+    inner: BaseChatModel
+    cache: Any = False  # la caché LLM la aplica el modelo real
+    _inner_key: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _flight_key(self, messages: list, stop: Any, kwargs: Dict[str, Any]) -> str:
+        from langchain_core.load import dumps
+        if self._inner_key is None:
+            # se serializa una sola vez: proveedor, modelo y parámetros del modelo real
+            self._inner_key = dumps(self.inner)
+        prompt = dumps([m.model_copy(update={"id": None}) if getattr(m, "id", None) else m for m in messages])
+        params = repr((stop, sorted(kwargs.items())))
+        return hashlib.sha256(f"{self._inner_key}\x00{params}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _result(message: Any):
+        from langchain_core.outputs import ChatGeneration, ChatResult
+        return ChatResult(generations=[ChatGeneration(message=_own_ids(message))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._result(_LLM_FLIGHT.do(
+            self._flight_key(messages, stop, kwargs),
+            lambda: self.inner.invoke(messages, _NO_CALLBACKS, stop=stop, **kwargs),
+            clone=lambda msg: msg.model_copy(deep=True),
+        ))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._result(await _LLM_FLIGHT.ado(
+            self._flight_key(messages, stop, kwargs),
+            lambda: self.inner.ainvoke(messages, _NO_CALLBACKS, stop=stop, **kwargs),
+            clone=lambda msg: msg.model_copy(deep=True),
+        ))
+
+    # con streaming de tokens no se coalesce: cada llamada necesita sus propios chunks
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        from langchain_core.outputs import ChatGenerationChunk
+        for chunk in self.inner.stream(messages, _NO_CALLBACKS, stop=stop, **kwargs):
+            yield ChatGenerationChunk(message=_own_ids(chunk))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        from langchain_core.outputs import ChatGenerationChunk
+        async for chunk in self.inner.astream(messages, _NO_CALLBACKS, stop=stop, **kwargs):
+            yield ChatGenerationChunk(message=_own_ids(chunk))
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Any:
+        # el modelo real formatea las tools para su proveedor; la llamada pasa por el wrapper
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def with_structured_output(self, schema: Any = None, **kwargs: Any) -> Any:
+        from langchain_core.runnables import RunnableBinding, RunnableSequence
+        chain = self.inner.with_structured_output(schema, **kwargs)
+        first = getattr(chain, "first", None)
+        # forma habitual: modelo real ligado (response_format / tools) | parser
+        if isinstance(chain, RunnableSequence) and isinstance(first, RunnableBinding) and first.bound is self.inner:
+            model = self.bind(**first.kwargs).with_config(first.config)
+            return RunnableSequence(model, *chain.middle, chain.last)
+        return chain  # otras formas (include_raw, ...): sin single-flight
+
+
+def _with_single_flight(llm: BaseChatModel) -> BaseChatModel:
+    if not SINGLE_FLIGHT_ENABLED or isinstance(llm, SingleFlightChatModel):
+        return llm
+    return SingleFlightChatModel(inner=llm)
+
+
+# --------------------------- registro de clientes ---------------------------
+# get_chat_model() memoiza por proveedor/modelo/parámetros: resources, classifier, supervisor
+# y diagram_llm comparten la misma instancia (y su pool de conexiones) en vez de crear una cada vez.
+_REGISTRY: Dict[Tuple, BaseChatModel] = {}
+_REGISTRY_LOCK = threading.Lock()
+_REGISTRY_STATS = {"hits": 0, "misses": 0}
+
+
+def _registry_key(provider: str, model: Optional[str], temperature: Any, max_tokens: Any, timeout: Any,
+                  max_retries: Any, cache: Any, kwargs: Dict[str, Any]) -> Tuple:
+    cache_key = "default" if cache is None else (cache if isinstance(cache, bool) else id(cache))
+    extra = tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+    return (provider, model or _env("ROS_LG_LLM_MODEL"), temperature, max_tokens, repr(timeout),
+            max_retries, cache_key, extra)
+
+
+def registered_chat_models() -> Dict[str, BaseChatModel]:
+    """Instancias creadas hasta ahora, por "proveedor:modelo:temperatura"."""
+    with _REGISTRY_LOCK:
+        return {f"{k[0]}:{k[1] or 'default'}:t={k[2]}": m for k, m in _REGISTRY.items()}
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    """Registro de modelos + saturación del pool HTTP compartido (para /metrics)."""
+    out: Dict[str, Any] = {
+        "models": len(_REGISTRY),
+        **_REGISTRY_STATS,
+        "shared_http": LLM_SHARED_HTTP,
+        "http2": bool(_HTTP.get("http2")),
+        "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+        **_HTTP_STATS,
+    }
+    for kind in ("sync", "async"):
+        if kind in _HTTP:
+            active, idle, queued = _pool_snapshot(_HTTP[kind])
+            out[kind] = {"active": active, "idle": idle, "queued": queued,
+                         "saturation": round(active / max(1, LLM_HTTP_MAX_CONNECTIONS), 3)}
+    return out
+
 
 def get_chat_model(
     provider: Optional[Literal["azure", "openai", "ollama"]] = None,
@@ -90,15 +323,37 @@ def get_chat_model(
     **kwargs: Any,
 ) -> BaseChatModel:
     """
-    Fábrica unificada (Azure / OpenAI / Ollama).
+    Fábrica unificada (Azure / OpenAI / Ollama), memoizada: la misma combinación de
+    proveedor/modelo/parámetros devuelve la misma instancia (con single-flight).
     Si `provider` es None, se autodetecta por .env.
     """
     provider = (provider or _auto_provider()).lower()
+    key = _registry_key(
+        provider, model, kwargs.get("temperature", 0.0), kwargs.get("max_tokens"), kwargs.get("timeout"),
+        kwargs.get("max_retries", 2), kwargs.get("cache"),
+        {k: v for k, v in kwargs.items() if k not in ("temperature", "max_tokens", "timeout", "max_retries", "cache")},
+    )
+    with _REGISTRY_LOCK:
+        llm = _REGISTRY.get(key)
+        if llm is not None:
+            _REGISTRY_STATS["hits"] += 1
+            return llm
+        _REGISTRY_STATS["misses"] += 1
+        llm = _REGISTRY[key] = _with_single_flight(_build_chat_model(provider, model, **kwargs))
+    return llm
+
+# --------------------------- fábrica principal ---------------------------
 
+def _build_chat_model(provider: str, model: Optional[str] = None, **kwargs: Any) -> BaseChatModel:
     temperature = kwargs.pop("temperature", 0.0)
     max_tokens = kwargs.pop("max_tokens", None)
-    timeout = kwargs.pop("timeout", None)
+    raw_timeout = kwargs.pop("timeout", None)
+    timeout = _timeout(provider, raw_timeout)
     max_retries = kwargs.pop("max_retries", 2)
+    # Caché exacta (SQLite) solo para llamadas deterministas; `cache=False` la desactiva
+    cache = kwargs.pop("cache", None)
+    if cache is None and not temperature:
+        cache = get_llm_cache()
 
     if provider == "azure":
         from langchain_openai import AzureChatOpenAI
@@ -117,6 +372,8 @@ def get_chat_model(
             max_tokens=max_tokens,
             timeout=timeout,
             max_retries=max_retries,
+            cache=cache,
+            **_http_kwargs(provider),
             **kwargs,
         )
 
@@ -135,14 +392,19 @@ def get_chat_model(
             max_tokens=max_tokens,
             timeout=timeout,
             max_retries=max_retries,
+            cache=cache,
+            **_http_kwargs(provider),
             **kwargs,
         )
 
     if provider == "ollama":
         try:
             from langchain_ollama import ChatOllama
+            # el cliente de ollama es httpx propio: solo se le pasa el timeout
+            kwargs["client_kwargs"] = {"timeout": timeout, **kwargs.get("client_kwargs", {})}
         except Exception:
             from langchain_community.chat_models import ChatOllama  # type: ignore
+            kwargs.setdefault("timeout", int(raw_timeout or PROVIDER_TIMEOUTS["ollama"]))
         base_url = _env("OLLAMA_BASE_URL", "http://localhost:11434")
         mdl = _resolve_ollama_model(model or _env("ROS_LG_LLM_MODEL"))
         return ChatOllama(
@@ -150,6 +412,7 @@ def get_chat_model(
             base_url=base_url,
             temperature=temperature,
             num_ctx=kwargs.pop("num_ctx", 4096),
+            cache=cache,
             **kwargs,
         )
 
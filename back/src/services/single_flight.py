@@ -0,0 +1,145 @@
+# src/services/single_flight.py
+"""
+Single-flight: llamadas concurrentes con la misma clave comparten una sola ejecución.
+
+Si N requests idénticos llegan a la vez (una clase enviando el mismo prompt, reintentos
+del frontend), solo el primero (líder) ejecuta; el resto espera su resultado.
+No es una caché: al terminar la llamada la clave se libera.
+
+- do(key, fn) para código sync (hilos); ado(key, afn) para async (mismo event loop).
+- Errores: los seguidores reciben la misma excepción que el líder. Si el líder async
+  es cancelado, los seguidores ejecutan por su cuenta.
+- Espera acotada (wait_timeout): si el líder tarda más, el seguidor ejecuta por su cuenta.
+- `clone` copia el resultado para cada seguidor (evita compartir objetos mutables).
+
+SINGLE_FLIGHT=0 lo desactiva; SINGLE_FLIGHT_WAIT_<NOMBRE> (segundos) ajusta la espera por capa.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT", "1") != "0"
+
+_FLIGHTS: dict[str, "SingleFlight"] = {}
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, wait_timeout: float = 60.0) -> None:
+        self.name = name
+        self.wait_timeout = float(os.getenv(f"SINGLE_FLIGHT_WAIT_{name.upper()}", wait_timeout))
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._futures: dict[tuple[int, Hashable], asyncio.Future] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "shared_errors": 0, "wait_timeouts": 0}
+        _FLIGHTS[name] = self
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            self._stats[field] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls) + len(self._futures),
+                    "wait_timeout_s": self.wait_timeout}
+
+    # ---------- sync ----------
+
+    def do(self, key: Hashable, fn: Callable[[], Any], clone: Callable[[Any], Any] | None = None) -> Any:
+        if not SINGLE_FLIGHT_ENABLED:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+        if not call.event.wait(self.wait_timeout):
+            self._count("wait_timeouts")
+            return fn()
+        if call.error is not None:
+            self._count("shared_errors")
+            raise call.error
+        self._count("coalesced")
+        return clone(call.result) if clone else call.result
+
+    # ---------- async ----------
+
+    async def ado(self, key: Hashable, afn: Callable[[], Awaitable[Any]],
+                  clone: Callable[[Any], Any] | None = None) -> Any:
+        if not SINGLE_FLIGHT_ENABLED:
+            return await afn()
+        loop = asyncio.get_running_loop()
+        fkey = (id(loop), key)  # un future solo sirve dentro de su event loop
+        with self._lock:
+            fut = self._futures.get(fkey)
+            leader = fut is None
+            if leader:
+                fut = self._futures[fkey] = loop.create_future()
+                self._stats["leaders"] += 1
+        if leader:
+            try:
+                res = await afn()
+            except asyncio.CancelledError:
+                fut.set_exception(_LeaderCancelled())
+                raise
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            else:
+                fut.set_result(res)
+                return res
+            finally:
+                with self._lock:
+                    self._futures.pop(fkey, None)
+                if fut.done() and not fut.cancelled():
+                    fut.exception()  # marcada como leída: sin "exception was never retrieved"
+
+        try:
+            res = await asyncio.wait_for(asyncio.shield(fut), self.wait_timeout)
+        except _LeaderCancelled:
+            return await afn()
+        except asyncio.TimeoutError:
+            if fut.done():
+                self._count("shared_errors")
+                raise  # el TimeoutError es del líder
+            self._count("wait_timeouts")
+            return await afn()
+        except BaseException:
+            if fut.done():
+                self._count("shared_errors")
+            raise
+        self._count("coalesced")
+        return clone(res) if clone else res
+
+
+def single_flight_stats() -> dict:
+    """Por capa (llm, retrieval, ...): líderes, llamadas coalescidas, errores compartidos, timeouts."""
+    return {"enabled": SINGLE_FLIGHT_ENABLED, **{name: f.stats() for name, f in _FLIGHTS.items()}}
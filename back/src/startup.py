@@ -0,0 +1,60 @@
+# src/startup.py
+"""
+Tiempos de arranque por subsistema (imports e inicialización) para /health/startup.
+
+- FAST_START=1 (default): los módulos de nodos, vertexai, Chroma y tiktoken se
+  cargan en su primer uso y el grafo se compila en segundo plano en el lifespan.
+- FAST_START=0: todo se carga y compila al importar src.main (modo anterior).
+
+Cada paso se registra con `timed(nombre, tipo)`; report() arma el desglose.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+FAST_START = os.getenv("FAST_START", "1") != "0"
+
+_T0 = time.perf_counter()  # ~ inicio del proceso (este módulo se importa primero en main)
+_LOCK = threading.Lock()
+_RECORDS: dict[str, dict] = {}
+
+
+def record(name: str, ms: float, kind: str = "init", ok: bool = True, error: str | None = None) -> None:
+    with _LOCK:
+        _RECORDS[name] = {
+            "kind": kind,
+            "ms": round(ms, 1),
+            "at_ms": round((time.perf_counter() - _T0) * 1000, 1),  # cuándo terminó, desde el arranque
+            "thread": threading.current_thread().name,
+            "ok": ok,
+            **({"error": error} if error else {}),
+        }
+
+
+@contextmanager
+def timed(name: str, kind: str = "init") -> Iterator[None]:
+    t = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record(name, (time.perf_counter() - t) * 1000, kind, ok=False, error=str(e)[:200])
+        raise
+    record(name, (time.perf_counter() - t) * 1000, kind)
+
+
+def report() -> dict:
+    with _LOCK:
+        rows = dict(_RECORDS)
+    by_kind: dict[str, float] = {}
+    for r in rows.values():
+        by_kind[r["kind"]] = round(by_kind.get(r["kind"], 0.0) + r["ms"], 1)
+    return {
+        "fast_start": FAST_START,
+        "uptime_ms": round((time.perf_counter() - _T0) * 1000, 1),
+        "totals_ms": by_kind,
+        "subsystems": dict(sorted(rows.items(), key=lambda kv: kv[1]["at_ms"])),
+    }
@@ -0,0 +1,170 @@
+# src/storage.py
+"""
+Pool de conexiones SQLite de larga vida (WAL) para las bases locales del backend.
+
+Cada conexión se abre una sola vez con WAL, synchronous=NORMAL y busy_timeout, y
+conserva su caché de sentencias preparadas (cached_statements): repetir el mismo SQL
+no vuelve a compilarlo. Las conexiones se prestan de a una por hilo; la API async
+corre la operación en un hilo para no bloquear el event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class SQLitePool:
+    """Pool thread-safe de conexiones sqlite3 a un mismo archivo."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        size: int = 4,
+        busy_timeout_ms: int = 5000,
+        acquire_timeout: float = 10.0,
+        cached_statements: int = 256,
+    ) -> None:
+        self.path = str(path)
+        self.size = max(1, size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.acquire_timeout = acquire_timeout
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._closed = False
+
+    # ---------- conexiones ----------
+
+    def _new_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,  # el pool garantiza un solo hilo a la vez
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError(f"SQLitePool cerrado: {self.path}")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._new_conn()
+                except Exception:
+                    self._created -= 1
+                    raise
+            self._waits += 1
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"SQLitePool sin conexiones libres tras {self.acquire_timeout}s "
+                f"({self.size} en uso): {self.path}"
+            ) from None
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()  # nunca devolver al pool una transacción abierta
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Una sola transacción (un solo fsync) para todas las sentencias del bloque."""
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    # ---------- atajos sync ----------
+
+    def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> list[tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def executescript(self, script: str) -> None:
+        with self.connection() as conn:
+            conn.executescript(script)
+
+    # ---------- API async ----------
+
+    async def arun(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Corre una función sync (que usa el pool) fuera del event loop."""
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def afetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        return await asyncio.to_thread(self.fetchone, sql, params)
+
+    async def afetchall(self, sql: str, params: Sequence[Any] = ()) -> list[tuple]:
+        return await asyncio.to_thread(self.fetchall, sql, params)
+
+    async def aexecute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        return await asyncio.to_thread(self.execute, sql, params)
+
+    async def aexecutemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        rows = list(rows)
+        return await asyncio.to_thread(self.executemany, sql, rows)
+
+    # ---------- ciclo de vida / métricas ----------
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "open": self._created,
+            "idle": self._idle.qsize(),
+            "waits": self._waits,
+        }
@@ -0,0 +1,231 @@
+# src/tactics_catalog.py
+"""
+Catálogo estructurado de tácticas (Bass, Clements, Kazman — SAiP 3e).
+
+- build_tactics_catalog(): lo llama build_vectorstore.py. Parte de la lista
+  canónica de abajo y ubica cada táctica en el libro con UNA consulta batch a la
+  colección (embedding por lotes) para guardar fuente y página.
+- Se guarda como JSON compacto junto al índice (tactics_catalog.json).
+- En runtime: for_quality_attribute(qa) y match(name) son búsquedas en dicts,
+  sin embeddings ni LLM.
+"""
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+CATALOG_FILE = "tactics_catalog.json"
+SAIP_TITLE = "Software Architecture in Practice (3e)"
+
+# (atributo, categoría, táctica, descripción canónica breve)
+_SEED: list[tuple[str, str, str, str]] = [
+    # ---- Performance ----
+    ("performance", "Control Resource Demand", "Manage Sampling Rate", "Reduce the frequency at which environmental data is captured to lower demand, accepting some fidelity loss."),
+    ("performance", "Control Resource Demand", "Limit Event Response", "Process events only up to a set maximum rate, queueing or dropping the excess."),
+    ("performance", "Control Resource Demand", "Prioritize Events", "Assign priorities so important events are served first when resources are scarce."),
+    ("performance", "Control Resource Demand", "Reduce Overhead", "Remove intermediaries and indirection on the critical path to cut per-request work."),
+    ("performance", "Control Resource Demand", "Bound Execution Times", "Cap how much execution time a response may consume (e.g., iteration limits)."),
+    ("performance", "Control Resource Demand", "Increase Resource Efficiency", "Improve the algorithms used in critical areas to lower latency."),
+    ("performance", "Manage Resources", "Increase Resources", "Add faster or more processors, memory, or network capacity."),
+    ("performance", "Manage Resources", "Introduce Concurrency", "Process requests in parallel to reduce blocked time."),
+    ("performance", "Manage Resources", "Maintain Multiple Copies of Computations", "Replicate servers behind a load balancer to spread computation."),
+    ("performance", "Manage Resources", "Maintain Multiple Copies of Data", "Keep replicas or caches of data closer to where it is consumed."),
+    ("performance", "Manage Resources", "Bound Queue Sizes", "Limit queued arrivals to bound resource use and latency."),
+    ("performance", "Manage Resources", "Schedule Resources", "Apply a scheduling policy to arbitrate contended resources."),
+    # ---- Availability ----
+    ("availability", "Detect Faults", "Ping/Echo", "Send an asynchronous request and expect a response to check reachability."),
+    ("availability", "Detect Faults", "Monitor", "A component watches the health of other parts of the system."),
+    ("availability", "Detect Faults", "Heartbeat", "Periodic messages between a monitor and a process reveal failures."),
+    ("availability", "Detect Faults", "Timestamp", "Attach times or sequence numbers to detect out-of-order events."),
+    ("availability", "Detect Faults", "Sanity Checking", "Validate that operations or outputs are within reasonable bounds."),
+    ("availability", "Detect Faults", "Condition Monitoring", "Check conditions in a process or device to validate assumptions."),
+    ("availability", "Detect Faults", "Voting", "Compare outputs of redundant components to detect inconsistencies."),
+    ("availability", "Detect Faults", "Exception Detection", "Detect conditions that alter the normal flow of execution."),
+    ("availability", "Detect Faults", "Self-Test", "Components run procedures to test themselves for correct operation."),
+    ("availability", "Recover from Faults", "Active Redundancy", "Redundant nodes process all inputs in parallel (hot spare)."),
+    ("availability", "Recover from Faults", "Passive Redundancy", "Only the active node processes input; standbys receive periodic state updates (warm spare)."),
+    ("availability", "Recover from Faults", "Spare", "A cold spare is booted and configured when a failure occurs."),
+    ("availability", "Recover from Faults", "Exception Handling", "Mask or repair a detected exception so the system keeps working."),
+    ("availability", "Recover from Faults", "Rollback", "Revert to a previous known good state (checkpoint) after a failure."),
+    ("availability", "Recover from Faults", "Software Upgrade", "Apply in-service upgrades without affecting service."),
+    ("availability", "Recover from Faults", "Retry", "Repeat a failed operation assuming the fault is transient."),
+    ("availability", "Recover from Faults", "Ignore Faulty Behavior", "Disregard messages from a source known to be spurious."),
+    ("availability", "Recover from Faults", "Degradation", "Keep critical functions alive and drop less critical ones under failure."),
+    ("availability", "Recover from Faults", "Reconfiguration", "Reassign responsibilities to remaining resources after a failure."),
+    ("availability", "Reintroduction", "Shadow", "Run a recovered component in shadow mode before it takes over."),
+    ("availability", "Reintroduction", "State Resynchronization", "Bring a recovered component's state in line with the active one."),
+    ("availability", "Reintroduction", "Escalating Restart", "Restart at increasing granularity to minimize service impact."),
+    ("availability", "Reintroduction", "Non-Stop Forwarding", "Split control and data planes so forwarding continues while control recovers."),
+    ("availability", "Prevent Faults", "Removal from Service", "Temporarily take a component out of service to prevent failures (e.g., reboot)."),
+    ("availability", "Prevent Faults", "Transactions", "Bundle state updates so they are atomic, consistent, isolated and durable."),
+    ("availability", "Prevent Faults", "Predictive Model", "Monitor health indicators to act before a fault occurs."),
+    ("availability", "Prevent Faults", "Exception Prevention", "Prevent exceptions from happening (e.g., smart pointers, abstract data types)."),
+    ("availability", "Prevent Faults", "Increase Competence Set", "Design components to handle more cases as part of normal operation."),
+    # ---- Security ----
+    ("security", "Detect Attacks", "Detect Intrusion", "Compare traffic or behavior against known malicious patterns."),
+    ("security", "Detect Attacks", "Detect Service Denial", "Compare incoming traffic patterns with known denial-of-service profiles."),
+    ("security", "Detect Attacks", "Verify Message Integrity", "Use checksums or hashes to verify messages were not altered."),
+    ("security", "Detect Attacks", "Detect Message Delay", "Check transfer times to detect man-in-the-middle attacks."),
+    ("security", "Resist Attacks", "Identify Actors", "Identify the source of any external input."),
+    ("security", "Resist Attacks", "Authenticate Actors", "Ensure actors are who they claim to be."),
+    ("security", "Resist Attacks", "Authorize Actors", "Ensure authenticated actors have rights to access and modify data or services."),
+    ("security", "Resist Attacks", "Limit Access", "Restrict which actors can reach which resources (e.g., DMZ, firewalls)."),
+    ("security", "Resist Attacks", "Limit Exposure", "Minimize the attack surface by reducing exposed access points."),
+    ("security", "Resist Attacks", "Encrypt Data", "Protect data at rest and in transit with encryption."),
+    ("security", "Resist Attacks", "Separate Entities", "Isolate sensitive components physically or virtually."),
+    ("security", "Resist Attacks", "Change Default Settings", "Force users to change default credentials and settings."),
+    ("security", "React to Attacks", "Revoke Access", "Restrict access to sensitive resources when an attack is suspected."),
+    ("security", "React to Attacks", "Lock Computer", "Lock access after repeated failed attempts."),
+    ("security", "React to Attacks", "Inform Actors", "Notify operators or other systems of a suspected attack."),
+    ("security", "Recover from Attacks", "Maintain Audit Trail", "Record user and system actions to trace and recover from attacks."),
+    ("security", "Recover from Attacks", "Restore", "Use availability tactics to restore services after an attack."),
+    # ---- Modifiability ----
+    ("modifiability", "Reduce Size of a Module", "Split Module", "Divide a large module into smaller ones to lower the cost of future changes."),
+    ("modifiability", "Increase Cohesion", "Increase Semantic Coherence", "Move responsibilities that do not serve the same purpose into other modules."),
+    ("modifiability", "Reduce Coupling", "Encapsulate", "Introduce an explicit interface that hides the module's internals."),
+    ("modifiability", "Reduce Coupling", "Use an Intermediary", "Break dependencies by inserting a broker, publish-subscribe bus or similar."),
+    ("modifiability", "Reduce Coupling", "Restrict Dependencies", "Limit which modules a given module may interact with (e.g., layers)."),
+    ("modifiability", "Reduce Coupling", "Refactor", "Factor out common responsibilities shared by modules."),
+    ("modifiability", "Reduce Coupling", "Abstract Common Services", "Implement similar services once in a more general form."),
+    ("modifiability", "Defer Binding", "Defer Binding", "Bind values at compile, deploy, start-up or runtime via parameters, plug-ins or configuration."),
+]
+
+# Atributos que el nodo de tácticas detecta -> atributo del catálogo
+QA_ALIASES = {
+    "latency": "performance",
+    "throughput": "performance",
+    "scalability": "performance",
+    "reliability": "availability",
+}
+
+
+def _norm(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).strip()
+
+
+def canonical_qa(qa: str) -> str:
+    q = (qa or "").strip().lower()
+    return QA_ALIASES.get(q, q)
+
+
+def _catalog_path(persist_directory: str | Path | None = None) -> Path:
+    if persist_directory is None:
+        from src.rag_agent import DEFAULT_CHROMA_DIR
+        persist_directory = os.environ.get("CHROMA_DIR", DEFAULT_CHROMA_DIR)
+    return Path(persist_directory) / CATALOG_FILE
+
+
+# ================== Build (offline) ==================
+
+def build_tactics_catalog(vectordb, persist_directory: str | Path) -> Path:
+    """Ubica cada táctica del seed en el libro (fuente/página) y escribe el JSON."""
+    queries = [f"{name} tactic ({cat}) for {qa}" for qa, cat, name, _ in _SEED]
+    emb = vectordb.embeddings
+    # embed_queries (caché de consultas) evita re-embeber el seed en builds incrementales
+    vectors = (getattr(emb, "embed_queries", None) or emb.embed_documents)(queries)
+    kwargs: dict[str, Any] = {
+        "query_embeddings": vectors,
+        "n_results": 1,
+        "include": ["metadatas"],
+        # `title` guarda el nombre del archivo; el nombre lógico del libro va en `source_title`
+        "where": {"source_title": {"$eq": SAIP_TITLE}},
+    }
+    try:
+        metas = vectordb._collection.query(**kwargs).get("metadatas") or []
+    except Exception:
+        metas = []
+    if not any(metas):
+        # sin el libro SAiP en el índice: usa cualquier fuente
+        kwargs.pop("where")
+        metas = vectordb._collection.query(**kwargs).get("metadatas") or []
+
+    tactics = []
+    for i, (qa, cat, name, desc) in enumerate(_SEED):
+        md = (metas[i][0] if i < len(metas) and metas[i] else None) or {}
+        tactics.append({
+            "name": name,
+            "quality_attribute": qa,
+            "category": cat,
+            "description": desc,
+            "source_title": md.get("source_title") or md.get("title") or SAIP_TITLE,
+            "source_path": md.get("source_path") or md.get("source") or "",
+            "page": md.get("page"),               # índice 0-based (como en el índice vectorial)
+            "page_label": md.get("page_label"),   # etiqueta impresa en el libro
+        })
+
+    path = _catalog_path(persist_directory)
+    path.write_text(
+        json.dumps({"version": 2, "tactics": tactics}, ensure_ascii=False, separators=(",", ":")),
+        encoding="utf-8",
+    )
+    return path
+
+
+# ================== Lookup (runtime) ==================
+
+class TacticsCatalog:
+    def __init__(self, tactics: list[dict]):
+        self.tactics = tactics
+        self.by_qa: dict[str, list[dict]] = {}
+        self.by_name: dict[str, dict] = {}
+        for t in tactics:
+            self.by_qa.setdefault(t["quality_attribute"], []).append(t)
+            self.by_name[_norm(t["name"])] = t
+        self._names = list(self.by_name)
+
+    def for_quality_attribute(self, qa: str) -> list[dict]:
+        return self.by_qa.get(canonical_qa(qa), [])
+
+    def match(self, name: str, cutoff: float = 0.8) -> Optional[dict]:
+        """Táctica canónica para un nombre propuesto (exacto, contenido o difflib)."""
+        n = _norm(name)
+        if not n:
+            return None
+        hit = self.by_name.get(n)
+        if hit is not None:
+            return hit
+        # "Introduce Concurrency (worker pool)" -> Introduce Concurrency
+        for cand in sorted(self._names, key=len, reverse=True):
+            if len(cand) > 6 and re.search(rf"\b{re.escape(cand)}\b", n):
+                return self.by_name[cand]
+        close = difflib.get_close_matches(n, self._names, n=1, cutoff=cutoff)
+        return self.by_name[close[0]] if close else None
+
+
+_catalog: Optional[TacticsCatalog] = None
+_catalog_mtime = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[TacticsCatalog]:
+    """Catálogo cargado del disco (recarga si el build lo reescribió); None si no existe."""
+    global _catalog, _catalog_mtime
+    if os.getenv("TACTICS_CATALOG", "1") == "0":
+        return None
+    path = _catalog_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    if _catalog is None or mtime != _catalog_mtime:
+        with _catalog_lock:
+            if _catalog is None or mtime != _catalog_mtime:
+                try:
+                    data = json.loads(path.read_text(encoding="utf-8"))
+                except Exception:
+                    return None
+                _catalog = TacticsCatalog(data.get("tactics") or [])
+                _catalog_mtime = mtime
+    return _catalog
+
+
+if __name__ == "__main__":
+    # Regenera el catálogo sobre el índice ya construido
+    from src.rag_agent import create_or_load_vectorstore, _persist_directory
+    out = build_tactics_catalog(create_or_load_vectorstore(), _persist_directory())
+    print(f"[catalog] {len(_SEED)} tácticas -> {out}")
@@ -0,0 +1,20 @@
+# src/utils/tokens.py
+"""
+Encoding de tiktoken compartido entre el build (token_count por chunk) y el runtime
+(PromptBudget): un conteo guardado solo sirve si ambos usan el mismo encoding.
+o200k_base es el de gpt-4o / gpt-4.1 / gpt-5; se cambia con TOKEN_ENCODING.
+"""
+from __future__ import annotations
+
+import os
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+
+
+def load_encoding():
+    """Encoding de TOKEN_ENCODING; None si tiktoken no está disponible."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
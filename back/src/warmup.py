@@ -0,0 +1,164 @@
+# src/warmup.py
+"""
+Warm-up del worker: ejercita cada dependencia una vez antes de recibir tráfico.
+
+- tokenizer: carga el BPE de tiktoken
+- graph: compila el grafo e importa todos los nodos (y sus clientes)
+- structured_output: arma with_structured_output de cada schema usado por los nodos
+- embeddings + vector_search: un embedding (sin caché, abre la conexión TLS) y una
+  consulta al vector store (carga el índice HNSW / NumPy); también BM25 y catálogo
+- llm:<modelo>: una llamada mínima por modelo de chat configurado (sin caché LLM)
+
+/ready devuelve 200 solo cuando terminó. Config por env:
+WARMUP=0 (sin warm-up, listo al arrancar), WARMUP_LLM=0 (sin llamadas al LLM),
+WARMUP_TIMEOUT_S. Un paso fallido o el timeout dejan /ready en 503; WARMUP_ALLOW_DEGRADED=1
+marca el worker listo igualmente (queda "degraded" en el estado).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from src.startup import timed
+
+log = logging.getLogger("warmup")
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+WARMUP_LLM = os.getenv("WARMUP_LLM", "1") != "0"
+WARMUP_ALLOW_DEGRADED = os.getenv("WARMUP_ALLOW_DEGRADED", "0") == "1"
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "60"))
+
+_PING = "Reply with: ok"
+
+
+def _chat_models() -> dict[str, Any]:
+    """Modelos de chat configurados: los del registro de llm_factory (los nodos comparten resources.llm)."""
+    from src.graph.resources import llm  # noqa: F401  (registra el modelo por defecto)
+    from src.services.llm_factory import get_chat_model, registered_chat_models
+    if os.getenv("DIAGRAM_LLM_PROVIDER") or os.getenv("DIAGRAM_LLM_MODEL"):
+        from src.services.diagram_llm import DIAGRAM_LLM_MODEL, PROVIDER
+        get_chat_model(provider=PROVIDER, model=DIAGRAM_LLM_MODEL, temperature=0.2, max_retries=2)
+    return registered_chat_models()
+
+
+class Warmup:
+    def __init__(self) -> None:
+        self.state = "pending"  # pending | running | ready | failed
+        self.steps: dict[str, dict] = {}
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.timed_out = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def skip(self) -> None:
+        self.state = "ready"
+
+    def _step(self, name: str, fn: Callable[[], Any]) -> Any:
+        t = time.perf_counter()
+        try:
+            with timed(f"warmup.{name}", "warmup"):
+                out = fn()
+        except Exception as e:
+            with self._lock:
+                self.steps[name] = {"ok": False, "ms": round((time.perf_counter() - t) * 1000, 1),
+                                    "error": str(e)[:200]}
+            log.warning("[warmup] %s falló: %s", name, e)
+            return None
+        with self._lock:
+            self.steps[name] = {"ok": True, "ms": round((time.perf_counter() - t) * 1000, 1)}
+        return out
+
+    # ---------- pasos ----------
+
+    def _local(self) -> None:
+        from src.graph.utils import _count_tokens
+        self._step("tokenizer", lambda: _count_tokens("warm-up"))
+
+        def graph():
+            from src.graph import get_graph
+            from src.graph.workflow import NODES, _node_module
+            get_graph()
+            for mod, _, _ in NODES.values():
+                _node_module(mod)
+        self._step("graph", graph)
+
+        def structured():
+            from src.graph.resources import llm
+            from src.graph.state import ClassifyOut, supervisorSchema, investigatorSchema, evaluatorSchema
+            for schema in (ClassifyOut, supervisorSchema, investigatorSchema, evaluatorSchema):
+                llm.with_structured_output(schema)
+        self._step("structured_output", structured)
+
+    def _retrieval(self) -> None:
+        from src.rag_agent import create_or_load_vectorstore
+        vdb = self._step("vector_store", create_or_load_vectorstore)
+        if vdb is None:
+            return
+        # embed_documents no pasa por la caché de consultas: sale a la red
+        vec = self._step("embeddings", lambda: vdb.embeddings.embed_documents(["warm-up"])[0])
+        if vec is not None:
+            self._step("vector_search", lambda: vdb.similarity_search_by_vector(vec, k=1))
+
+        def lexical():
+            from src.bm25_index import get_bm25_index
+            from src.tactics_catalog import get_catalog
+            get_bm25_index()
+            get_catalog()
+        self._step("lexical_index", lexical)
+
+    def _llm(self, key: str, model: Any) -> None:
+        # copia sin caché LLM (una respuesta cacheada no abriría la conexión); comparte el cliente HTTP
+        from src.services.llm_factory import SingleFlightChatModel
+        if isinstance(model, SingleFlightChatModel):
+            model = model.inner  # el modelo real es el que tiene la caché
+        probe = model.model_copy(update={"cache": False})
+        self._step(f"llm:{key}", lambda: probe.invoke(_PING))
+
+    # ---------- ejecución ----------
+
+    def run(self) -> None:
+        self.state = "running"
+        self.started_at = time.time()
+        pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="warmup")
+        futures = [pool.submit(self._local), pool.submit(self._retrieval)]
+        if WARMUP_LLM:
+            models = self._step("chat_models", _chat_models) or {}
+            futures += [pool.submit(self._llm, k, m) for k, m in models.items()]
+        done, pending = wait(futures, timeout=WARMUP_TIMEOUT_S)
+        pool.shutdown(wait=False)
+        self.timed_out = bool(pending)
+        failed = self.timed_out or any(not s["ok"] for s in self.steps.values())
+        self.finished_at = time.time()
+        # un worker a medio calentar no entra al balanceador salvo opt-in explícito
+        self.state = "ready" if (not failed or WARMUP_ALLOW_DEGRADED) else "failed"
+        log.info("[warmup] %s en %.1fs (%d pasos, fallidos: %s%s)", self.state,
+                 self.finished_at - self.started_at, len(self.steps),
+                 [n for n, s in self.steps.items() if not s["ok"]] or "ninguno",
+                 ", timeout" if self.timed_out else "")
+
+    async def arun(self) -> None:
+        await asyncio.to_thread(self.run)
+
+    def status(self) -> dict:
+        with self._lock:
+            steps = dict(self.steps)
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "degraded": any(not s["ok"] for s in steps.values()) or self.timed_out,
+            "timed_out": self.timed_out,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+            "steps": steps,
+        }
+
+
+warmup = Warmup()